@@ -0,0 +1,601 @@
+-- db/compatibility_edges.sql
+-- Precomputed compatibility edges for the get_compatible_* functions in
+-- new_compatibility.sql. Each pairwise rule is evaluated once and stored as
+-- an indexed (left_id, right_id) table in the compat_edges schema; the
+-- edge-backed get_compatible_* functions in the same schema are plain SQL
+-- functions that the planner inlines into an index join.
+--
+-- Motherboard/GPU slot fit is not stored: nearly every pair passes it, so the
+-- table would approach boards x GPUs rows. get_compatible_video_cards checks
+-- it at query time with gpu_fits_slot instead.
+--
+-- Edges are refreshed incrementally by statement-level triggers on the
+-- *_specs tables: only the ids that were inserted, deleted, or had a
+-- compatibility-relevant column changed are recomputed. Updates that only
+-- touch rank, ml_score or prices (the ranking job) cost one trigger call
+-- and no refresh.
+--
+-- Install after new_compatibility.sql:
+--   psql -d pc_builder -f db/compatibility_edges.sql
+-- The recommendation system uses these functions when started with
+-- use_compat_edges=True (puts compat_edges first on the search_path).
+
+CREATE SCHEMA IF NOT EXISTS compat_edges;
+
+-- ---------- Parsing helpers (same rules as new_compatibility.sql) ----------
+
+-- Maximum PCIe width offered by a motherboard (get_compatible_video_cards)
+CREATE OR REPLACE FUNCTION compat_edges.pcie_lanes(pci_slots text)
+RETURNS int AS $$
+    SELECT CASE
+        WHEN pci_slots LIKE '%PCIe x16%' THEN 16
+        WHEN pci_slots LIKE '%PCIe x8%' THEN 8
+        WHEN pci_slots LIKE '%PCIe x4%' THEN 4
+        ELSE 1
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION compat_edges.gpu_fits_slot(gpu_interface text, mobo_lanes int)
+RETURNS boolean AS $$
+    SELECT CASE
+        WHEN gpu_interface LIKE '%PCIe x16%' AND mobo_lanes >= 16 THEN true
+        WHEN gpu_interface LIKE '%PCIe x8%' AND mobo_lanes >= 8 THEN true
+        WHEN gpu_interface LIKE '%PCIe x4%' AND mobo_lanes >= 4 THEN true
+        WHEN gpu_interface LIKE '%PCIe x1%' THEN true
+        WHEN gpu_interface IS NULL OR gpu_interface = '' THEN true
+        WHEN gpu_interface LIKE '%PCIe%' THEN true
+        ELSE false
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- GPU length in mm; NULL where get_compatible_case would raise
+CREATE OR REPLACE FUNCTION compat_edges.gpu_length_mm(length_text text)
+RETURNS numeric AS $$
+    SELECT CASE
+        WHEN length_text ~ '([0-9]+(\.[0-9]+)?).*mm' THEN
+            (regexp_match(length_text, '([0-9]+(\.[0-9]+)?)'))[1]::numeric
+        WHEN length_text ~ '([0-9]+(\.[0-9]+)?).*in' THEN
+            (regexp_match(length_text, '([0-9]+(\.[0-9]+)?)'))[1]::numeric * 25.4
+        WHEN length_text ~ '([0-9]+(\.[0-9]+)?)' THEN
+            (regexp_match(length_text, '([0-9]+(\.[0-9]+)?)'))[1]::numeric
+        ELSE NULL
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Case GPU clearance in mm; NULL means no GPU fits
+CREATE OR REPLACE FUNCTION compat_edges.case_gpu_clearance_mm(length_text text)
+RETURNS numeric AS $$
+    SELECT CASE
+        WHEN length_text ~ '([0-9]+(\.[0-9]+)?).*mm' THEN
+            (regexp_match(length_text, '([0-9]+(\.[0-9]+)?)'))[1]::numeric
+        WHEN length_text ~ '([0-9]+(\.[0-9]+)?).*"' THEN
+            (regexp_match(length_text, '([0-9]+(\.[0-9]+)?)'))[1]::numeric * 25.4
+        WHEN length_text ~ '([0-9]+(\.[0-9]+)?)' THEN
+            (regexp_match(length_text, '([0-9]+(\.[0-9]+)?)'))[1]::numeric
+        ELSE NULL
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- PSU form factors accepted by a case type (get_compatible_psu)
+CREATE OR REPLACE FUNCTION compat_edges.case_psu_types(case_type text)
+RETURNS text[] AS $$
+    SELECT CASE
+        WHEN case_type LIKE 'ATX%' THEN ARRAY['ATX']
+        WHEN case_type LIKE 'Mini ITX%' THEN ARRAY['SFX', 'Mini ITX']
+        WHEN case_type LIKE 'MicroATX%' THEN ARRAY['ATX']
+        WHEN case_type = 'HTPC' THEN ARRAY['TFX', 'Flex ATX']
+        ELSE ARRAY['ATX']
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION compat_edges.ddr_version(memory_text text)
+RETURNS int AS $$
+    SELECT CASE
+        WHEN memory_text LIKE '%DDR5%' THEN 5
+        WHEN memory_text LIKE '%DDR4%' THEN 4
+        WHEN memory_text LIKE '%DDR3%' THEN 3
+        WHEN memory_text LIKE '%DDR2%' THEN 2
+        ELSE NULL
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- ---------- Edge tables ----------
+
+CREATE TABLE IF NOT EXISTS compat_edges.cpu_motherboard (
+    cpu_id integer NOT NULL,
+    motherboard_id integer NOT NULL,
+    PRIMARY KEY (cpu_id, motherboard_id)
+);
+CREATE INDEX IF NOT EXISTS idx_cpu_motherboard_motherboard ON compat_edges.cpu_motherboard (motherboard_id);
+
+CREATE TABLE IF NOT EXISTS compat_edges.cpu_cooler (
+    cpu_id integer NOT NULL,
+    cooler_id integer NOT NULL,
+    PRIMARY KEY (cpu_id, cooler_id)
+);
+CREATE INDEX IF NOT EXISTS idx_cpu_cooler_cooler ON compat_edges.cpu_cooler (cooler_id);
+
+CREATE TABLE IF NOT EXISTS compat_edges.motherboard_memory (
+    motherboard_id integer NOT NULL,
+    memory_id integer NOT NULL,
+    PRIMARY KEY (motherboard_id, memory_id)
+);
+CREATE INDEX IF NOT EXISTS idx_motherboard_memory_memory ON compat_edges.motherboard_memory (memory_id);
+
+CREATE TABLE IF NOT EXISTS compat_edges.motherboard_ssd (
+    motherboard_id integer NOT NULL,
+    ssd_id integer NOT NULL,
+    PRIMARY KEY (motherboard_id, ssd_id)
+);
+CREATE INDEX IF NOT EXISTS idx_motherboard_ssd_ssd ON compat_edges.motherboard_ssd (ssd_id);
+
+-- get_compatible_case checks two independent rules; storing them separately
+-- keeps the tables linear in size instead of GPUs x motherboards x cases.
+CREATE TABLE IF NOT EXISTS compat_edges.motherboard_case (
+    motherboard_id integer NOT NULL,
+    case_id integer NOT NULL,
+    PRIMARY KEY (motherboard_id, case_id)
+);
+CREATE INDEX IF NOT EXISTS idx_motherboard_case_case ON compat_edges.motherboard_case (case_id);
+
+CREATE TABLE IF NOT EXISTS compat_edges.gpu_case (
+    gpu_id integer NOT NULL,
+    case_id integer NOT NULL,
+    PRIMARY KEY (gpu_id, case_id)
+);
+CREATE INDEX IF NOT EXISTS idx_gpu_case_case ON compat_edges.gpu_case (case_id);
+
+-- Wattage is a query parameter, so only the form-factor rule is stored
+CREATE TABLE IF NOT EXISTS compat_edges.case_psu (
+    case_id integer NOT NULL,
+    psu_id integer NOT NULL,
+    PRIMARY KEY (case_id, psu_id)
+);
+CREATE INDEX IF NOT EXISTS idx_case_psu_psu ON compat_edges.case_psu (psu_id);
+
+-- ---------- Refresh functions ----------
+-- Each takes the changed ids on both sides of the edge. NULL for both
+-- rebuilds the whole table; otherwise pass '{}' for an unchanged side.
+
+CREATE OR REPLACE FUNCTION compat_edges.refresh_cpu_motherboard(p_cpu_ids int[] DEFAULT NULL, p_motherboard_ids int[] DEFAULT NULL)
+RETURNS void AS $$
+BEGIN
+    IF p_cpu_ids IS NULL AND p_motherboard_ids IS NULL THEN
+        TRUNCATE compat_edges.cpu_motherboard;
+    ELSE
+        DELETE FROM compat_edges.cpu_motherboard
+        WHERE cpu_id = ANY(p_cpu_ids) OR motherboard_id = ANY(p_motherboard_ids);
+    END IF;
+
+    INSERT INTO compat_edges.cpu_motherboard (cpu_id, motherboard_id)
+    SELECT c.id, m.id
+    FROM cpu_specs c
+    JOIN motherboard_specs m ON m.socket_cpu = c.socket
+    WHERE (p_cpu_ids IS NULL AND p_motherboard_ids IS NULL)
+       OR c.id = ANY(p_cpu_ids) OR m.id = ANY(p_motherboard_ids);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION compat_edges.refresh_cpu_cooler(p_cpu_ids int[] DEFAULT NULL, p_cooler_ids int[] DEFAULT NULL)
+RETURNS void AS $$
+BEGIN
+    IF p_cpu_ids IS NULL AND p_cooler_ids IS NULL THEN
+        TRUNCATE compat_edges.cpu_cooler;
+    ELSE
+        DELETE FROM compat_edges.cpu_cooler
+        WHERE cpu_id = ANY(p_cpu_ids) OR cooler_id = ANY(p_cooler_ids);
+    END IF;
+
+    INSERT INTO compat_edges.cpu_cooler (cpu_id, cooler_id)
+    SELECT c.id, k.id
+    FROM cpu_specs c
+    JOIN cooler_specs k ON c.socket = ANY(string_to_array(k.cpu_socket, E'\n'))
+    WHERE (p_cpu_ids IS NULL AND p_cooler_ids IS NULL)
+       OR c.id = ANY(p_cpu_ids) OR k.id = ANY(p_cooler_ids);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION compat_edges.refresh_motherboard_memory(p_motherboard_ids int[] DEFAULT NULL, p_memory_ids int[] DEFAULT NULL)
+RETURNS void AS $$
+BEGIN
+    IF p_motherboard_ids IS NULL AND p_memory_ids IS NULL THEN
+        TRUNCATE compat_edges.motherboard_memory;
+    ELSE
+        DELETE FROM compat_edges.motherboard_memory
+        WHERE motherboard_id = ANY(p_motherboard_ids) OR memory_id = ANY(p_memory_ids);
+    END IF;
+
+    INSERT INTO compat_edges.motherboard_memory (motherboard_id, memory_id)
+    SELECT ms.id, m.id
+    FROM motherboard_specs ms
+    JOIN memory_specs m ON compat_edges.ddr_version(m.speed) = compat_edges.ddr_version(ms.memory_type)
+    WHERE (
+            CASE
+                WHEN ms.memory_speed LIKE '%' || m.speed || '%' THEN true
+                WHEN m.speed ~ 'DDR[2-5]-([0-9]+)' THEN
+                    ms.memory_speed LIKE '%' || (regexp_match(m.speed, 'DDR[2-5]-([0-9]+)'))[1] || '%'
+                ELSE false
+            END
+        )
+      AND ((p_motherboard_ids IS NULL AND p_memory_ids IS NULL)
+           OR ms.id = ANY(p_motherboard_ids) OR m.id = ANY(p_memory_ids));
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION compat_edges.refresh_motherboard_ssd(p_motherboard_ids int[] DEFAULT NULL, p_ssd_ids int[] DEFAULT NULL)
+RETURNS void AS $$
+BEGIN
+    IF p_motherboard_ids IS NULL AND p_ssd_ids IS NULL THEN
+        TRUNCATE compat_edges.motherboard_ssd;
+    ELSE
+        DELETE FROM compat_edges.motherboard_ssd
+        WHERE motherboard_id = ANY(p_motherboard_ids) OR ssd_id = ANY(p_ssd_ids);
+    END IF;
+
+    INSERT INTO compat_edges.motherboard_ssd (motherboard_id, ssd_id)
+    SELECT ms.id, s.id
+    FROM motherboard_specs ms
+    JOIN ssd_specs s ON (s.form_factor = 'M.2-2280' AND ms.m2_slots IS NOT NULL)
+                     OR (s.interface LIKE '%SATA%' AND ms.sata_ports IS NOT NULL)
+    WHERE (p_motherboard_ids IS NULL AND p_ssd_ids IS NULL)
+       OR ms.id = ANY(p_motherboard_ids) OR s.id = ANY(p_ssd_ids);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION compat_edges.refresh_motherboard_case(p_motherboard_ids int[] DEFAULT NULL, p_case_ids int[] DEFAULT NULL)
+RETURNS void AS $$
+BEGIN
+    IF p_motherboard_ids IS NULL AND p_case_ids IS NULL THEN
+        TRUNCATE compat_edges.motherboard_case;
+    ELSE
+        DELETE FROM compat_edges.motherboard_case
+        WHERE motherboard_id = ANY(p_motherboard_ids) OR case_id = ANY(p_case_ids);
+    END IF;
+
+    INSERT INTO compat_edges.motherboard_case (motherboard_id, case_id)
+    SELECT ms.id, c.id
+    FROM motherboard_specs ms
+    JOIN case_specs c ON ms.form_factor = ANY(string_to_array(c.motherboard_form_factor, E'\n'))
+    WHERE (p_motherboard_ids IS NULL AND p_case_ids IS NULL)
+       OR ms.id = ANY(p_motherboard_ids) OR c.id = ANY(p_case_ids);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION compat_edges.refresh_gpu_case(p_gpu_ids int[] DEFAULT NULL, p_case_ids int[] DEFAULT NULL)
+RETURNS void AS $$
+BEGIN
+    IF p_gpu_ids IS NULL AND p_case_ids IS NULL THEN
+        TRUNCATE compat_edges.gpu_case;
+    ELSE
+        DELETE FROM compat_edges.gpu_case
+        WHERE gpu_id = ANY(p_gpu_ids) OR case_id = ANY(p_case_ids);
+    END IF;
+
+    INSERT INTO compat_edges.gpu_case (gpu_id, case_id)
+    SELECT g.id, c.id
+    FROM gpu_specs g
+    JOIN case_specs c
+      ON compat_edges.case_gpu_clearance_mm(c.maximum_video_card_length) >= compat_edges.gpu_length_mm(g.length)
+    WHERE (p_gpu_ids IS NULL AND p_case_ids IS NULL)
+       OR g.id = ANY(p_gpu_ids) OR c.id = ANY(p_case_ids);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION compat_edges.refresh_case_psu(p_case_ids int[] DEFAULT NULL, p_psu_ids int[] DEFAULT NULL)
+RETURNS void AS $$
+BEGIN
+    IF p_case_ids IS NULL AND p_psu_ids IS NULL THEN
+        TRUNCATE compat_edges.case_psu;
+    ELSE
+        DELETE FROM compat_edges.case_psu
+        WHERE case_id = ANY(p_case_ids) OR psu_id = ANY(p_psu_ids);
+    END IF;
+
+    INSERT INTO compat_edges.case_psu (case_id, psu_id)
+    SELECT c.id, p.id
+    FROM case_specs c
+    JOIN psu_specs p ON p.type = ANY(compat_edges.case_psu_types(c.type))
+    WHERE (p_case_ids IS NULL AND p_psu_ids IS NULL)
+       OR c.id = ANY(p_case_ids) OR p.id = ANY(p_psu_ids);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION compat_edges.refresh_all()
+RETURNS void AS $$
+BEGIN
+    PERFORM compat_edges.refresh_cpu_motherboard();
+    PERFORM compat_edges.refresh_cpu_cooler();
+    PERFORM compat_edges.refresh_motherboard_memory();
+    PERFORM compat_edges.refresh_motherboard_ssd();
+    PERFORM compat_edges.refresh_motherboard_case();
+    PERFORM compat_edges.refresh_gpu_case();
+    PERFORM compat_edges.refresh_case_psu();
+END;
+$$ LANGUAGE plpgsql;
+
+-- Refresh every edge table touching `p_table` for the given changed ids
+CREATE OR REPLACE FUNCTION compat_edges.refresh_for(p_table text, p_ids int[])
+RETURNS void AS $$
+BEGIN
+    IF p_ids IS NULL OR cardinality(p_ids) = 0 THEN
+        RETURN;
+    END IF;
+
+    CASE p_table
+        WHEN 'cpu_specs' THEN
+            PERFORM compat_edges.refresh_cpu_motherboard(p_ids, '{}');
+            PERFORM compat_edges.refresh_cpu_cooler(p_ids, '{}');
+        WHEN 'motherboard_specs' THEN
+            PERFORM compat_edges.refresh_cpu_motherboard('{}', p_ids);
+            PERFORM compat_edges.refresh_motherboard_memory(p_ids, '{}');
+            PERFORM compat_edges.refresh_motherboard_ssd(p_ids, '{}');
+            PERFORM compat_edges.refresh_motherboard_case(p_ids, '{}');
+        WHEN 'cooler_specs' THEN
+            PERFORM compat_edges.refresh_cpu_cooler('{}', p_ids);
+        WHEN 'gpu_specs' THEN
+            PERFORM compat_edges.refresh_gpu_case(p_ids, '{}');
+        WHEN 'memory_specs' THEN
+            PERFORM compat_edges.refresh_motherboard_memory('{}', p_ids);
+        WHEN 'ssd_specs' THEN
+            PERFORM compat_edges.refresh_motherboard_ssd('{}', p_ids);
+        WHEN 'case_specs' THEN
+            PERFORM compat_edges.refresh_motherboard_case('{}', p_ids);
+            PERFORM compat_edges.refresh_gpu_case('{}', p_ids);
+            PERFORM compat_edges.refresh_case_psu(p_ids, '{}');
+        WHEN 'psu_specs' THEN
+            PERFORM compat_edges.refresh_case_psu('{}', p_ids);
+    END CASE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Columns each compatibility rule reads; changes to any other column
+-- (rank, ml_score, price_num, ...) leave the edges untouched.
+CREATE OR REPLACE FUNCTION compat_edges.rule_columns(p_table text)
+RETURNS text[] AS $$
+    SELECT CASE p_table
+        WHEN 'cpu_specs' THEN ARRAY['socket']
+        WHEN 'motherboard_specs' THEN ARRAY['socket_cpu', 'memory_type', 'memory_speed',
+                                            'm2_slots', 'sata_ports', 'form_factor']
+        WHEN 'cooler_specs' THEN ARRAY['cpu_socket']
+        WHEN 'gpu_specs' THEN ARRAY['length']
+        WHEN 'memory_specs' THEN ARRAY['speed']
+        WHEN 'ssd_specs' THEN ARRAY['form_factor', 'interface']
+        WHEN 'case_specs' THEN ARRAY['type', 'motherboard_form_factor', 'maximum_video_card_length']
+        WHEN 'psu_specs' THEN ARRAY['type']
+        ELSE ARRAY[]::text[]
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- ---------- Triggers ----------
+
+CREATE OR REPLACE FUNCTION compat_edges.on_spec_change()
+RETURNS trigger AS $$
+DECLARE
+    v_ids int[];
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM compat_edges.refresh_all();
+        RETURN NULL;
+    ELSIF TG_OP = 'INSERT' THEN
+        SELECT array_agg(n.id) INTO v_ids FROM new_rows n;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(o.id) INTO v_ids FROM old_rows o;
+    ELSE
+        -- Only rows whose rule columns (or id) changed
+        SELECT array_agg(DISTINCT changed.id) INTO v_ids
+        FROM (
+            SELECT n.id
+            FROM new_rows n
+            LEFT JOIN old_rows o ON o.id = n.id
+            WHERE o.id IS NULL
+               OR EXISTS (
+                   SELECT 1 FROM unnest(compat_edges.rule_columns(TG_TABLE_NAME)) col
+                   WHERE to_jsonb(n) -> col IS DISTINCT FROM to_jsonb(o) -> col
+               )
+            UNION ALL
+            SELECT o.id
+            FROM old_rows o
+            LEFT JOIN new_rows n ON n.id = o.id
+            WHERE n.id IS NULL
+        ) changed;
+    END IF;
+
+    PERFORM compat_edges.refresh_for(TG_TABLE_NAME, v_ids);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t text;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['cpu_specs', 'motherboard_specs', 'cooler_specs', 'gpu_specs',
+                             'memory_specs', 'ssd_specs', 'case_specs', 'psu_specs'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS compat_edges_insert ON %I', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS compat_edges_update ON %I', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS compat_edges_delete ON %I', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS compat_edges_truncate ON %I', t);
+        EXECUTE format('CREATE TRIGGER compat_edges_insert AFTER INSERT ON %I '
+                       'REFERENCING NEW TABLE AS new_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION compat_edges.on_spec_change()', t);
+        EXECUTE format('CREATE TRIGGER compat_edges_update AFTER UPDATE ON %I '
+                       'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION compat_edges.on_spec_change()', t);
+        EXECUTE format('CREATE TRIGGER compat_edges_delete AFTER DELETE ON %I '
+                       'REFERENCING OLD TABLE AS old_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION compat_edges.on_spec_change()', t);
+        EXECUTE format('CREATE TRIGGER compat_edges_truncate AFTER TRUNCATE ON %I '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION compat_edges.on_spec_change()', t);
+    END LOOP;
+END $$;
+
+-- ---------- Edge-backed get_compatible_* ----------
+-- Same names and result columns as new_compatibility.sql, so putting
+-- compat_edges first on the search_path switches every caller over.
+--
+-- Unknown ids behave differently: these functions return no rows where the
+-- originals raise, and they skip the originals' other checks. In detail:
+--   get_compatible_motherboards, get_compatible_cpu_coolers: the originals
+--     raise for an unknown CPU or one without a socket.
+--   get_compatible_ram: the original raises for an unknown CPU or motherboard.
+--     Here cpu_id is not checked at all.
+--   get_compatible_case: the original raises for an unknown GPU or one whose
+--     length cannot be parsed.
+--   get_compatible_video_cards: the original's motherboard check never fires.
+--     For an unknown board it returns every GPU that fits an x1 slot.
+--   get_compatible_psu: the same applies to an unknown case, which gets ATX PSUs.
+--   get_compatible_ssd: the original returns no rows too.
+-- The recommender only passes ids of parts it has just selected, so builds
+-- are not affected.
+
+CREATE OR REPLACE FUNCTION compat_edges.get_compatible_motherboards(cpu_id int)
+RETURNS TABLE (
+    id int,
+    name text,
+    price text,
+    form_factor text,
+    socket_cpu text,
+    memory_max text,
+    memory_slots int,
+    memory_type text,
+    memory_speed text,
+    chipset text,
+    color text,
+    m2_slots text,
+    sata_ports text
+) AS $$
+    SELECT m.id, m.name, m.price, m.form_factor, m.socket_cpu,
+           m.memory_max, m.memory_slots, m.memory_type, m.memory_speed,
+           m.chipset, m.color, m.m2_slots, m.sata_ports
+    FROM compat_edges.cpu_motherboard e
+    JOIN motherboard_specs m ON m.id = e.motherboard_id
+    WHERE e.cpu_id = $1;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION compat_edges.get_compatible_cpu_coolers(cpu_id int)
+RETURNS TABLE (
+    id int,
+    name text,
+    price text,
+    fan_rpm text,
+    noise_level text,
+    color text,
+    radiator_size text,
+    height text,
+    cpu_socket text,
+    water_cooled boolean,
+    fanless boolean
+) AS $$
+    SELECT c.id, c.name, c.price, c.fan_rpm, c.noise_level, c.color,
+           c.radiator_size, c.height, c.cpu_socket, c.water_cooled, c.fanless
+    FROM compat_edges.cpu_cooler e
+    JOIN cooler_specs c ON c.id = e.cooler_id
+    WHERE e.cpu_id = $1;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION compat_edges.get_compatible_video_cards(mobo_id int)
+RETURNS TABLE (
+    id int,
+    name text,
+    price text,
+    chipset text,
+    memory text,
+    core_clock text,
+    boost_clock text,
+    color text,
+    length text,
+    tdp text,
+    interface text
+) AS $$
+    SELECT g.id, g.name, g.price, g.chipset, g.memory, g.core_clock,
+           g.boost_clock, g.color, g.length, g.tdp, g.interface
+    FROM motherboard_specs m
+    JOIN gpu_specs g ON compat_edges.gpu_fits_slot(g.interface, compat_edges.pcie_lanes(m.pci_slots))
+    WHERE m.id = $1;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION compat_edges.get_compatible_case(gpu_id int, mobo_id int)
+RETURNS TABLE (
+    id int,
+    name text,
+    price text,
+    type text,
+    color text,
+    power_supply text,
+    side_panel text,
+    motherboard_form_factor text,
+    maximum_video_card_length text
+) AS $$
+    SELECT c.id, c.name, c.price, c.type, c.color, c.power_supply,
+           c.side_panel, c.motherboard_form_factor, c.maximum_video_card_length
+    FROM compat_edges.gpu_case gc
+    JOIN compat_edges.motherboard_case mc ON mc.case_id = gc.case_id AND mc.motherboard_id = $2
+    JOIN case_specs c ON c.id = gc.case_id
+    WHERE gc.gpu_id = $1;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION compat_edges.get_compatible_psu(required_wattage int, case_id int)
+RETURNS TABLE (
+    id int,
+    name text,
+    price text,
+    type text,
+    efficiency_rating text,
+    wattage int,
+    modular text,
+    color text
+) AS $$
+    SELECT p.id, p.name, p.price, p.type, p.efficiency_rating,
+           p.wattage, p.modular, p.color
+    FROM compat_edges.case_psu e
+    JOIN psu_specs p ON p.id = e.psu_id
+    WHERE e.case_id = $2 AND p.wattage >= $1
+    ORDER BY p.wattage ASC;
+$$ LANGUAGE sql STABLE;
+
+-- cpu_id is accepted for signature compatibility; the RAM rule only depends on the motherboard
+CREATE OR REPLACE FUNCTION compat_edges.get_compatible_ram(mobo_id int, cpu_id int)
+RETURNS TABLE (
+    id int,
+    name text,
+    price text,
+    speed text,
+    modules text,
+    price_per_gb text,
+    color text,
+    first_word_latency text,
+    cas_latency text,
+    voltage text,
+    timing text,
+    ecc boolean,
+    heat_spreader boolean
+) AS $$
+    SELECT m.id, m.name, m.price, m.speed, m.modules, m.price_per_gb, m.color,
+           m.first_word_latency, m.cas_latency, m.voltage, m.timing, m.ecc, m.heat_spreader
+    FROM compat_edges.motherboard_memory e
+    JOIN memory_specs m ON m.id = e.memory_id
+    WHERE e.motherboard_id = $1;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION compat_edges.get_compatible_ssd(mobo_id int)
+RETURNS TABLE (
+    id int,
+    name text,
+    price numeric,
+    capacity int,
+    price_per_gb numeric,
+    type text,
+    cache text,
+    form_factor text,
+    interface text
+) AS $$
+    SELECT s.id, s.name, s.price, s.capacity, s.price_per_gb,
+           s.type, s.cache, s.form_factor, s.interface
+    FROM compat_edges.motherboard_ssd e
+    JOIN ssd_specs s ON s.id = e.ssd_id
+    WHERE e.motherboard_id = $1
+    ORDER BY s.price_per_gb ASC NULLS LAST;
+$$ LANGUAGE sql STABLE;
+
+-- Initial build
+SELECT compat_edges.refresh_all();
@@ -0,0 +1,68 @@
+-- db/normalized_columns.sql
+-- Typed numeric columns on the spec tables, parsed once when a row is written.
+--
+-- The selection queries used to parse text on every request: select_storage
+-- sorted ssd_specs on a CAST(REPLACE(...)) expression over capacity (a full
+-- scan and sort per request), and the PSU step pulled the digits out of the
+-- CPU and GPU tdp strings in Python. The columns below are STORED generated
+-- columns, so whichever import path writes a row also fills them, and an
+-- index can serve the ORDER BY.
+--
+--   ssd_specs.capacity_gb           '2 TB' -> 2000, '500GB' -> 500, else 0
+--   cpu_specs.tdp_w, gpu_specs.tdp_w '65 W' -> 65, NULL without digits
+--
+-- Each parser mirrors the expression it replaces, so orderings do not change.
+-- psu_specs.wattage is already an integer column and needs no twin. GPU length
+-- and memory speed/capacity are not stored: no selection query reads them (GPU
+-- fit is compat_edges.case_gpu, memory fit the DDR generation).
+-- Run after the spec tables exist (and again if one is rebuilt), then start
+-- the recommender with --normalized-columns.
+
+-- ---------- Parsers ----------
+
+-- Capacity CASE of the direct ssd_specs queries in select_storage
+CREATE OR REPLACE FUNCTION spec_capacity_gb(capacity_text text)
+RETURNS double precision AS $$
+    SELECT CASE
+        WHEN capacity_text LIKE '%TB'
+             AND replace(replace(capacity_text, 'TB', ''), ' ', '') ~ '^[0-9]+(\.[0-9]+)?$' THEN
+            replace(replace(capacity_text, 'TB', ''), ' ', '')::double precision * 1000
+        WHEN capacity_text LIKE '%GB'
+             AND replace(replace(capacity_text, 'GB', ''), ' ', '') ~ '^[0-9]+(\.[0-9]+)?$' THEN
+            replace(replace(capacity_text, 'GB', ''), ' ', '')::double precision
+        ELSE 0
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- All digits of the text, like ''.join(filter(str.isdigit, tdp)) in _psu_power_levels
+CREATE OR REPLACE FUNCTION spec_watts(watts_text text)
+RETURNS int AS $$
+    SELECT CASE
+        WHEN length(regexp_replace(watts_text, '[^0-9]', '', 'g')) BETWEEN 1 AND 9 THEN
+            regexp_replace(watts_text, '[^0-9]', '', 'g')::int
+        ELSE NULL
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- ---------- Columns ----------
+
+ALTER TABLE ssd_specs
+    ADD COLUMN IF NOT EXISTS capacity_gb double precision
+        GENERATED ALWAYS AS (spec_capacity_gb(capacity::text)) STORED;
+
+ALTER TABLE cpu_specs
+    ADD COLUMN IF NOT EXISTS tdp_w int
+        GENERATED ALWAYS AS (spec_watts(tdp::text)) STORED;
+
+ALTER TABLE gpu_specs
+    ADD COLUMN IF NOT EXISTS tdp_w int
+        GENERATED ALWAYS AS (spec_watts(tdp::text)) STORED;
+
+-- ---------- Indexes ----------
+
+-- Direct and last-resort storage queries: ORDER BY capacity_gb DESC, price_num
+CREATE INDEX IF NOT EXISTS idx_ssd_specs_capacity_gb_price
+    ON ssd_specs (capacity_gb DESC, price_num)
+    WHERE price_num > 0;
+
+ANALYZE cpu_specs, gpu_specs, memory_specs, ssd_specs;
@@ -0,0 +1,103 @@
+-- db/recommendation_indexes.sql
+-- Indexes for the access paths of PCRecommendationSystem.select_*.
+--
+-- Every selection query keeps only priced parts (price_num > 0), so all
+-- indexes are partial on that predicate. Two orderings are covered, one per
+-- evaluation mode of _get_order_by_clause:
+--   ML ranking on:  CASE WHEN "rank" IS NULL THEN 9999 ELSE "rank" END, price_num
+--   ML ranking off: price_num
+-- The rank expression is spelled exactly as in the queries so the planner
+-- can match it. cpu_specs and gpu_specs are also filtered on
+-- market_segment (plus manufacturer / brand when a platform is preferred),
+-- so those columns lead their indexes.
+--
+-- Joins from get_compatible_* results back to the specs tables use the
+-- primary keys. Check the plans with:
+--   python src/recommendation/verify_indexes.py --input src/recommendation/input.json
+
+-- ---------- CPU ----------
+CREATE INDEX IF NOT EXISTS idx_cpu_specs_segment_rank
+    ON cpu_specs (market_segment, (CASE WHEN "rank" IS NULL THEN 9999 ELSE "rank" END), price_num)
+    WHERE price_num > 0;
+CREATE INDEX IF NOT EXISTS idx_cpu_specs_segment_manufacturer_rank
+    ON cpu_specs (market_segment, manufacturer, (CASE WHEN "rank" IS NULL THEN 9999 ELSE "rank" END), price_num)
+    WHERE price_num > 0;
+CREATE INDEX IF NOT EXISTS idx_cpu_specs_segment_price
+    ON cpu_specs (market_segment, price_num)
+    WHERE price_num > 0;
+CREATE INDEX IF NOT EXISTS idx_cpu_specs_segment_manufacturer_price
+    ON cpu_specs (market_segment, manufacturer, price_num)
+    WHERE price_num > 0;
+CREATE INDEX IF NOT EXISTS idx_cpu_specs_price
+    ON cpu_specs (price_num)
+    WHERE price_num > 0;
+
+-- ---------- GPU ----------
+CREATE INDEX IF NOT EXISTS idx_gpu_specs_segment_rank
+    ON gpu_specs (market_segment, (CASE WHEN "rank" IS NULL THEN 9999 ELSE "rank" END), price_num)
+    WHERE price_num > 0;
+CREATE INDEX IF NOT EXISTS idx_gpu_specs_segment_brand_rank
+    ON gpu_specs (market_segment, brand, (CASE WHEN "rank" IS NULL THEN 9999 ELSE "rank" END), price_num)
+    WHERE price_num > 0;
+CREATE INDEX IF NOT EXISTS idx_gpu_specs_segment_price
+    ON gpu_specs (market_segment, price_num)
+    WHERE price_num > 0;
+CREATE INDEX IF NOT EXISTS idx_gpu_specs_segment_brand_price
+    ON gpu_specs (market_segment, brand, price_num)
+    WHERE price_num > 0;
+CREATE INDEX IF NOT EXISTS idx_gpu_specs_price
+    ON gpu_specs (price_num)
+    WHERE price_num > 0;
+
+-- ---------- Parts filtered by compatibility only ----------
+CREATE INDEX IF NOT EXISTS idx_motherboard_specs_rank
+    ON motherboard_specs ((CASE WHEN "rank" IS NULL THEN 9999 ELSE "rank" END), price_num)
+    WHERE price_num > 0;
+CREATE INDEX IF NOT EXISTS idx_motherboard_specs_price
+    ON motherboard_specs (price_num)
+    WHERE price_num > 0;
+
+CREATE INDEX IF NOT EXISTS idx_cooler_specs_rank
+    ON cooler_specs ((CASE WHEN "rank" IS NULL THEN 9999 ELSE "rank" END), price_num)
+    WHERE price_num > 0;
+CREATE INDEX IF NOT EXISTS idx_cooler_specs_price
+    ON cooler_specs (price_num)
+    WHERE price_num > 0;
+
+CREATE INDEX IF NOT EXISTS idx_memory_specs_rank
+    ON memory_specs ((CASE WHEN "rank" IS NULL THEN 9999 ELSE "rank" END), price_num)
+    WHERE price_num > 0;
+-- Memory last resort filters on type
+CREATE INDEX IF NOT EXISTS idx_memory_specs_type_price
+    ON memory_specs (type, price_num)
+    WHERE price_num > 0;
+CREATE INDEX IF NOT EXISTS idx_memory_specs_price
+    ON memory_specs (price_num)
+    WHERE price_num > 0;
+
+CREATE INDEX IF NOT EXISTS idx_case_specs_rank
+    ON case_specs ((CASE WHEN "rank" IS NULL THEN 9999 ELSE "rank" END), price_num)
+    WHERE price_num > 0;
+CREATE INDEX IF NOT EXISTS idx_case_specs_price
+    ON case_specs (price_num)
+    WHERE price_num > 0;
+
+-- PSU direct and last-resort queries add wattage >= %s; scanning in price
+-- order and stopping at the first row with enough wattage beats a range
+-- scan on wattage for LIMIT 1.
+CREATE INDEX IF NOT EXISTS idx_psu_specs_rank
+    ON psu_specs ((CASE WHEN "rank" IS NULL THEN 9999 ELSE "rank" END), price_num)
+    WHERE price_num > 0;
+CREATE INDEX IF NOT EXISTS idx_psu_specs_price
+    ON psu_specs (price_num) INCLUDE (wattage)
+    WHERE price_num > 0;
+
+-- ---------- Storage ----------
+-- Only price_num is indexed: the direct storage queries order by the parsed
+-- capacity, which no index on the text column can serve, and the
+-- get_compatible_ssd path sorts the function's own output.
+CREATE INDEX IF NOT EXISTS idx_ssd_specs_price
+    ON ssd_specs (price_num)
+    WHERE price_num > 0;
+
+ANALYZE cpu_specs, gpu_specs, motherboard_specs, cooler_specs, memory_specs, case_specs, psu_specs, ssd_specs;
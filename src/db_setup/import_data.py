@@ -1,6 +1,13 @@
+import io
+import re
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import psycopg2
 from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
 from typing import Dict, List
 import logging
 from pathlib import Path
@@ -9,13 +16,30 @@ from pathlib import Path
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Suffix of the tables a staged import loads before swapping them in
+STAGING_SUFFIX = '_staging'
+# How long the swap waits for running queries before giving up
+SWAP_LOCK_TIMEOUT = '10s'
+# Bumps the counter the recommender's caches watch (same statement as
+# catalog_snapshot.CATALOG_VERSION_SQL); runs in the transaction that changes the catalog
+CATALOG_VERSION_SQL = """
+    CREATE TABLE IF NOT EXISTS catalog_version (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        version BIGINT NOT NULL
+    );
+    INSERT INTO catalog_version (id, version) VALUES (TRUE, 1)
+    ON CONFLICT (id) DO UPDATE SET version = catalog_version.version + 1
+"""
+
 # Get the project root directory
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / 'data'
 
 class PCPartsDBImporter:
-    def __init__(self, db_params: Dict[str, str]):
+    def __init__(self, db_params: Dict[str, str], use_copy: bool = True, staged: bool = True):
         self.db_params = db_params
+        self.use_copy = use_copy  # COPY FROM STDIN instead of execute_values
+        self.staged = staged  # Load into staging tables and swap them in, instead of TRUNCATE
         self.conn = None
         self.cursor = None
 
@@ -48,7 +72,144 @@ class PCPartsDBImporter:
         
         return df
 
-    def import_csv_to_table(self, csv_path: Path, table_name: str, columns: List[str]):
+    def integer_columns(self, cursor, table_name: str) -> List[str]:
+        """Names of the integer-typed columns of a table"""
+        cursor.execute("""
+            SELECT column_name
+            FROM information_schema.columns
+            WHERE table_name = %s AND data_type IN ('smallint', 'integer', 'bigint')
+        """, (table_name,))
+        return [row[0] for row in cursor.fetchall()]
+
+    def copy_dataframe(self, cursor, df: pd.DataFrame, table_name: str, columns: List[str]):
+        """Stream a cleaned DataFrame into a table as CSV through COPY FROM STDIN"""
+        df = df[columns].copy()
+        
+        # Integer columns with gaps are read as floats ("6.0"), which COPY rejects
+        # for an integer column; INSERT rounded them through an assignment cast
+        for column in self.integer_columns(cursor, table_name):
+            if column in df.columns:
+                df[column] = pd.to_numeric(df[column]).round().astype('Int64')
+        
+        # Missing values become empty unquoted fields, which COPY reads as NULL
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    @staticmethod
+    def staging_table(table_name: str) -> str:
+        return f"{table_name}{STAGING_SUFFIX}"
+
+    @staticmethod
+    def _index_shape(index_definition: str) -> str:
+        """Index definition without its index and table names, to pair live and staging indexes"""
+        return re.sub(r'^(CREATE (?:UNIQUE )?INDEX) \S+ ON (?:ONLY )?\S+ ', r'\1 ON ', index_definition)
+
+    def _index_names(self, cursor, table_name: str) -> Dict[str, List[str]]:
+        """Index names of a table, grouped by _index_shape"""
+        cursor.execute("""
+            SELECT indexname, indexdef FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = %s
+            ORDER BY indexname
+        """, (table_name,))
+        names = {}
+        for index_name, definition in cursor.fetchall():
+            names.setdefault(self._index_shape(definition), []).append(index_name)
+        return names
+
+    def _foreign_keys(self, cursor, table_names: List[str]) -> List[tuple]:
+        """(table, constraint, definition) of every foreign key from or to one of the tables"""
+        cursor.execute("""
+            SELECT conrelid::regclass::text, confrelid::regclass::text, conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE contype = 'f' AND (conrelid = ANY(%s::regclass[]) OR confrelid = ANY(%s::regclass[]))
+            ORDER BY conrelid::regclass::text, conname
+        """, (list(table_names), list(table_names)))
+        return cursor.fetchall()
+
+    def swap_staging_tables(self, table_names: List[str]):
+        """Replace every table with its staging copy in a single transaction
+
+        Readers see either the complete old catalog or the complete new one. The
+        old tables are dropped without CASCADE, so a view depending on one makes
+        the swap fail and roll back instead of silently dropping the view.
+        LIKE ... INCLUDING ALL copies no foreign keys, so the ones from or to the
+        swapped tables are dropped and recreated against the new tables. Tables
+        referencing a swapped table (the *_compatibility tables) point at ids that
+        no longer exist and are emptied, as TRUNCATE ... CASCADE did before.
+        """
+        try:
+            with self.conn.cursor() as cursor:
+                # Fail instead of queueing every reader behind a long-running query
+                cursor.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+                foreign_keys = self._foreign_keys(cursor, table_names)
+                referencing = sorted({owner for owner, referenced, _, _ in foreign_keys
+                                      if owner not in table_names and referenced in table_names})
+                for table_name in sorted(set(table_names) | set(referencing)):
+                    cursor.execute(f"LOCK TABLE {table_name} IN ACCESS EXCLUSIVE MODE")
+
+                for owner, _, constraint, _ in foreign_keys:
+                    cursor.execute(f"ALTER TABLE {owner} DROP CONSTRAINT {constraint}")
+                if referencing:
+                    cursor.execute(f"TRUNCATE TABLE {', '.join(referencing)}")
+
+                for table_name in table_names:
+                    staging = self.staging_table(table_name)
+                    index_names = self._index_names(cursor, table_name)
+                    # Serial sequences are shared with the staging copy; keep them when the old table goes
+                    cursor.execute("""
+                        SELECT column_name, pg_get_serial_sequence(%s, column_name)
+                        FROM information_schema.columns
+                        WHERE table_name = %s AND pg_get_serial_sequence(%s, column_name) IS NOT NULL
+                    """, (table_name, table_name, table_name))
+                    for column, sequence in cursor.fetchall():
+                        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {staging}.{column}")
+
+                    cursor.execute(f"ALTER TABLE {table_name} RENAME TO {table_name}_old")
+                    cursor.execute(f"ALTER TABLE {staging} RENAME TO {table_name}")
+                    cursor.execute(f"DROP TABLE {table_name}_old")
+
+                    # Give the indexes (and their constraints) the names the live table used
+                    for shape, staging_names in self._index_names(cursor, table_name).items():
+                        live_names = index_names.get(shape, [])
+                        for index_name in staging_names:
+                            if live_names:
+                                new_name = live_names.pop(0)
+                            elif index_name.startswith(staging):
+                                new_name = f"{table_name}{index_name[len(staging):]}"
+                            else:
+                                continue
+                            if new_name != index_name:
+                                cursor.execute(f"ALTER INDEX {index_name} RENAME TO {new_name}")
+
+                # The definitions name the tables, which now resolve to the swapped-in copies
+                for owner, _, constraint, definition in foreign_keys:
+                    cursor.execute(f"ALTER TABLE {owner} ADD CONSTRAINT {constraint} {definition}")
+                cursor.execute(CATALOG_VERSION_SQL)
+            self.conn.commit()
+            logger.info(f"Swapped in {len(table_names)} staging tables"
+                        + (f", emptied {', '.join(referencing)}" if referencing else ""))
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error swapping in staging tables: {e}")
+            raise
+
+    def drop_staging_tables(self, table_names: List[str]):
+        with self.conn.cursor() as cursor:
+            for table_name in table_names:
+                cursor.execute(f"DROP TABLE IF EXISTS {self.staging_table(table_name)}")
+        self.conn.commit()
+
+    def import_csv_to_table(self, csv_path: Path, table_name: str, columns: List[str], conn=None) -> int:
+        """Replace the contents of a table with a CSV file; returns the number of rows imported
+
+        conn: connection to import on, defaults to the importer's own connection
+        When staged, the rows go into an empty copy of the table, which
+        swap_staging_tables() later puts in place; the live table is untouched.
+        """
+        conn = conn or self.conn
         try:
             logger.info(f"Reading CSV file: {csv_path}")
             df = pd.read_csv(csv_path)
@@ -57,31 +218,79 @@ class PCPartsDBImporter:
             df = self.clean_dataframe(df, columns)
             logger.info(f"Found {len(df)} unique entries after cleaning")
             
-            # Clear existing data from the table
-            self.cursor.execute(f"TRUNCATE TABLE {table_name} CASCADE")
-            self.conn.commit()
-            
-            # Convert DataFrame to list of tuples
-            data = [tuple(row) for row in df.values]
-            
-            # Create the INSERT query
-            insert_query = f"""
-                INSERT INTO {table_name} ({', '.join(columns)}) 
-                VALUES %s
-            """
-            
-            # Execute the insert
-            execute_values(self.cursor, insert_query, data)
-            self.conn.commit()
+            with conn.cursor() as cursor:
+                if self.staged:
+                    # Empty copy with the same columns, defaults, constraints and indexes
+                    target = self.staging_table(table_name)
+                    cursor.execute(f"DROP TABLE IF EXISTS {target}")
+                    cursor.execute(f"CREATE TABLE {target} (LIKE {table_name} INCLUDING ALL)")
+                else:
+                    # Clear existing data from the table
+                    target = table_name
+                    cursor.execute(f"TRUNCATE TABLE {table_name} CASCADE")
+                conn.commit()
+                
+                if self.use_copy:
+                    self.copy_dataframe(cursor, df, target, columns)
+                else:
+                    # Convert DataFrame to list of tuples
+                    data = [tuple(row) for row in df.values]
+                    
+                    # Create the INSERT query
+                    insert_query = f"""
+                        INSERT INTO {target} ({', '.join(columns)}) 
+                        VALUES %s
+                    """
+                    
+                    # Execute the insert
+                    execute_values(cursor, insert_query, data)
+                if not self.staged:
+                    # A staged import bumps the version when it swaps the tables in
+                    cursor.execute(CATALOG_VERSION_SQL)
+            conn.commit()
             
-            logger.info(f"Successfully imported {len(data)} rows into {table_name}")
+            logger.info(f"Successfully imported {len(df)} rows into {target}")
+            return len(df)
             
         except Exception as e:
-            self.conn.rollback()
+            conn.rollback()
             logger.error(f"Error importing data to {table_name}: {e}")
             raise
 
-    def process_all_files(self):
+    def _import_file(self, csv_file: str, table_name: str, columns: List[str], pool=None) -> Dict:
+        """Import one mapped file and time it; borrows a connection from `pool` when given"""
+        result = {'table': table_name, 'file': csv_file, 'rows': 0, 'seconds': 0.0, 'error': None, 'skipped': False}
+        csv_path = DATA_DIR / csv_file
+        if not csv_path.exists():
+            # The table keeps its current contents
+            logger.warning(f"CSV file not found: {csv_path}")
+            result['skipped'] = True
+            return result
+
+        logger.info(f"Processing {csv_file}...")
+        start = time.perf_counter()
+        conn = None
+        try:
+            conn = pool.getconn() if pool else None
+            result['rows'] = self.import_csv_to_table(csv_path, table_name, columns, conn)
+        except Exception as e:
+            # Recorded in the summary; the other files are still imported
+            logger.error(f"Error processing {csv_file}: {e}")
+            result['error'] = str(e)
+        finally:
+            if conn is not None:
+                pool.putconn(conn)
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+    def process_all_files(self, workers: int = 1) -> Dict:
+        """Import every mapped CSV file and return a summary
+
+        With workers > 1 the tables are imported concurrently, each on its own
+        connection from a pool of at most `workers` connections.
+        When staged, the new tables are swapped in together once every file
+        loaded; if any failed, nothing is swapped and the live catalog is kept.
+        """
         file_mappings = {
             'cpu.csv': ('cpu', ['name', 'price', 'core_count', 'core_clock', 'boost_clock', 'tdp', 'graphics', 'smt']),
             'motherboard.csv': ('motherboard', ['name', 'price', 'socket', 'form_factor', 'max_memory', 'memory_slots', 'color']),
@@ -93,20 +302,64 @@ class PCPartsDBImporter:
             'cpu-cooler.csv': ('cpu_cooler', ['name', 'price', 'rpm', 'noise_level', 'color', 'size'])
         }
 
-        for csv_file, (table_name, columns) in file_mappings.items():
+        start = time.perf_counter()
+        if workers > 1:
+            if not self.staged:
+                # Every load bumps catalog_version; create it first so they do not race to
+                with self.conn.cursor() as cursor:
+                    cursor.execute(CATALOG_VERSION_SQL)
+                self.conn.commit()
+            pool = ThreadedConnectionPool(1, min(workers, len(file_mappings)), **self.db_params)
             try:
-                csv_path = DATA_DIR / csv_file
-                if not csv_path.exists():
-                    logger.warning(f"CSV file not found: {csv_path}")
-                    continue
-                    
-                logger.info(f"Processing {csv_file}...")
-                self.import_csv_to_table(csv_path, table_name, columns)
-            except Exception as e:
-                logger.error(f"Error processing {csv_file}: {e}")
-                continue  # Continue with next file even if current one fails
+                with ThreadPoolExecutor(max_workers=min(workers, len(file_mappings))) as executor:
+                    results = list(executor.map(
+                        lambda item: self._import_file(item[0], *item[1], pool=pool), file_mappings.items()))
+            finally:
+                pool.closeall()
+        else:
+            results = [self._import_file(csv_file, table_name, columns)
+                       for csv_file, (table_name, columns) in file_mappings.items()]
+
+        loaded = [result['table'] for result in results if result['error'] is None and not result['skipped']]
+        failed = [result['table'] for result in results if result['error'] is not None]
+        swapped = False
+        if self.staged:
+            if failed:
+                logger.error(f"Not swapping in the new catalog, import failed for: {', '.join(failed)}")
+                self.drop_staging_tables(loaded)
+            else:
+                try:
+                    self.swap_staging_tables(loaded)
+                    swapped = True
+                except Exception:
+                    self.drop_staging_tables(loaded)
+
+        summary = {
+            'success': not failed and (swapped or not self.staged),
+            'swapped': swapped,
+            'tables': results,
+            'rows': sum(result['rows'] for result in results),
+            'failed': failed,
+            'seconds': time.perf_counter() - start
+        }
+        for result in results:
+            status = 'SKIPPED (file not found)' if result['skipped'] else (
+                'OK' if result['error'] is None else f"FAILED ({result['error']})")
+            logger.info(f"{result['table']:<16} {result['rows']:>7} rows {result['seconds']:>7.2f}s  {status}")
+        logger.info(f"Imported {summary['rows']} rows into {len(loaded)}/{len(results)} "
+                    f"tables in {summary['seconds']:.2f}s")
+        return summary
 
 def main():
+    parser = argparse.ArgumentParser(description='Import the PC parts CSV files into PostgreSQL')
+    parser.add_argument('--insert', action='store_true',
+                        help='Insert with execute_values instead of COPY FROM STDIN')
+    parser.add_argument('--in-place', action='store_true',
+                        help='TRUNCATE and reload the live tables instead of swapping in staging tables')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Import this many tables concurrently, each on its own connection')
+    args = parser.parse_args()
+
     # Database connection parameters
     db_params = {
         'dbname': 'pc_builder',
@@ -116,15 +369,21 @@ def main():
         'port': '5432'
     }
 
-    importer = PCPartsDBImporter(db_params)
+    importer = PCPartsDBImporter(db_params, use_copy=not args.insert, staged=not args.in_place)
     
     try:
         importer.connect()
-        importer.process_all_files()
+        summary = importer.process_all_files(workers=args.workers)
     except Exception as e:
         logger.error(f"Import process failed: {e}")
+        return 1
     finally:
         importer.close()
+    if not summary['success']:
+        logger.error("Import finished with errors; the live catalog was not replaced" if importer.staged
+                     else "Import finished with errors")
+        return 1
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,129 @@
+# filename: beam_search.py
+"""
+Top-K beam search over whole builds for PCRecommendationSystem.
+
+The greedy build keeps only results[0] of every selection step, although the
+queries already fetch up to 5 (10 for GPUs) ranked candidates, and at least
+`beam_width` once it is above that (PCRecommendationSystem._candidate_limit).
+This builder keeps the best `beam_width` partial builds after every stage
+instead, expanding each of them with the candidates its select_* call returned.
+
+Stage results are memoized on the ids of the parts the stage depends on
+(e.g. memory on motherboard and CPU), so partial builds sharing those parts
+share one select_* call. With beam_width=1 the builder reproduces the greedy
+picks as long as the build stays within budget.
+"""
+import logging
+import numpy as np
+
+# (component type, select method, component types the selection reads)
+STAGES = [
+    ("cpu", "select_cpu", ()),
+    ("motherboard", "select_motherboard", ("cpu",)),
+    ("cooler", "select_cooler", ("cpu",)),
+    ("memory", "select_memory", ("motherboard", "cpu")),
+    ("gpu", "select_gpu", ("motherboard", "cpu")),
+    ("case", "select_case", ("gpu", "motherboard")),
+    ("psu", "select_psu", ("cpu", "gpu", "case")),
+    ("storage", "select_storage", ("motherboard",)),
+]
+
+
+class BeamSearchBuilder:
+    def __init__(self, system, beam_width=4):
+        if beam_width < 1:
+            raise ValueError(f"beam_width must be at least 1, got {beam_width}")
+        self.system = system
+        self.beam_width = beam_width
+        self.budget_usd = system.user_prefs["budget"] * system.inr_to_usd
+        self._stage_cache = {}
+        self.select_calls = 0
+
+    @staticmethod
+    def _price(component):
+        price = component.get("price_num")
+        try:
+            return float(price) if price is not None else 0.0
+        except (TypeError, ValueError):
+            return 0.0
+
+    def _quality(self, candidates):
+        """
+        Per-candidate quality in [0, 1]. ML mode uses ml_score relative to the best
+        candidate; price-only mode (or no scores) uses the position in the ranked list,
+        so the first candidate always scores highest like the greedy pick.
+        """
+        n = len(candidates)
+        position = 1.0 - np.arange(n) / n
+        if not self.system.use_ml_ranking:
+            return position
+        scores = np.array([float(c.get("ml_score") or 0) for c in candidates])
+        if scores.max() <= 0:
+            return position
+        quality = np.clip(scores / scores.max(), 0.0, 1.0)
+        # The list is ordered by rank; never let a later candidate outscore an earlier one
+        quality = np.minimum.accumulate(quality)
+        # Keep the list order on ties so the greedy pick wins
+        return quality + position * 1e-6
+
+    def _expand(self, components, component_type, method, depends_on):
+        """Candidates for one stage given a partial build, memoized on the parts it reads"""
+        key = (component_type,) + tuple(components[dep].get("id") if dep in components else None for dep in depends_on)
+        if key not in self._stage_cache:
+            system = self.system
+            system.selected_components = dict(components)
+            system.candidates.pop(component_type, None)
+            self.select_calls += 1
+            try:
+                pick = getattr(system, method)()
+                self._stage_cache[key] = system.candidates.get(component_type) or [pick]
+            except Exception as e:
+                # Placeholders (e.g. "ERROR - No Cooler Found") are stored before raising
+                self._stage_cache[key] = e
+        return self._stage_cache[key]
+
+    def run(self):
+        """Run the search, leave the best build in system.selected_components and return it"""
+        system = self.system
+        system.record_candidates = True
+        beams = [({}, 0.0, 0.0)]  # (components, score, cost_usd)
+        try:
+            for component_type, method, depends_on in STAGES:
+                weight = system.budget_allocation.get(component_type, 0.0)
+                expansions = []
+                scores, costs = [], []
+                last_error = None
+                for components, score, cost in beams:
+                    candidates = self._expand(components, component_type, method, depends_on)
+                    if isinstance(candidates, Exception):
+                        last_error = candidates
+                        continue
+                    quality = self._quality(candidates)
+                    prices = np.array([self._price(c) for c in candidates])
+                    for candidate in candidates:
+                        expansions.append((components, candidate))
+                    scores.append(score + weight * quality)
+                    costs.append(cost + prices)
+
+                if not expansions:
+                    raise last_error or Exception(f"No {component_type} candidates for any partial build")
+
+                scores = np.concatenate(scores)
+                costs = np.concatenate(costs)
+                # Builds within budget first, best score first; over-budget ones closest to budget first
+                over = costs > self.budget_usd
+                order = np.lexsort((np.where(over, costs, -scores), over))[:self.beam_width]
+                beams = []
+                for i in order:
+                    components, candidate = expansions[i]
+                    beams.append(({**components, component_type: candidate}, float(scores[i]), float(costs[i])))
+                logging.debug(f"Beam - {component_type}: {len(expansions)} expansions, kept {len(beams)}, "
+                              f"best score {beams[0][1]:.3f} at ${beams[0][2]:.2f}")
+        finally:
+            system.record_candidates = False
+
+        best_components, best_score, best_cost = beams[0]
+        system.selected_components = dict(best_components)
+        logging.info(f"Beam search (width {self.beam_width}) picked build with score {best_score:.3f} "
+                     f"at ${best_cost:.2f} using {self.select_calls} select calls")
+        return system.selected_components
@@ -0,0 +1,65 @@
+# filename: benchmark_ranking_models.py
+"""
+Benchmark of the ranking model backends on the real spec tables.
+
+For every component type and backend (see ml_component_ranking.build_pipeline)
+the table is fetched and prepared once, then each backend is fitted on the same
+80/20 split. Fit time, predict time and test MAE are reported per component
+and saved as JSON. No model files are written.
+
+Usage:
+  python benchmark_ranking_models.py --backends gbr hist linear --output ranking_benchmark.json
+"""
+import json
+import time
+import argparse
+import psycopg2
+from ml_component_ranking import (DB_CONFIG, COMPONENTS, MODEL_BACKENDS, fetch_component_frame,
+                                  training_data, fit_and_evaluate)
+
+
+def benchmark_component(conn, component_type, backends, repeats=1):
+    """Metrics of every backend for one component type, best fit time of `repeats` runs"""
+    _, prepare = COMPONENTS[component_type]
+    features = prepare(fetch_component_frame(conn, component_type))
+    X, y = training_data(features, 'price_num')
+
+    results = []
+    for backend in backends:
+        runs = [fit_and_evaluate(X, y, backend)[1] for _ in range(repeats)]
+        best = min(runs, key=lambda metrics: metrics['fit_s'])
+        best['features'] = X.shape[1]
+        results.append(best)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ranking model backends')
+    parser.add_argument('--backends', nargs='+', choices=MODEL_BACKENDS, default=MODEL_BACKENDS)
+    parser.add_argument('--components', nargs='+', choices=list(COMPONENTS), default=list(COMPONENTS))
+    parser.add_argument('--repeats', type=int, default=1, help='Fits per backend, the fastest is reported')
+    parser.add_argument('--output', type=str, default='ranking_benchmark.json', help='JSON report path')
+    args = parser.parse_args()
+
+    report = {'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'components': {}}
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        for component_type in args.components:
+            results = benchmark_component(conn, component_type, args.backends, args.repeats)
+            report['components'][component_type] = results
+    finally:
+        conn.close()
+
+    print(f"{'component':<12} {'backend':<8} {'rows':>7} {'fit s':>9} {'predict s':>10} {'MAE':>10}")
+    for component_type, results in report['components'].items():
+        for metrics in results:
+            print(f"{component_type:<12} {metrics['backend']:<8} {metrics['train_rows'] + metrics['test_rows']:>7} "
+                  f"{metrics['fit_s']:>9.3f} {metrics['predict_s']:>10.4f} {metrics['mae']:>10.4f}")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
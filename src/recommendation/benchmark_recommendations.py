@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+"""
+End-to-end benchmark of PCRecommendationSystem on synthetic catalog sizes.
+
+For every scale factor K > 1 the spec tables are copied into a schema
+bench_<K>x with K copies of each row (new ids, a " (synthetic N)" name suffix
+and prices jittered by up to +/-5%), indexes included. Builds at that scale run
+with search_path = bench_<K>x, public, so the compatibility functions in public
+read the scaled tables. Scale 1 uses the live tables as they are.
+
+The profiles of evaluation/input_data.json are replayed at each concurrency
+level. The report covers:
+  - build latency p50/p95/p99 and builds per second
+  - queries per build
+  - per select_* stage: latency percentiles, queries per call and calls per second
+It is saved as JSON; --compare prints the latency change against an earlier report.
+
+Usage:
+  python benchmark_recommendations.py --scales 1 10 100 --concurrency 1 4 16 --output recommendation_benchmark.json
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from data_connection import connect_to_db
+from connection_pool import ConnectionPool
+from catalog_snapshot import SNAPSHOT_TABLES
+from recommendation_system import PCRecommendationSystem
+from verify_indexes import RecordingCursor, SELECT_STEPS
+from evaluation_runner import DEFAULT_PROFILES
+
+
+# ---------- Synthetic catalogs ----------
+
+def bench_schema(scale):
+    return "public" if scale == 1 else f"bench_{scale}x"
+
+
+def _copy_expressions(cursor, table):
+    """(columns, select expressions) copying `table` with per-copy ids, names and prices"""
+    cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+    """, (table,))
+    columns = [row[0] for row in cursor.fetchall()]
+    expressions = []
+    for column in columns:
+        if column == "id":
+            expressions.append("t.id + copy_no * stride.size")
+        elif column == "name":
+            expressions.append("CASE WHEN copy_no = 0 THEN t.name ELSE t.name || ' (synthetic ' || copy_no || ')' END")
+        elif column == "price_num":
+            # Deterministic +/-5% jitter so copies do not tie with the original on price
+            expressions.append("CASE WHEN copy_no = 0 THEN t.price_num ELSE round((t.price_num * "
+                               "(0.95 + (abs(hashtext(t.id::text || ':' || copy_no)) % 1001) / 10000.0))::numeric, 2) END")
+        else:
+            expressions.append(f't."{column}"')
+    return [f'"{column}"' for column in columns], expressions
+
+
+def seed_scale(conn, scale, reseed=False):
+    """Create bench_<scale>x with `scale` copies of every spec table; returns row counts"""
+    schema = bench_schema(scale)
+    with conn.cursor() as cursor:
+        if scale > 1:
+            cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+            for table in SNAPSHOT_TABLES.values():
+                cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (f"{schema}.{table}",))
+                if cursor.fetchone()[0] and not reseed:
+                    continue
+                logging.info(f"Seeding {schema}.{table} ({scale}x)")
+                columns, expressions = _copy_expressions(cursor, table)
+                cursor.execute(f"DROP TABLE IF EXISTS {schema}.{table}")
+                cursor.execute(f"CREATE TABLE {schema}.{table} (LIKE public.{table} INCLUDING ALL)")
+                cursor.execute(f"""
+                    INSERT INTO {schema}.{table} ({', '.join(columns)})
+                    SELECT {', '.join(expressions)}
+                    FROM public.{table} t
+                    CROSS JOIN (SELECT COALESCE(MAX(id), 0) + 1 AS size FROM public.{table}) stride
+                    CROSS JOIN generate_series(0, %s) AS copy_no
+                """, (scale - 1,))
+                cursor.execute(f"ANALYZE {schema}.{table}")
+        counts = {}
+        for component_type, table in SNAPSHOT_TABLES.items():
+            cursor.execute(f"SELECT COUNT(*) FROM {schema}.{table}")
+            counts[component_type] = cursor.fetchone()[0]
+    conn.commit()
+    return counts
+
+
+def scale_pool(scale, size):
+    """Connection pool whose sessions resolve the spec tables in bench_<scale>x"""
+    schema = bench_schema(scale)
+
+    def connect():
+        conn = connect_to_db()
+        if schema != "public":
+            with conn.cursor() as cursor:
+                cursor.execute(f"SET search_path = {schema}, public")
+            conn.commit()
+        return conn
+    return ConnectionPool(connect=connect, min_size=size, max_size=size)
+
+
+# ---------- Instrumented builds ----------
+
+def timed_build(pool, preferences):
+    """Build one profile; returns (seconds, queries, {step: (seconds, queries)}, ok)"""
+    rec_system = None
+    log = []
+    stages = {}
+    try:
+        rec_system = PCRecommendationSystem(preferences=preferences, pool=pool)
+        recorder = RecordingCursor(rec_system.cursor, log)
+        rec_system.cursor = recorder
+        for step in SELECT_STEPS:
+            original = getattr(rec_system, step)
+
+            def staged(original=original, step=step):
+                recorder.stage = step
+                queries_before = len(log)
+                start = time.perf_counter()
+                try:
+                    return original()
+                finally:
+                    stages[step] = (time.perf_counter() - start, len(log) - queries_before)
+                    recorder.stage = None
+            setattr(rec_system, step, staged)
+
+        start = time.perf_counter()
+        recommendation = rec_system.build_recommendation()
+        seconds = time.perf_counter() - start
+        rec_system.cursor = recorder._cursor
+    finally:
+        if rec_system is not None:
+            rec_system.close()
+    return seconds, len(log), stages, "error" not in recommendation
+
+
+def percentiles(values):
+    if not values:
+        return {"p50_s": None, "p95_s": None, "p99_s": None, "mean_s": None}
+    values = np.array(values)
+    return {
+        "p50_s": float(np.percentile(values, 50)),
+        "p95_s": float(np.percentile(values, 95)),
+        "p99_s": float(np.percentile(values, 99)),
+        "mean_s": float(values.mean()),
+    }
+
+
+def run_load(pool, profiles, concurrency, repeats):
+    """Replay profiles `repeats` times with `concurrency` builds in flight"""
+    jobs = [prefs for _ in range(repeats) for prefs in profiles]
+    samples = []
+    lock = threading.Lock()
+
+    def run(prefs):
+        try:
+            sample = timed_build(pool, prefs)
+        except Exception as e:
+            logging.error(f"Benchmark build failed: {e}")
+            sample = None
+        with lock:
+            samples.append(sample)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run, jobs))
+    wall = time.perf_counter() - start
+
+    finished = [sample for sample in samples if sample is not None]
+    succeeded = sum(1 for sample in finished if sample[3])
+    result = {
+        "concurrency": concurrency,
+        "builds": len(jobs),
+        "errors": len(jobs) - succeeded,
+        "wall_s": wall,
+        "builds_per_s": succeeded / wall if wall else 0.0,
+        "latency": percentiles([sample[0] for sample in finished]),
+        "queries_per_build": float(np.mean([sample[1] for sample in finished])) if finished else None,
+        "stages": {},
+    }
+    for step in SELECT_STEPS:
+        timings = [sample[2][step] for sample in finished if step in sample[2]]
+        result["stages"][step] = {
+            "calls": len(timings),
+            "calls_per_s": len(timings) / wall if wall else 0.0,
+            "queries_per_call": float(np.mean([queries for _, queries in timings])) if timings else None,
+            **percentiles([seconds for seconds, _ in timings]),
+        }
+    return result
+
+
+# ---------- Report ----------
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def print_report(report):
+    print(f"{'scale':<6} {'conc':>5} {'builds/s':>9} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'queries':>8}")
+    for scale, entry in report["scales"].items():
+        for run in entry["runs"]:
+            latency = run["latency"]
+            if latency["p50_s"] is None:
+                print(f"{scale:<6} {run['concurrency']:>5}  no successful builds")
+                continue
+            print(f"{scale:<6} {run['concurrency']:>5} {run['builds_per_s']:>9.2f} {latency['p50_s']:>8.3f} "
+                  f"{latency['p95_s']:>8.3f} {latency['p99_s']:>8.3f} {run['queries_per_build']:>8.1f}")
+
+
+def compare_reports(report, baseline):
+    """Print the p50/p95/p99 change of every (scale, concurrency) present in both reports"""
+    print(f"\nAgainst {baseline.get('git_commit') or 'baseline'} ({baseline.get('created_at')}):")
+    for scale, entry in report["scales"].items():
+        old_runs = {run["concurrency"]: run for run in baseline.get("scales", {}).get(scale, {}).get("runs", [])}
+        for run in entry["runs"]:
+            old = old_runs.get(run["concurrency"])
+            if not old:
+                continue
+            changes = []
+            for key in ("p50_s", "p95_s", "p99_s"):
+                new_value, old_value = run["latency"][key], old["latency"][key]
+                if new_value is None or not old_value:
+                    changes.append(f"{key[:3]} n/a")
+                else:
+                    changes.append(f"{key[:3]} {(new_value - old_value) / old_value * 100:+.1f}%")
+            print(f"  {scale:<6} conc {run['concurrency']:>3}: {', '.join(changes)}")
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Benchmark recommendation builds on synthetic catalog sizes')
+    parser.add_argument('--input', type=str, default=DEFAULT_PROFILES, help='JSON array of preference profiles')
+    parser.add_argument('--scales', nargs='+', type=int, default=[1, 10, 100], help='Catalog scale factors')
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 4, 16], help='Builds in flight')
+    parser.add_argument('--repeats', type=int, default=1, help='Times each profile is replayed per run')
+    parser.add_argument('--reseed', action='store_true', help='Rebuild existing bench_<K>x schemas')
+    parser.add_argument('--output', type=str, default='recommendation_benchmark.json', help='JSON report path')
+    parser.add_argument('--compare', type=str, help='Earlier report to compare latencies against')
+    args = parser.parse_args()
+
+    with open(args.input) as f:
+        profiles = json.load(f)
+
+    report = {"created_at": time.strftime('%Y-%m-%dT%H:%M:%S'), "git_commit": git_commit(),
+              "profiles": len(profiles), "repeats": args.repeats, "scales": {}}
+
+    for scale in args.scales:
+        conn = connect_to_db()
+        try:
+            rows = seed_scale(conn, scale, reseed=args.reseed)
+        finally:
+            conn.close()
+        pool = scale_pool(scale, max(args.concurrency))
+        try:
+            # One untimed pass so plans and caches are warm before measuring
+            run_load(pool, profiles[:1], 1, 1)
+            runs = [run_load(pool, profiles, concurrency, args.repeats) for concurrency in args.concurrency]
+        finally:
+            pool.close()
+        report["scales"][f"{scale}x"] = {"schema": bench_schema(scale), "rows": rows, "runs": runs}
+
+    print_report(report)
+    if args.compare:
+        with open(args.compare) as f:
+            compare_reports(report, json.load(f))
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
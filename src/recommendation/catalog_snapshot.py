@@ -0,0 +1,965 @@
+# filename: catalog_snapshot.py
+"""
+In-memory catalog snapshot for PCRecommendationSystem.
+
+Loads the eight component spec tables once into columnar numpy arrays and
+answers every selection step (compatibility function, budget ladder, cheapest
+and last resort queries) from memory instead of issuing SQL round trips.
+
+The compatibility rules mirror the plpgsql functions in db/new_compatibility.sql
+and the ordering mirrors PCRecommendationSystem._get_order_by_clause, so a
+system built with a snapshot picks the same parts as the SQL path. Ties in the
+ORDER BY (same rank and price) are broken by id here, where PostgreSQL leaves
+them unspecified.
+"""
+import re
+import time
+import logging
+import numpy as np
+
+# Tables loaded into the snapshot, keyed by the component type used in the system
+SNAPSHOT_TABLES = {
+    "cpu": "cpu_specs",
+    "motherboard": "motherboard_specs",
+    "cooler": "cooler_specs",
+    "memory": "memory_specs",
+    "gpu": "gpu_specs",
+    "storage": "ssd_specs",
+    "case": "case_specs",
+    "psu": "psu_specs"
+}
+
+# Columns returned by the compatibility functions (RETURNS TABLE in new_compatibility.sql)
+COMPAT_FUNCTION_COLUMNS = {
+    "motherboard": ["id", "name", "price", "form_factor", "socket_cpu", "memory_max", "memory_slots",
+                    "memory_type", "memory_speed", "chipset", "color", "m2_slots", "sata_ports"],
+    "cooler": ["id", "name", "price", "fan_rpm", "noise_level", "color", "radiator_size", "height",
+               "cpu_socket", "water_cooled", "fanless"],
+    "gpu": ["id", "name", "price", "chipset", "memory", "core_clock", "boost_clock", "color", "length",
+            "tdp", "interface"],
+    "case": ["id", "name", "price", "type", "color", "power_supply", "side_panel",
+             "motherboard_form_factor", "maximum_video_card_length"],
+    "psu": ["id", "name", "price", "type", "efficiency_rating", "wattage", "modular", "color"],
+    "memory": ["id", "name", "price", "speed", "modules", "price_per_gb", "color", "first_word_latency",
+               "cas_latency", "voltage", "timing", "ecc", "heat_spreader"],
+    "storage": ["id", "name", "price", "capacity", "price_per_gb", "type", "cache", "form_factor", "interface"]
+}
+
+# Single-row counter bumped in the same transaction as every catalog write
+# (db_setup/import_data.py keeps its own copy of this statement)
+CATALOG_VERSION_SQL = """
+    CREATE TABLE IF NOT EXISTS catalog_version (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        version BIGINT NOT NULL
+    );
+    INSERT INTO catalog_version (id, version) VALUES (TRUE, 1)
+    ON CONFLICT (id) DO UPDATE SET version = catalog_version.version + 1
+"""
+
+_NUMBER_RE = re.compile(r'([0-9]+(\.[0-9]+)?)')
+_DDR_SPEED_RE = re.compile(r'DDR[2-5]-([0-9]+)')
+
+
+class CompatibilityError(Exception):
+    """Raised where the equivalent plpgsql function would RAISE EXCEPTION"""
+
+
+def _is_null(value):
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def _to_float(value):
+    """Convert a database value to float, mapping NULL/unparseable values to NaN"""
+    if _is_null(value):
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _ddr_version(text):
+    """Mirror of the CASE ... LIKE '%DDRn%' blocks in get_compatible_ram"""
+    if _is_null(text):
+        return 0
+    text = str(text)
+    for version in (5, 4, 3, 2):
+        if f"DDR{version}" in text:
+            return version
+    return 0
+
+
+def _length_to_mm(text, inch_marker):
+    """Mirror of the regexp_match length parsing used by get_compatible_case"""
+    if _is_null(text):
+        return np.nan
+    text = str(text)
+    match = _NUMBER_RE.search(text)
+    if not match:
+        return np.nan
+    value = float(match.group(1))
+    if re.search(r'([0-9]+(\.[0-9]+)?).*mm', text):
+        return value
+    if re.search(r'([0-9]+(\.[0-9]+)?).*' + inch_marker, text):
+        return value * 25.4
+    return value
+
+
+def _storage_capacity_gb(value):
+    """Mirror of the capacity CASE expression in the direct ssd_specs queries"""
+    if _is_null(value):
+        return 0.0
+    text = str(value)
+    try:
+        if text.endswith('TB'):
+            return float(text.replace('TB', '').replace(' ', '')) * 1000
+        if text.endswith('GB'):
+            return float(text.replace('GB', '').replace(' ', ''))
+    except ValueError:
+        return 0.0
+    return 0.0
+
+
+class SnapshotTable:
+    """Columnar copy of one spec table"""
+
+    def __init__(self, name, columns, rows):
+        self.name = name
+        self.columns = list(columns)
+        self.size = len(rows)
+        self.data = {}
+        for pos, column in enumerate(self.columns):
+            values = np.empty(self.size, dtype=object)
+            for i, row in enumerate(rows):
+                values[i] = row[pos]
+            self.data[column] = values
+
+        self.ids = np.array([int(v) for v in self.data["id"]], dtype=np.int64) if self.size else np.empty(0, dtype=np.int64)
+        self.position = {int(row_id): i for i, row_id in enumerate(self.ids)}
+        self.price_num = self._float_column("price_num")
+        # NULL ranks sort as 9999, as in _get_order_by_clause
+        rank = self._float_column("rank")
+        self.rank_key = np.where(np.isnan(rank), 9999.0, rank)
+
+    def _float_column(self, column):
+        if column not in self.data:
+            return np.full(self.size, np.nan)
+        return np.array([_to_float(v) for v in self.data[column]], dtype=float)
+
+    def column(self, column):
+        """Return a column, raising like PostgreSQL would for an unknown column"""
+        if column not in self.data:
+            raise KeyError(f'column "{column}" does not exist in {self.name}')
+        return self.data[column]
+
+    def row(self, pos):
+        return {column: self.data[column][pos] for column in self.columns}
+
+    def find(self, row_id):
+        """Position of the row with the given id, or None"""
+        if row_id is None:
+            return None
+        return self.position.get(int(row_id))
+
+    def all_positions(self):
+        return np.arange(self.size)
+
+
+class CatalogSnapshot:
+    """Immutable in-memory copy of the component catalog"""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.loaded_at = time.time()
+        # Compatibility results keyed by (function, args); the snapshot never changes,
+        # so every build sharing it reuses the same lookups
+        self._compat_cache = {}
+        self._build_compat_indexes()
+
+    @classmethod
+    def load(cls, conn):
+        """Load every snapshot table with one SELECT * each"""
+        start = time.perf_counter()
+        tables = {}
+        with conn.cursor() as cursor:
+            for component_type, table_name in SNAPSHOT_TABLES.items():
+                cursor.execute(f"SELECT * FROM {table_name}")
+                rows = cursor.fetchall()
+                columns = [desc[0] for desc in cursor.description]
+                tables[component_type] = SnapshotTable(table_name, columns, rows)
+        try:
+            conn.rollback()  # Release the read transaction
+        except Exception as rb_err:
+            logging.debug(f"Snapshot load rollback failed: {rb_err}")
+        snapshot = cls(tables)
+        logging.info(f"Catalog snapshot loaded: {snapshot.part_count()} parts in {time.perf_counter() - start:.2f}s")
+        return snapshot
+
+    def table(self, component_type):
+        return self.tables[component_type]
+
+    def part_count(self):
+        return sum(t.size for t in self.tables.values())
+
+    # ---------- Precomputed compatibility keys ----------
+
+    def _build_compat_indexes(self):
+        mobo = self.tables["motherboard"]
+        self._mobo_socket = mobo.data.get("socket_cpu", np.empty(mobo.size, dtype=object))
+
+        cooler = self.tables["cooler"]
+        self._cooler_sockets = [
+            set(str(v).split('\n')) if not _is_null(v) else set()
+            for v in cooler.data.get("cpu_socket", [None] * cooler.size)
+        ]
+
+        gpu = self.tables["gpu"]
+        # get_compatible_video_cards accepts NULL/empty interfaces and anything mentioning PCIe,
+        # whatever the motherboard's lane count (every PCIe x16/x8/x4 interface also matches '%PCIe%')
+        self._gpu_interface_ok = np.array([
+            _is_null(v) or str(v) == '' or 'PCIe' in str(v)
+            for v in gpu.data.get("interface", [None] * gpu.size)
+        ], dtype=bool)
+        self._gpu_length_mm = np.array([
+            _length_to_mm(v, 'in') for v in gpu.data.get("length", [None] * gpu.size)
+        ], dtype=float)
+
+        case = self.tables["case"]
+        self._case_max_gpu_mm = np.array([
+            _length_to_mm(v, '"') for v in case.data.get("maximum_video_card_length", [None] * case.size)
+        ], dtype=float)
+        self._case_form_factors = [
+            set(str(v).split('\n')) if not _is_null(v) else set()
+            for v in case.data.get("motherboard_form_factor", [None] * case.size)
+        ]
+
+        psu = self.tables["psu"]
+        self._psu_type = psu.data.get("type", np.empty(psu.size, dtype=object))
+        self._psu_wattage = psu._float_column("wattage")
+
+        memory = self.tables["memory"]
+        speeds = memory.data.get("speed", [None] * memory.size)
+        self._memory_ddr = np.array([_ddr_version(v) for v in speeds], dtype=int)
+        self._memory_speed = [None if _is_null(v) else str(v) for v in speeds]
+        self._memory_speed_num = []
+        for v in self._memory_speed:
+            match = _DDR_SPEED_RE.search(v) if v else None
+            self._memory_speed_num.append(match.group(1) if match else None)
+
+        ssd = self.tables["storage"]
+        self._ssd_m2 = np.array([v == 'M.2-2280' for v in ssd.data.get("form_factor", [None] * ssd.size)], dtype=bool)
+        self._ssd_sata = np.array([
+            not _is_null(v) and 'SATA' in str(v) for v in ssd.data.get("interface", [None] * ssd.size)
+        ], dtype=bool)
+        self._ssd_capacity_num = ssd._float_column("capacity")
+        if "capacity_gb" in ssd.data:
+            # Parsed at write time by db/normalized_columns.sql
+            self._ssd_capacity_gb = np.nan_to_num(ssd._float_column("capacity_gb"))
+        else:
+            self._ssd_capacity_gb = np.array([_storage_capacity_gb(v) for v in ssd.data.get("capacity", [None] * ssd.size)], dtype=float)
+        self._ssd_price = ssd._float_column("price")
+
+    # ---------- Compatibility functions (mirror db/new_compatibility.sql) ----------
+
+    def _memoized(self, key, compute):
+        """Return the cached compatibility result for `key`, re-raising cached errors"""
+        cached = self._compat_cache.get(key)
+        if cached is None:
+            try:
+                cached = (compute(), None)
+            except CompatibilityError as e:
+                cached = (None, e)
+            self._compat_cache[key] = cached
+        result, error = cached
+        if error is not None:
+            raise error
+        return result
+
+    def compat_cache_size(self):
+        return len(self._compat_cache)
+
+    def _cpu_socket(self, cpu_id):
+        cpu = self.tables["cpu"]
+        pos = cpu.find(cpu_id)
+        socket = cpu.data["socket"][pos] if pos is not None and "socket" in cpu.data else None
+        return None if _is_null(socket) else socket
+
+    def _require(self, component_type, row_id, label):
+        pos = self.tables[component_type].find(row_id)
+        if pos is None:
+            raise CompatibilityError(f"{label} with ID {row_id} does not exist")
+        return pos
+
+    def compatible_motherboards(self, cpu_id):
+        return self._memoized(("compatible_motherboards", cpu_id), lambda: self._compatible_motherboards(cpu_id))
+
+    def _compatible_motherboards(self, cpu_id):
+        socket = self._cpu_socket(cpu_id)
+        if socket is None:
+            raise CompatibilityError(f"CPU with ID {cpu_id} not found or socket information missing")
+        return np.flatnonzero(self._mobo_socket == socket)
+
+    def compatible_coolers(self, cpu_id):
+        return self._memoized(("compatible_coolers", cpu_id), lambda: self._compatible_coolers(cpu_id))
+
+    def _compatible_coolers(self, cpu_id):
+        socket = self._cpu_socket(cpu_id)
+        if socket is None:
+            raise CompatibilityError(f"CPU socket not found for ID {cpu_id}")
+        return np.array([i for i, sockets in enumerate(self._cooler_sockets) if socket in sockets], dtype=int)
+
+    def compatible_video_cards(self, mobo_id):
+        return self._memoized(("compatible_video_cards", mobo_id), lambda: self._compatible_video_cards(mobo_id))
+
+    def _compatible_video_cards(self, mobo_id):
+        self._require("motherboard", mobo_id, "Motherboard")
+        return np.flatnonzero(self._gpu_interface_ok)
+
+    def compatible_cases(self, gpu_id, mobo_id):
+        return self._memoized(("compatible_cases", gpu_id, mobo_id), lambda: self._compatible_cases(gpu_id, mobo_id))
+
+    def _compatible_cases(self, gpu_id, mobo_id):
+        gpu_pos = self._require("gpu", gpu_id, "GPU")
+        mobo_pos = self._require("motherboard", mobo_id, "Motherboard")
+        gpu_length = self._gpu_length_mm[gpu_pos]
+        if np.isnan(gpu_length):
+            raise CompatibilityError(f"GPU length information is not available or not in expected format for GPU ID {gpu_id}")
+        form_factor = self.tables["motherboard"].data.get("form_factor", [None] * (mobo_pos + 1))[mobo_pos]
+        if _is_null(form_factor):
+            return np.empty(0, dtype=int)
+        with np.errstate(invalid='ignore'):
+            fits = self._case_max_gpu_mm >= gpu_length
+        return np.array([i for i in np.flatnonzero(fits) if form_factor in self._case_form_factors[i]], dtype=int)
+
+    def compatible_psus(self, required_wattage, case_id):
+        return self._memoized(("compatible_psus", required_wattage, case_id), lambda: self._compatible_psus(required_wattage, case_id))
+
+    def _compatible_psus(self, required_wattage, case_id):
+        case_pos = self._require("case", case_id, "Case")
+        case_type = self.tables["case"].data.get("type", [None] * (case_pos + 1))[case_pos]
+        case_type = "" if _is_null(case_type) else str(case_type)
+        if case_type.startswith('Mini ITX'):
+            allowed = ('SFX', 'Mini ITX')
+        elif case_type == 'HTPC':
+            allowed = ('TFX', 'Flex ATX')
+        else:
+            allowed = ('ATX',)
+        with np.errstate(invalid='ignore'):
+            mask = self._psu_wattage >= required_wattage
+        mask &= np.isin(self._psu_type, allowed)
+        return np.flatnonzero(mask)
+
+    def compatible_ram(self, mobo_id, cpu_id):
+        return self._memoized(("compatible_ram", mobo_id, cpu_id), lambda: self._compatible_ram(mobo_id, cpu_id))
+
+    def _compatible_ram(self, mobo_id, cpu_id):
+        self._require("cpu", cpu_id, "CPU")
+        mobo_pos = self._require("motherboard", mobo_id, "Motherboard")
+        mobo = self.tables["motherboard"]
+        mobo_ddr = _ddr_version(mobo.data.get("memory_type", [None] * (mobo_pos + 1))[mobo_pos])
+        mobo_speed = mobo.data.get("memory_speed", [None] * (mobo_pos + 1))[mobo_pos]
+        if mobo_ddr == 0 or _is_null(mobo_speed):
+            return np.empty(0, dtype=int)
+        mobo_speed = str(mobo_speed)
+        candidates = np.flatnonzero(self._memory_ddr == mobo_ddr)
+        return np.array([
+            i for i in candidates
+            if self._memory_speed[i] in mobo_speed
+            or (self._memory_speed_num[i] is not None and self._memory_speed_num[i] in mobo_speed)
+        ], dtype=int)
+
+    def compatible_ssds(self, mobo_id):
+        return self._memoized(("compatible_ssds", mobo_id), lambda: self._compatible_ssds(mobo_id))
+
+    def _compatible_ssds(self, mobo_id):
+        mobo_pos = self._require("motherboard", mobo_id, "Motherboard")
+        mobo = self.tables["motherboard"]
+        has_m2 = not _is_null(mobo.data.get("m2_slots", [None] * (mobo_pos + 1))[mobo_pos])
+        has_sata = not _is_null(mobo.data.get("sata_ports", [None] * (mobo_pos + 1))[mobo_pos])
+        return np.flatnonzero((self._ssd_m2 & has_m2) | (self._ssd_sata & has_sata))
+
+    # ---------- Query helpers ----------
+
+    def filter_equals(self, component_type, positions, column, value):
+        """WHERE column = value (NULLs never match)"""
+        values = self.tables[component_type].column(column)[positions]
+        return positions[np.array([v == value for v in values], dtype=bool)] if len(positions) else positions
+
+    def filter_contains(self, component_type, positions, column, text):
+        """WHERE column LIKE '%text%'"""
+        values = self.tables[component_type].column(column)[positions]
+        return positions[np.array([not _is_null(v) and text in str(v) for v in values], dtype=bool)] if len(positions) else positions
+
+    def filter_min(self, component_type, positions, column, minimum):
+        """WHERE column >= minimum"""
+        values = self.tables[component_type]._float_column(column)[positions]
+        with np.errstate(invalid='ignore'):
+            return positions[values >= minimum]
+
+    def rank_order(self, component_type, positions, budget, use_ml_ranking, limit):
+        """
+        WHERE price_num <= budget AND price_num > 0, ordered like _get_order_by_clause.
+        A budget of None drops the upper bound.
+        """
+        table = self.tables[component_type]
+        price = table.price_num[positions]
+        with np.errstate(invalid='ignore'):
+            keep = price > 0
+            if budget is not None:
+                keep &= price <= budget
+        positions = positions[keep]
+        if use_ml_ranking:
+            order = np.lexsort((table.ids[positions], table.price_num[positions], table.rank_key[positions]))
+        else:
+            order = np.lexsort((table.ids[positions], table.price_num[positions]))
+        return positions[order[:limit]]
+
+    def cheapest(self, component_type, positions, limit=1):
+        """WHERE price_num > 0 ORDER BY price_num ASC"""
+        return self.rank_order(component_type, positions, None, False, limit)
+
+    def storage_order(self, positions, budget, limit, direct):
+        """
+        Capacity DESC, price ASC ordering used by select_storage. The function path filters on the
+        numeric price column and sorts NULL capacities first (PostgreSQL DESC default); the direct
+        path filters on price_num and sorts on the parsed capacity expression.
+        """
+        table = self.tables["storage"]
+        price = table.price_num[positions] if direct else self._ssd_price[positions]
+        with np.errstate(invalid='ignore'):
+            keep = price > 0
+            if budget is not None:
+                keep &= price <= budget
+        positions, price = positions[keep], price[keep]
+        if direct:
+            capacity = self._ssd_capacity_gb[positions]
+            order = np.lexsort((table.ids[positions], price, -capacity))
+        else:
+            capacity = self._ssd_capacity_num[positions]
+            null_first = np.where(np.isnan(capacity), 0, 1)
+            order = np.lexsort((table.ids[positions], price, -np.nan_to_num(capacity), null_first))
+        return positions[order[:limit]]
+
+    def rows(self, component_type, positions, columns=None, extra=None):
+        """
+        Materialize rows as (results, description) like cursor.fetchall()/cursor.description.
+        `columns` defaults to every table column (SELECT *); `extra` is a list of
+        (output_name, source_column) pairs appended after them.
+        """
+        table = self.tables[component_type]
+        columns = table.columns if columns is None else columns
+        extra = extra or []
+        sources = list(columns) + [source for _, source in extra]
+        names = list(columns) + [name for name, _ in extra]
+        data = [table.column(source) for source in sources]
+        results = [tuple(values[pos] for values in data) for pos in positions]
+        description = [(name,) for name in names]
+        return results, description
+
+
+def bump_catalog_version(cursor):
+    """Mark the catalog as changed; commits together with the caller's write"""
+    cursor.execute(CATALOG_VERSION_SQL)
+
+
+def catalog_fingerprint(conn, tables=None):
+    """
+    Cheap change marker for the snapshot tables (or `tables`). A different value
+    means the catalog changed since the last call.
+
+    The catalog_version counter is the reliable part: the writers bump it in the
+    transaction that changes the catalog. The per-table relid and
+    insert/update/delete counters from pg_stat_user_tables also catch writes made
+    without a bump, and relid changes when a table is swapped for a new copy,
+    whose counters start over (the statistics collector may lag a commit by a moment).
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('catalog_version') IS NOT NULL")
+        version = None
+        if cursor.fetchone()[0]:
+            cursor.execute("SELECT version FROM catalog_version")
+            row = cursor.fetchone()
+            version = row[0] if row else None
+        cursor.execute(
+            """
+            SELECT relname, relid, n_tup_ins + n_tup_upd + n_tup_del
+            FROM pg_stat_user_tables
+            WHERE relname = ANY(%s)
+            ORDER BY relname
+            """,
+            (list(tables or SNAPSHOT_TABLES.values()),)
+        )
+        fingerprint = (version, tuple(cursor.fetchall()))
+    conn.rollback()
+    return fingerprint
+
+
+class SnapshotSelector:
+    """
+    Answers PCRecommendationSystem.select_* from a CatalogSnapshot.
+    Each method follows the control flow of its SQL counterpart step by step
+    (compatibility check, fallback ladder, placeholders) so picks and log
+    messages line up with the SQL path.
+    """
+
+    def __init__(self, system, snapshot):
+        self.system = system
+        self.snapshot = snapshot
+
+    @staticmethod
+    def _segment(segment):
+        # _get_params leaves the placeholder in place when no segment is known
+        return segment if segment is not None else 'SEGMENT_PLACEHOLDER'
+
+    def _run_fallbacks(self, component_type, base, cheapest, last_resort, original_budget, market_segment=None):
+        """
+        In-memory mirror of _execute_query_with_fallbacks. `base(budget, segment)`,
+        `cheapest(segment)` and `last_resort()` return (results, description).
+        """
+        for attempt_name, kind, budget_val, segment_val in self.system._fallback_attempts(original_budget, market_segment):
+            try:
+                logging.debug(f"Attempt: {attempt_name} for {component_type} (in-memory)")
+                if kind == "base":
+                    results, description = base(budget_val, segment_val)
+                elif kind == "cheapest":
+                    results, description = cheapest(segment_val)
+                else:
+                    results, description = last_resort()
+                if results:
+                    logging.debug(f"Success on attempt: {attempt_name}")
+                    return results, description
+                logging.debug(f"No results on attempt: {attempt_name}")
+            except (CompatibilityError, KeyError) as e:
+                logging.error(f"ERROR during query attempt '{attempt_name}' for {component_type}: {e}")
+                continue
+        logging.warning(f"All query attempts failed for {component_type}.")
+        return None, None
+
+    def select_cpu(self):
+        system, snap = self.system, self.snapshot
+        budget = system._get_component_budget("cpu")
+        market_segment = system._get_market_segment()
+        platform_pref = system.user_prefs["technicalPreferences"].get("cpuPlatform")
+        logging.info(f"Starting CPU Selection - Budget: ${budget:.2f}, Segment: {market_segment}, Platform: {platform_pref}")
+
+        all_cpus = snap.table("cpu").all_positions()
+        candidates = all_cpus
+        if platform_pref:
+            if platform_pref.upper() == "AMD": candidates = snap.filter_equals("cpu", all_cpus, "manufacturer", "AMD")
+            elif platform_pref.upper() == "INTEL": candidates = snap.filter_equals("cpu", all_cpus, "manufacturer", "Intel")
+
+        def base(budget_val, segment_val):
+            in_segment = snap.filter_equals("cpu", candidates, "market_segment", self._segment(segment_val))
+            return snap.rows("cpu", snap.rank_order("cpu", in_segment, budget_val, system.use_ml_ranking, system._candidate_limit(5)))
+
+        def cheapest(segment_val):
+            in_segment = snap.filter_equals("cpu", candidates, "market_segment", self._segment(segment_val))
+            return snap.rows("cpu", snap.cheapest("cpu", in_segment))
+
+        try:
+            results, description = self._run_fallbacks(
+                "CPU", base, cheapest, lambda: snap.rows("cpu", snap.cheapest("cpu", candidates)),
+                budget, market_segment)
+            if not results:
+                logging.warning("CPU - Fallback queries failed, trying absolute last resort (any platform)")
+                results, description = snap.rows("cpu", snap.cheapest("cpu", all_cpus))
+            return system._process_and_store_component(results, description, "cpu", budget)
+        except Exception as e:
+            logging.error(f"Error selecting CPU: {str(e)}")
+            raise
+
+    def select_motherboard(self):
+        system, snap = self.system, self.snapshot
+        budget = system._get_component_budget("motherboard")
+        cpu_id = system.selected_components["cpu"]["id"]
+        logging.info(f"Starting Motherboard Selection - Budget: ${budget:.2f}, CPU ID: {cpu_id}")
+
+        all_mobos = snap.table("motherboard").all_positions()
+        last_resort = lambda: snap.rows("motherboard", snap.cheapest("motherboard", all_mobos))
+        try:
+            compatible = snap.compatible_motherboards(cpu_id)
+            logging.info(f"Motherboard - Found {len(compatible)} compatible parts via function.")
+            if len(compatible) == 0:
+                raise CompatibilityError(f"No compatible motherboards found via function for CPU ID {cpu_id}")
+        except CompatibilityError as check_err:
+            logging.error(f"Motherboard - Error checking compatibility: {check_err}. Trying last resort query directly.")
+            results, description = last_resort()
+            if not results:
+                logging.error("Motherboard - Last resort query failed: No motherboards found even in last resort.")
+                raise Exception(f"No compatible motherboard found for CPU id={cpu_id} (check/last resort failed)")
+            return system._process_and_store_component(results, description, "motherboard", budget)
+
+        columns = COMPAT_FUNCTION_COLUMNS["motherboard"]
+        extra = [("rank", "rank"), ("ml_score", "ml_score"), ("price_num", "price_num")]
+        try:
+            results, description = self._run_fallbacks(
+                "Motherboard",
+                lambda b, _: snap.rows("motherboard", snap.rank_order("motherboard", compatible, b, system.use_ml_ranking, system._candidate_limit(5)), columns, extra),
+                lambda _: snap.rows("motherboard", snap.cheapest("motherboard", compatible), columns, extra),
+                last_resort, budget)
+            return system._process_and_store_component(results, description, "motherboard", budget)
+        except Exception as e:
+            logging.error(f"Error selecting motherboard: {str(e)}")
+            raise
+
+    def select_cooler(self):
+        system, snap = self.system, self.snapshot
+        budget = system._get_component_budget("cooler")
+        cpu_id = system.selected_components["cpu"]["id"]
+        logging.info(f"Starting Cooler Selection - Budget: ${budget:.2f}, CPU ID: {cpu_id}")
+
+        compatible, compat_error = None, None
+        try:
+            compatible = snap.compatible_coolers(cpu_id)
+            logging.info(f"Cooler - Found {len(compatible)} compatible parts via function.")
+        except CompatibilityError as check_err:
+            compat_error = check_err
+            logging.warning(f"Cooler - Error checking compatibility: {check_err}. Will attempt queries anyway.")
+
+        columns = COMPAT_FUNCTION_COLUMNS["cooler"]
+        extra = [("rank", "rank"), ("ml_score", "ml_score"), ("price_num", "price_num")]
+
+        def from_function(positions_fn):
+            if compat_error is not None:
+                raise compat_error
+            return snap.rows("cooler", positions_fn(), columns, extra)
+
+        try:
+            results, description = self._run_fallbacks(
+                "Cooler",
+                lambda b, _: from_function(lambda: snap.rank_order("cooler", compatible, b, system.use_ml_ranking, system._candidate_limit(5))),
+                lambda _: from_function(lambda: snap.cheapest("cooler", compatible)),
+                lambda: snap.rows("cooler", snap.cheapest("cooler", snap.table("cooler").all_positions())),
+                budget)
+
+            if not results:
+                if system._stock_cooler_possible():
+                    logging.warning("No specific compatible cooler found, assuming stock cooler is sufficient/used.")
+                    cooler = {"id": None, "name": "Stock Cooler (Assumed)", "price": "$0.00", "price_num": 0.0, "rank": 9999, "ml_score": 0}
+                    system.selected_components["cooler"] = cooler
+                    return cooler
+                logging.error(f"No compatible CPU cooler found for CPU id={cpu_id}, and stock cooler unlikely.")
+                cooler = {"id": None, "name": "ERROR - No Cooler Found", "price": "$0.00", "price_num": 0.0, "rank": 9999, "ml_score": 0}
+                system.selected_components["cooler"] = cooler
+                raise Exception("Failed to select suitable Cooler")
+
+            return system._process_and_store_component(results, description, "cooler", budget)
+        except Exception as e:
+            logging.error(f"Error selecting CPU cooler: {str(e)}")
+            raise
+
+    def select_memory(self):
+        system, snap = self.system, self.snapshot
+        budget = system._get_component_budget("memory")
+        motherboard_id = system.selected_components["motherboard"]["id"]
+        cpu_id = system.selected_components["cpu"]["id"]
+        logging.info(f"Starting Memory Selection - Budget: ${budget:.2f}, Mobo ID: {motherboard_id}, CPU ID: {cpu_id}")
+
+        compatible, compat_error = None, None
+        try:
+            compatible = snap.compatible_ram(motherboard_id, cpu_id)
+            logging.info(f"Memory - Found {len(compatible)} compatible parts via function.")
+            if len(compatible) == 0:
+                logging.warning("Memory - Compatibility function returned 0 results. Will try last resort.")
+        except CompatibilityError as check_err:
+            compat_error = check_err
+            logging.warning(f"Memory - Error checking compatibility: {check_err}. Will try queries anyway.")
+
+        columns = COMPAT_FUNCTION_COLUMNS["memory"]
+        extra = [("rank", "rank"), ("ml_score", "ml_score"), ("price_num", "price_num")]
+
+        def from_function(positions_fn):
+            if compat_error is not None:
+                raise compat_error
+            return snap.rows("memory", positions_fn(), columns, extra)
+
+        def last_resort():
+            positions = snap.table("memory").all_positions()
+            mobo_mem_type = system.selected_components["motherboard"].get("memory_type")
+            if mobo_mem_type:
+                positions = snap.filter_equals("memory", positions, "type", mobo_mem_type)
+            return snap.rows("memory", snap.cheapest("memory", positions))
+
+        try:
+            results, description = self._run_fallbacks(
+                "Memory",
+                lambda b, _: from_function(lambda: snap.rank_order("memory", compatible, b, system.use_ml_ranking, system._candidate_limit(5))),
+                lambda _: from_function(lambda: snap.cheapest("memory", compatible)),
+                last_resort, budget)
+            return system._process_and_store_component(results, description, "memory", budget)
+        except Exception as e:
+            logging.error(f"Error selecting memory: {str(e)}")
+            raise
+
+    def select_gpu(self):
+        system, snap = self.system, self.snapshot
+        budget = system._get_component_budget("gpu")
+        motherboard_id = system.selected_components["motherboard"]["id"]
+        market_segment = system._get_market_segment()
+        platform_pref = system.user_prefs["technicalPreferences"].get("gpuPlatform")
+        logging.info(f"Starting GPU Selection - Budget: ${budget:.2f}, Mobo ID: {motherboard_id}, Segment: {market_segment}, Platform: {platform_pref}")
+
+        brand = None
+        if platform_pref:
+            if platform_pref.upper() == "NVIDIA": brand = "NVIDIA"
+            elif platform_pref.upper() == "AMD": brand = "AMD"
+            elif platform_pref.upper() == "INTEL": brand = "Intel"
+
+        has_igpu = system._cpu_has_igpu()
+        integrated = {"id": None, "name": "Integrated Graphics (Assumed)", "price": "$0.00", "price_num": 0.0, "rank": 9999, "ml_score": 0, "brand": "Integrated", "market_segment": "Integrated"}
+
+        compat_count = 0
+        try:
+            compatible = snap.compatible_video_cards(motherboard_id)
+            compat_count = len(compatible)
+            logging.info(f"GPU - Found {compat_count} compatible parts via function.")
+            if compat_count == 0 and not has_igpu:
+                logging.warning(f"GPU - Compatibility function returned 0 results for Mobo ID {motherboard_id}, and no iGPU detected. Will proceed to fallbacks.")
+            elif compat_count == 0 and has_igpu:
+                logging.warning("GPU - Compatibility function returned 0 results, but CPU has iGPU. Assuming integrated graphics.")
+                system.selected_components["gpu"] = integrated
+                return integrated
+        except CompatibilityError as func_err:
+            logging.warning(f"GPU - Error executing get_compatible_video_cards({motherboard_id}): {func_err}. Will attempt direct queries.")
+            compat_count = -1
+
+        all_gpus = snap.table("gpu").all_positions()
+        if compat_count >= 0:
+            source = compatible
+            columns = COMPAT_FUNCTION_COLUMNS["gpu"]
+            extra = [("gpu_rank", "rank"), ("ml_score", "ml_score"), ("price_num", "price_num"),
+                     ("market_segment", "market_segment"), ("brand", "brand")]
+        else:
+            logging.warning("GPU - Using direct queries on gpu_specs table.")
+            source, columns, extra = all_gpus, None, [("gpu_rank", "rank")]
+
+        def filtered(segment_val, brand_val):
+            positions = snap.filter_equals("gpu", source, "market_segment", self._segment(segment_val))
+            if brand_val:
+                positions = snap.filter_equals("gpu", positions, "brand", brand_val)
+            return positions
+
+        def base(budget_val, segment_val, brand_val=None):
+            return snap.rows("gpu", snap.rank_order("gpu", filtered(segment_val, brand_val), budget_val, system.use_ml_ranking, system._candidate_limit(10)), columns, extra)
+
+        try:
+            results, description = None, None
+            if brand:
+                logging.debug(f"GPU - Trying query with brand filter: {brand}")
+                results, description = base(budget, market_segment, brand)
+            if not results:
+                if brand: logging.debug("GPU - No results with brand filter, trying without.")
+                results, description = base(budget, market_segment)
+
+            if not results:
+                results, description = self._run_fallbacks(
+                    "GPU", base,
+                    lambda segment_val: snap.rows("gpu", snap.cheapest("gpu", filtered(segment_val, None)), columns, extra),
+                    lambda: snap.rows("gpu", snap.cheapest("gpu", all_gpus), None, [("gpu_rank", "rank")]),
+                    budget, market_segment)
+
+            if not results:
+                if has_igpu:
+                    logging.warning("GPU - No dedicated GPU found after all fallbacks. Assuming integrated graphics.")
+                    system.selected_components["gpu"] = integrated
+                    return integrated
+                raise Exception(f"No compatible GPU found for motherboard id={motherboard_id} after all fallbacks, and no integrated graphics detected.")
+
+            return system._process_and_store_component(results, description, "gpu", budget)
+        except Exception as e:
+            logging.error(f"Error selecting GPU: {str(e)}")
+            raise
+
+    def select_case(self):
+        system, snap = self.system, self.snapshot
+        gpu_id = system.selected_components.get("gpu", {}).get("id")
+        motherboard_id = system.selected_components["motherboard"]["id"]
+        budget = system._get_component_budget("case")
+        logging.info(f"Starting Case Selection - Budget: ${budget:.2f}, Mobo ID: {motherboard_id}, GPU ID: {gpu_id}")
+
+        compat_count = -1
+        use_direct_query_logic = False
+        source = None
+        columns = ["id", "name", "price", "type", "color"]
+        extra = [("case_rank", "rank"), ("ml_score", "ml_score"), ("price_num", "price_num")]
+        all_cases = snap.table("case").all_positions()
+
+        if gpu_id is not None:
+            try:
+                source = snap.compatible_cases(gpu_id, motherboard_id)
+                compat_count = len(source)
+                logging.info(f"Case - Found {compat_count} compatible parts via function (GPU specific).")
+                if compat_count == 0:
+                    logging.warning("Case - Compatibility function returned 0 with GPU ID. Will try direct queries.")
+                    use_direct_query_logic = True
+            except CompatibilityError as check_err:
+                logging.warning(f"Case - Error checking compatibility function with GPU: {check_err}. Will try direct queries.")
+                use_direct_query_logic = True
+
+        if gpu_id is None or use_direct_query_logic:
+            if not use_direct_query_logic:
+                logging.info("Case - No dedicated GPU or initial compat check failed. Using motherboard form factor.")
+            mobo_form_factor = system.selected_components["motherboard"].get("form_factor", "ATX")
+            try:
+                source = snap.filter_contains("case", all_cases, "motherboard_form_factor", str(mobo_form_factor))
+                compat_count = len(snap.cheapest("case", source, limit=len(source)))
+                logging.info(f"Case - Found {compat_count} compatible parts via form factor '{mobo_form_factor}'.")
+            except KeyError as ff_check_err:
+                logging.warning(f"Case - Error checking compatibility by form factor: {ff_check_err}. Will proceed to last resort if needed.")
+                compat_count = -1
+
+        last_resort = lambda: snap.rows("case", snap.cheapest("case", all_cases), columns,
+                                        [("rank", "rank"), ("ml_score", "ml_score"), ("price_num", "price_num")])
+
+        def from_source(positions_fn):
+            if source is None:
+                raise KeyError("column \"motherboard_form_factor\" does not exist in case_specs")
+            return snap.rows("case", positions_fn(), columns, extra)
+
+        try:
+            if compat_count == 0:
+                logging.warning("Case - Compatibility check found 0 results. Trying last resort directly.")
+                results, description = last_resort()
+            else:
+                results, description = self._run_fallbacks(
+                    "Case",
+                    lambda b, _: from_source(lambda: snap.rank_order("case", source, b, system.use_ml_ranking, system._candidate_limit(1))),
+                    lambda _: from_source(lambda: snap.cheapest("case", source)),
+                    last_resort, budget)
+            return system._process_and_store_component(results, description, "case", budget)
+        except Exception as e:
+            logging.error(f"Error selecting case: {str(e)}")
+            raise
+
+    def select_psu(self):
+        system, snap = self.system, self.snapshot
+        case_id = system.selected_components["case"].get("id")
+        if not case_id:
+            logging.warning("PSU - Valid Case ID missing. Attempting selection without case compatibility.")
+
+        budget = system._get_component_budget("psu")
+        power_levels_to_try = system._psu_power_levels()
+        required_power_low = power_levels_to_try[-1]
+        current_power_req = power_levels_to_try[0]
+        logging.info(f"Starting PSU Selection - Budget: ${budget:.2f}, Case ID: {case_id}, Req Power Est: ~{current_power_req}W")
+
+        compat_count = 0
+        compatible = None
+        if case_id:
+            try:
+                for power_level in power_levels_to_try:
+                    candidates = snap.compatible_psus(power_level, case_id)
+                    if len(candidates) > 0:
+                        current_power_req = power_level
+                        compat_count = len(candidates)
+                        compatible = candidates
+                        logging.info(f"PSU - Found {compat_count} compatible parts via function at {current_power_req}W.")
+                        break
+                    logging.warning(f"PSU - Compatibility function returned 0 for {power_level}W.")
+                if compat_count == 0:
+                    logging.warning("PSU - No compatible PSUs found for any calculated power requirement via function. Will try last resort.")
+            except CompatibilityError as check_err:
+                logging.warning(f"PSU - Error checking compatibility function: {check_err}. Will try last resort.")
+                compat_count = -1
+        else:
+            compat_count = -1
+
+        all_psus = snap.table("psu").all_positions()
+        if case_id is not None and compat_count > 0:
+            source = compatible
+            columns = ["id", "name", "price", "type", "efficiency_rating", "wattage"]
+            extra = [("psu_rank", "rank"), ("ml_score", "ml_score"), ("price_num", "price_num")]
+        else:
+            logging.warning("PSU - Using direct queries on psu_specs (no/failed compatibility check).")
+            source = snap.filter_min("psu", all_psus, "wattage", current_power_req)
+            columns, extra = None, [("psu_rank", "rank")]
+
+        try:
+            results, description = self._run_fallbacks(
+                "PSU",
+                lambda b, _: snap.rows("psu", snap.rank_order("psu", source, b, system.use_ml_ranking, system._candidate_limit(1)), columns, extra),
+                lambda _: snap.rows("psu", snap.cheapest("psu", source), columns, extra),
+                lambda: snap.rows("psu", snap.cheapest("psu", snap.filter_min("psu", all_psus, "wattage", required_power_low)),
+                                  None, [("psu_rank", "rank")]),
+                budget)
+            return system._process_and_store_component(results, description, "psu", budget)
+        except Exception as e:
+            logging.error(f"Error selecting PSU: {str(e)}")
+            raise
+
+    def select_storage(self):
+        system, snap = self.system, self.snapshot
+        budget = system._get_component_budget("storage")
+        motherboard_id = system.selected_components["motherboard"]["id"]
+        logging.info(f"Starting Storage Selection - Budget: ${budget:.2f}, Mobo ID: {motherboard_id}")
+
+        all_ssds = snap.table("storage").all_positions()
+        use_direct_query = False
+        source = all_ssds
+        try:
+            compatible = snap.compatible_ssds(motherboard_id)
+            logging.info(f"Storage - Found {len(compatible)} compatible parts via function.")
+            source = compatible
+            if len(compatible) == 0:
+                logging.warning("get_compatible_ssd returned 0 results. Trying direct query on ssd_specs.")
+                use_direct_query = True
+                source = all_ssds
+                if len(snap.cheapest("storage", all_ssds, limit=1)) == 0:
+                    raise CompatibilityError("No SSDs found in ssd_specs table.")
+        except CompatibilityError as check_err:
+            logging.warning(f"Storage - Error checking compatibility function ({check_err}). Will use direct query.")
+            use_direct_query = True
+            source = all_ssds
+
+        columns = COMPAT_FUNCTION_COLUMNS["storage"]
+        try:
+            current_budget = budget
+            max_attempts = 10
+            increment_factor = 0.10
+            results, description = None, None
+            for attempt in range(max_attempts + 1):
+                logging.info(f"Storage - Attempt {attempt}: trying with budget ${current_budget:.2f}")
+                results, description = snap.rows("storage", snap.storage_order(source, current_budget, system._candidate_limit(1), use_direct_query), columns)
+                if results:
+                    logging.info(f"Storage - Found suitable drive within budget on attempt {attempt}")
+                    break
+                if attempt == max_attempts:
+                    logging.warning(f"Storage - No suitable drive found after {max_attempts} budget increments. Trying fallback.")
+                    results, description = snap.rows("storage", snap.storage_order(source, None, 1, use_direct_query), columns)
+                    if results:
+                        logging.info("Storage - Found drive with cheapest query fallback")
+                        break
+                    logging.warning("Storage - Cheapest query failed. Trying last resort.")
+                    results, description = snap.rows("storage", snap.storage_order(all_ssds, None, 1, True), columns)
+                    if results:
+                        logging.info("Storage - Found drive with last resort query")
+                        break
+                    raise Exception("All storage queries failed: No storage device found after all fallback attempts")
+                current_budget = current_budget * (1 + increment_factor)
+                logging.info(f"Storage - Increasing budget to ${current_budget:.2f} for attempt {attempt+1}")
+
+            def storage_component(row):
+                component = dict(zip([d[0] for d in description], row))
+                if not use_direct_query:
+                    component['price_num'] = float(component.get('price', 0))
+                    if isinstance(component['price'], (int, float)):
+                        component['price'] = f"${component['price']:.2f}"
+                return component
+
+            component_data = storage_component(results[0])
+            if system.record_candidates:
+                system.candidates['storage'] = [component_data] + [storage_component(row) for row in results[1:]]
+
+            logging.info(f"Selected storage: {component_data.get('name')} - {component_data.get('capacity')} - ${component_data.get('price_num', 0):.2f}")
+            system.selected_components['storage'] = component_data
+            return component_data
+
+        except Exception as e:
+            logging.error(f"Error selecting storage: {str(e)}", exc_info=True)
+            logging.warning("Storage - Attempting emergency last resort query")
+            results, description = snap.rows("storage", snap.cheapest("storage", all_ssds))
+            if results:
+                component_data = dict(zip([d[0] for d in description], results[0]))
+                system.selected_components['storage'] = component_data
+                return component_data
+            raise
@@ -0,0 +1,209 @@
+# filename: connection_pool.py
+"""
+Process-wide, thread-safe PostgreSQL connection pool for PCRecommendationSystem.
+
+Systems borrow a connection for the lifetime of one recommendation and hand it
+back on close() instead of paying a full PostgreSQL handshake per profile.
+Connections are health-checked on checkout and the pool keeps wait metrics.
+"""
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from data_connection import connect_to_db
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the wait timeout"""
+
+
+class ConnectionPool:
+    def __init__(self, connect=connect_to_db, min_size=1, max_size=10, timeout=30.0, health_check_after=30.0):
+        """
+        connect: zero-argument factory returning a new psycopg2 connection
+        min_size: connections opened eagerly and kept open
+        max_size: hard limit on open connections (idle + in use)
+        timeout: seconds acquire() waits for a free connection before raising
+        health_check_after: idle seconds after which a connection is pinged on checkout
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, returned_at)
+        self._in_use = set()
+        self._closed = False
+        self._metrics = {
+            "checkouts": 0,
+            "waits": 0,
+            "total_wait_s": 0.0,
+            "max_wait_s": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "health_check_failures": 0,
+        }
+
+        for _ in range(min_size):
+            self._idle.append((self._new_connection(), time.monotonic()))
+            self._metrics["created"] += 1
+
+    def _new_connection(self):
+        conn = self._connect()
+        conn.autocommit = False
+        return conn
+
+    def _discard(self, conn):
+        """Close a connection; call with the lock held"""
+        self._metrics["discarded"] += 1
+        try: conn.close()
+        except Exception: pass
+
+    def _ping(self, conn):
+        """Round trip on a borrowed connection; call without the lock held"""
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logging.warning(f"Pool - Health check failed, replacing connection: {e}")
+            return False
+
+    def acquire(self, timeout=None):
+        """Borrow a connection, waiting up to `timeout` seconds for one to free up"""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    if conn.closed:
+                        self._discard(conn)
+                        continue
+                    if time.monotonic() - returned_at < self.health_check_after:
+                        break
+                    # Hold the slot while pinging outside the lock
+                    self._in_use.add(conn)
+                    self._cond.release()
+                    try:
+                        healthy = self._ping(conn)
+                    finally:
+                        self._cond.acquire()
+                        self._in_use.discard(conn)
+                    if healthy:
+                        break
+                    self._metrics["health_check_failures"] += 1
+                    self._discard(conn)
+                    self._cond.notify()
+                    continue
+                if len(self._in_use) < self.max_size:
+                    # Reserve the slot while connecting outside the lock
+                    placeholder = object()
+                    self._in_use.add(placeholder)
+                    self._cond.release()
+                    try:
+                        conn = self._new_connection()
+                    except Exception:
+                        self._cond.acquire()
+                        self._in_use.discard(placeholder)
+                        self._cond.notify()
+                        raise
+                    self._cond.acquire()
+                    self._in_use.discard(placeholder)
+                    self._metrics["created"] += 1
+                    break
+                remaining = timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._metrics["timeouts"] += 1
+                    raise PoolTimeoutError(f"No database connection available after {timeout:.1f}s (max_size={self.max_size})")
+                waited = True
+                self._cond.wait(remaining)
+
+            wait_s = time.monotonic() - start
+            self._in_use.add(conn)
+            self._metrics["checkouts"] += 1
+            if waited:
+                self._metrics["waits"] += 1
+            self._metrics["total_wait_s"] += wait_s
+            self._metrics["max_wait_s"] = max(self._metrics["max_wait_s"], wait_s)
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return a borrowed connection. Open transactions are rolled back."""
+        if not discard and not conn.closed:
+            try:
+                conn.rollback()
+                conn.autocommit = False
+            except Exception as e:
+                logging.warning(f"Pool - Rollback on release failed, discarding connection: {e}")
+                discard = True
+        with self._cond:
+            self._in_use.discard(conn)
+            if discard or conn.closed or self._closed or len(self._idle) >= self.max_size:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager around acquire()/release()"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, discard=bool(conn.closed))
+            raise
+        else:
+            self.release(conn)
+
+    def stats(self):
+        """Snapshot of pool size and wait metrics"""
+        with self._cond:
+            stats = dict(self._metrics)
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = len(self._in_use)
+            stats["max_size"] = self.max_size
+            stats["avg_wait_s"] = stats["total_wait_s"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        return stats
+
+    def close(self):
+        """Close idle connections and refuse new checkouts"""
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+            self._cond.notify_all()
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool(**kwargs):
+    """Return the process-wide pool, creating it with `kwargs` on first use"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None or _shared_pool._closed:
+            _shared_pool = ConnectionPool(**kwargs)
+        return _shared_pool
+
+
+def close_shared_pool():
+    """Close the process-wide pool if one was created"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is not None:
+            logging.debug(f"Closing shared connection pool: {_shared_pool.stats()}")
+            _shared_pool.close()
+            _shared_pool = None
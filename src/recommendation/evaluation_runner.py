@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+"""
+Evaluation runner for the Test A/B/C modes.
+
+Every profile in evaluation/input_data.json is built once per mode:
+  A  Full IntelliBuild (ML Rank ON, Dynamic Budget ON)
+  B  No ML Rank (ML Rank OFF, Dynamic Budget ON)
+  C  No Dynamic Budget (ML Rank ON, Dynamic Budget OFF)
+
+Profiles x modes are fanned out over a process pool. Each worker process keeps
+its own pooled connection (or, with --in-memory, one catalog snapshot) for all
+the builds it runs. Results are appended to Test_X/builds_X.json as they
+finish (failures to failed_builds_X.json), keyed like "3a" (profile number and
+mode letter). Per-mode latency percentiles and histograms are saved in
+Test_X/latency_X.json.
+
+Usage:
+  python evaluation_runner.py --workers 8 --modes A B C
+"""
+import os
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+EVALUATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "evaluation")
+DEFAULT_PROFILES = os.path.join(EVALUATION_DIR, "input_data.json")
+DEFAULT_OUTPUT_DIR = os.path.join(EVALUATION_DIR, "Evaluation_Results")
+
+# mode -> (use_ml_ranking, use_dynamic_budget, description)
+MODES = {
+    "A": (True, True, "Full IntelliBuild (ML Rank ON, Dynamic Budget ON)"),
+    "B": (False, True, "No ML Rank (ML Rank OFF, Dynamic Budget ON)"),
+    "C": (True, False, "No Dynamic Budget (ML Rank ON, Dynamic Budget OFF)"),
+}
+
+# Upper bucket edges of the latency histograms, in seconds
+LATENCY_BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+class IncrementalJsonWriter:
+    """Writes one JSON object entry by entry; the file is complete once close() runs"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._closed = False
+
+    def add(self, key, value):
+        if self._file is None:
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._file.write("{\n")
+        elif self.count:
+            self._file.write(",\n")
+        # Same layout as json.dump(..., indent=2) of the whole object
+        self._file.write(json.dumps({key: value}, indent=2)[2:-2])
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._file is None:
+            # No entries: still leave a valid (empty) object behind
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write("{}\n")
+            return
+        self._file.write("\n}\n")
+        self._file.close()
+        self._file = None
+
+
+# ---------- Worker process ----------
+
+_worker_state = {}
+
+
+def _init_worker(in_memory):
+    """Per-process setup: one pooled connection, or one catalog snapshot"""
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    from connection_pool import get_shared_pool
+    pool = get_shared_pool(min_size=1, max_size=1)
+    _worker_state["pool"] = pool
+    _worker_state["catalog"] = None
+    if in_memory:
+        from catalog_snapshot import CatalogSnapshot
+        with pool.connection() as conn:
+            _worker_state["catalog"] = CatalogSnapshot.load(conn)
+
+
+def _build(mode, key, preferences):
+    """Build one profile in one mode; returns (mode, key, recommendation, seconds)"""
+    from recommendation_system import PCRecommendationSystem
+    use_ml_ranking, use_dynamic_budget, _ = MODES[mode]
+    catalog = _worker_state.get("catalog")
+    start = time.perf_counter()
+    rec_system = None
+    try:
+        rec_system = PCRecommendationSystem(preferences=preferences, use_ml_ranking=use_ml_ranking,
+                                            use_dynamic_budget=use_dynamic_budget, catalog=catalog,
+                                            pool=None if catalog is not None else _worker_state["pool"])
+        recommendation = rec_system.build_recommendation()
+    except Exception as e:
+        recommendation = {"error": f"Error in recommendation system: {str(e)}"}
+    finally:
+        if rec_system:
+            rec_system.close()
+    return mode, key, recommendation, time.perf_counter() - start
+
+
+# ---------- Reporting ----------
+
+def latency_summary(latencies):
+    """Percentiles and a bucketed histogram of build latencies (seconds)"""
+    if not latencies:
+        return {"builds": 0}
+    values = np.array(latencies)
+    edges = LATENCY_BUCKETS + [float("inf")]
+    counts = np.histogram(values, bins=[0.0] + edges)[0]
+    return {
+        "builds": int(values.size),
+        "mean_s": float(values.mean()),
+        "p50_s": float(np.percentile(values, 50)),
+        "p95_s": float(np.percentile(values, 95)),
+        "p99_s": float(np.percentile(values, 99)),
+        "max_s": float(values.max()),
+        "histogram": [{"le_s": edge if edge != float("inf") else None, "count": int(count)}
+                      for edge, count in zip(edges, counts)],
+    }
+
+
+def format_histogram(summary, width=40):
+    """Text bars of a latency_summary histogram"""
+    lines = []
+    peak = max((bucket["count"] for bucket in summary.get("histogram", [])), default=0)
+    for bucket in summary.get("histogram", []):
+        label = f"<= {bucket['le_s']:g}s" if bucket["le_s"] is not None else "> 10s"
+        bar = "#" * (round(bucket["count"] / peak * width) if peak else 0)
+        lines.append(f"  {label:>10} {bucket['count']:>6} {bar}")
+    return "\n".join(lines)
+
+
+def run_evaluation(profiles, modes, output_dir, workers, in_memory=False):
+    """Build every profile in every mode; returns {mode: latency_summary}"""
+    writers, failure_writers, latencies = {}, {}, {}
+    for mode in modes:
+        test_dir = os.path.join(output_dir, f"Test_{mode}")
+        os.makedirs(test_dir, exist_ok=True)
+        writers[mode] = IncrementalJsonWriter(os.path.join(test_dir, f"builds_{mode}.json"))
+        failure_writers[mode] = IncrementalJsonWriter(os.path.join(test_dir, f"failed_builds_{mode}.json"))
+        latencies[mode] = []
+        logging.info(f"--- Test {mode}: {MODES[mode][2]} ---")
+
+    tasks = [(mode, f"{index}{mode.lower()}", prefs)
+             for mode in modes for index, prefs in enumerate(profiles, start=1)]
+    logging.info(f"Running {len(tasks)} builds ({len(profiles)} profiles x {len(modes)} modes) on {workers} worker(s)")
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(in_memory,)) as executor:
+            futures = [executor.submit(_build, *task) for task in tasks]
+            for done, future in enumerate(as_completed(futures), start=1):
+                mode, key, recommendation, seconds = future.result()
+                latencies[mode].append(seconds)
+                if "error" in recommendation:
+                    failure_writers[mode].add(key, recommendation)
+                    logging.warning(f"Build {key} failed: {recommendation['error']}")
+                else:
+                    writers[mode].add(key, recommendation)
+                logging.debug(f"[{done}/{len(tasks)}] {key} in {seconds:.3f}s")
+    finally:
+        for writer in list(writers.values()) + list(failure_writers.values()):
+            writer.close()
+
+    summaries = {}
+    for mode in modes:
+        summaries[mode] = latency_summary(latencies[mode])
+        with open(os.path.join(output_dir, f"Test_{mode}", f"latency_{mode}.json"), "w") as f:
+            json.dump(summaries[mode], f, indent=2)
+        logging.info(f"--- Test {mode}: Saved {writers[mode].count} successful builds to {writers[mode].path} ---")
+        if failure_writers[mode].count:
+            logging.info(f"--- Test {mode}: Logged {failure_writers[mode].count} failed builds to {failure_writers[mode].path} ---")
+        else:
+            logging.info(f"--- Test {mode}: No build failures were logged. ---")
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the Test A/B/C evaluation in parallel')
+    parser.add_argument('--input', type=str, default=DEFAULT_PROFILES, help='JSON array of preference profiles')
+    parser.add_argument('--output-dir', type=str, default=DEFAULT_OUTPUT_DIR, help='Where Test_X/ folders are written')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    parser.add_argument('--in-memory', action='store_true',
+                        help='Load one catalog snapshot per worker instead of querying per selection step')
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(),
+                                  logging.FileHandler(os.path.join(args.output_dir, "evaluation_run.log"), mode="w")])
+
+    with open(args.input) as f:
+        profiles = json.load(f)
+
+    start = time.perf_counter()
+    summaries = run_evaluation(profiles, args.modes, args.output_dir, args.workers, in_memory=args.in_memory)
+
+    print(f"\n{'mode':<5} {'builds':>7} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'max s':>8}")
+    for mode, summary in summaries.items():
+        if summary["builds"]:
+            print(f"{mode:<5} {summary['builds']:>7} {summary['p50_s']:>8.3f} {summary['p95_s']:>8.3f} "
+                  f"{summary['p99_s']:>8.3f} {summary['max_s']:>8.3f}")
+    for mode, summary in summaries.items():
+        print(f"\nTest {mode} latency histogram:\n{format_histogram(summary)}")
+
+    logging.info("--- Evaluation Complete ---")
+    logging.info(f"Total execution time: {time.perf_counter() - start:.2f} seconds.")
+    logging.info(f"Results saved in: {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
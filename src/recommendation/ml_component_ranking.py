@@ -1,16 +1,22 @@
 import os
+import time
+import io
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import pandas as pd
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 import json
 from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, HistGradientBoostingRegressor
+from sklearn.linear_model import Ridge
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error
 from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
 import joblib
+from catalog_snapshot import bump_catalog_version
 
 # Database configuration
 DB_CONFIG = {
@@ -64,6 +70,77 @@ def extract_categorical_value(value, mapping=None):
     
     return value
 
+# ========== VECTORIZED PARSING HELPERS ==========
+# Column-wise versions of the helpers above for the prepare_* functions. They
+# give the same values as applying the scalar helpers cell by cell, except that
+# cells the scalar code raised on (e.g. "NULL" in a noise level) become NaN.
+
+MISSING_VALUES = ['NULL', 'NaN']  # plus None
+NUMERIC_SUFFIXES = ['GHz', 'MHz', 'GB', 'MB', 'TB', 'W', 'mm', 'ns']
+
+def missing_mask(series):
+    """Cells the scalar helpers treat as missing: None, 'NULL' or 'NaN'"""
+    return series.map(lambda value: value is None) | series.isin(MISSING_VALUES)
+
+def string_mask(series):
+    """Cells that are str instances"""
+    return series.map(lambda value: isinstance(value, str))
+
+def as_text(series):
+    """str(x) of every cell"""
+    return series.map(str)
+
+def split_part(text, sep, index):
+    """text.split(sep)[index] of every cell, NaN where there is no such part"""
+    # Object dtype keeps .str usable even when no cell has the part
+    return text.astype(object).str.split(sep).str[index].astype(object)
+
+def to_float(text):
+    """float() of every cell, NaN where that fails"""
+    return pd.to_numeric(text, errors='coerce').astype(float)
+
+def to_int(text):
+    """int() of every cell, NaN where that fails"""
+    return to_float(text.astype(object).str.extract(r'^\s*([-+]?\d+)\s*$', expand=False))
+
+def clean_numeric_series(series):
+    """Vectorized clean_numeric_value"""
+    if series.dtype != object and not pd.api.types.is_string_dtype(series):
+        return series  # Already numeric, clean_numeric_value returns cells unchanged
+    
+    # Strings lose every occurrence of the first listed suffix they contain
+    values = series.astype(object)
+    text = values[string_mask(values)].astype(str)
+    pending = pd.Series(True, index=text.index)
+    for suffix in NUMERIC_SUFFIXES:
+        has_suffix = pending & text.str.contains(suffix, regex=False)
+        values[has_suffix[has_suffix].index] = text[has_suffix].str.replace(suffix, '', regex=False)
+        pending &= ~has_suffix
+    return to_float(values)
+
+def extract_boolean_series(series):
+    """Vectorized extract_boolean_feature"""
+    truthy = as_text(series).str.lower().isin(['yes', 'true', 'y']).astype(float)
+    return truthy.mask(missing_mask(series))
+
+def map_categorical_series(series, mapping):
+    """Vectorized extract_categorical_value"""
+    known = series.isin(list(mapping))
+    result = series.astype(object).where(~known, series.map(mapping))
+    return result.mask(missing_mask(series), np.nan).infer_objects()
+
+def count_lines_series(series):
+    """Number of newline-separated entries, 0 for missing cells"""
+    return (as_text(series).str.count('\n') + 1).mask(missing_mask(series), 0)
+
+def contains_flag_series(series, token):
+    """1.0 where the cell is present and contains `token`, else 0.0"""
+    return (as_text(series).str.contains(token, regex=False) & ~missing_mask(series)).astype(float)
+
+def first_word_number_series(series):
+    """float() of the first whitespace-separated word, NaN for missing cells"""
+    return to_float(split_part(as_text(series), None, 0)).mask(missing_mask(series))
+
 # ========== COMPONENT DATA PREPARATION ==========
 
 def prepare_cpu_data(cpu_data):
@@ -74,22 +151,24 @@ def prepare_cpu_data(cpu_data):
     numeric_cols = ['core_count', 'thread_count', 'l3_cache', 'price_num', 'tdp']
     for col in numeric_cols:
         if col in features.columns:
-            features[col] = features[col].apply(clean_numeric_value)
+            features[col] = clean_numeric_series(features[col])
     
     # Extract clock speeds
     if 'performance_core_clock' in features.columns:
-        features['core_clock'] = features['performance_core_clock'].apply(clean_numeric_value)
+        features['core_clock'] = clean_numeric_series(features['performance_core_clock'])
     
     if 'performance_core_boost_clock' in features.columns:
-        features['boost_clock'] = features['performance_core_boost_clock'].apply(clean_numeric_value)
+        features['boost_clock'] = clean_numeric_series(features['performance_core_boost_clock'])
     
     # Extract architecture generation (e.g., 13th gen, 7000 series)
     if 'name' in features.columns:
         # Extract generation from name (Intel Core i7-13700K -> 13, AMD Ryzen 7 7700X -> 7)
-        features['generation'] = features['name'].apply(lambda x: 
-            int(x.split('-')[1][:2]) if '-' in str(x) and x.split('-')[1][:2].isdigit() 
-            else int(str(x).split(' ')[-1][0]) if str(x).split(' ')[-1][0].isdigit() 
-            else np.nan)
+        name = as_text(features['name'])
+        dash_part = split_part(name, '-', 1).str[:2]
+        last_word = split_part(name, ' ', -1).str[:1]
+        digits = dash_part.where(dash_part.str.isdigit().eq(True),
+                                 last_word.where(last_word.str.isdigit().eq(True)))
+        features['generation'] = to_int(digits)
     
     # Keep only numeric columns and ID
     numeric_features = features.select_dtypes(include=['number']).columns
@@ -103,25 +182,27 @@ def prepare_gpu_data(gpu_data):
     numeric_cols = ['memory', 'price_num', 'length']
     for col in numeric_cols:
         if col in features.columns:
-            features[col] = features[col].apply(clean_numeric_value)
+            features[col] = clean_numeric_series(features[col])
     
     # Extract clock speeds
     if 'core_clock' in features.columns:
-        features['core_clock'] = features['core_clock'].apply(clean_numeric_value)
+        features['core_clock'] = clean_numeric_series(features['core_clock'])
     
     if 'boost_clock' in features.columns:
-        features['boost_clock'] = features['boost_clock'].apply(clean_numeric_value)
+        features['boost_clock'] = clean_numeric_series(features['boost_clock'])
     
     # Extract memory bus width
     if 'memory_interface' in features.columns:
-        features['memory_bus'] = features['memory_interface'].apply(
-            lambda x: clean_numeric_value(x.split('-bit')[0]) if isinstance(x, str) and '-bit' in x else np.nan)
+        interface = features['memory_interface']
+        has_bus = string_mask(interface) & as_text(interface).str.contains('-bit', regex=False)
+        features['memory_bus'] = clean_numeric_series(split_part(as_text(interface), '-bit', 0)).where(has_bus)
     
     # Extract generation based on chipset
     if 'chipset' in features.columns:
-        # Use regex to extract generation number (RTX 4090, RX 7900 XT)
-        features['generation'] = features['chipset'].apply(
-            lambda x: int(str(x)[3]) if isinstance(x, str) and len(str(x)) > 3 and str(x)[3].isdigit() else np.nan)
+        # Use the 4th character as generation number (RTX 4090, RX 7900 XT)
+        chipset = features['chipset']
+        digit = as_text(chipset).str[3].astype(object)
+        features['generation'] = to_int(digit.where(string_mask(chipset) & digit.str.isdigit().eq(True)))
     
     # Keep only numeric columns and ID
     numeric_features = features.select_dtypes(include=['number']).columns
@@ -135,30 +216,27 @@ def prepare_motherboard_data(mobo_data):
     numeric_cols = ['memory_slots', 'memory_max', 'price_num']
     for col in numeric_cols:
         if col in features.columns:
-            features[col] = features[col].apply(clean_numeric_value)
+            features[col] = clean_numeric_series(features[col])
     
     # Form factor mapping
     form_factor_map = {'ATX': 3, 'Micro ATX': 2, 'Mini ITX': 1}
     if 'form_factor' in features.columns:
-        features['form_factor_score'] = features['form_factor'].apply(
-            lambda x: extract_categorical_value(x, form_factor_map))
+        features['form_factor_score'] = map_categorical_series(features['form_factor'], form_factor_map)
     
     # Extract M.2 slot count
     if 'm2_slots' in features.columns:
-        features['m2_count'] = features['m2_slots'].apply(
-            lambda x: len(str(x).split('\n')) if x not in [None, 'NULL', 'NaN'] else 0)
+        features['m2_count'] = count_lines_series(features['m2_slots'])
     
     # Extract WiFi capability
     if 'wireless_networking' in features.columns:
-        features['has_wifi'] = features['wireless_networking'].apply(
-            lambda x: 1.0 if x not in [None, 'NULL', 'NaN'] and 'Wi-Fi' in str(x) else 0.0)
+        features['has_wifi'] = contains_flag_series(features['wireless_networking'], 'Wi-Fi')
     
-    # Chipset tier based on letter (Z > B > H)
+    # Chipset tier based on the first tier letter (Z > B > H)
     chipset_map = {'Z': 3, 'B': 2, 'H': 1, 'X': 3, 'A': 2}
     if 'chipset' in features.columns:
-        features['chipset_tier'] = features['chipset'].apply(
-            lambda x: next((chipset_map[c] for c in str(x) if c in chipset_map), 0) 
-            if x not in [None, 'NULL', 'NaN'] else np.nan)
+        chipset = features['chipset']
+        tier_letter = as_text(chipset).str.extract(f"([{''.join(chipset_map)}])", expand=False)
+        features['chipset_tier'] = tier_letter.map(chipset_map).fillna(0).astype(float).mask(missing_mask(chipset))
     
     # Keep only numeric columns and ID
     numeric_features = features.select_dtypes(include=['number']).columns
@@ -172,25 +250,32 @@ def prepare_memory_data(memory_data):
     numeric_cols = ['price_num', 'first_word_latency']
     for col in numeric_cols:
         if col in features.columns:
-            features[col] = features[col].apply(clean_numeric_value)
+            features[col] = clean_numeric_series(features[col])
     
-    # Extract speed
+    # Extract speed (DDR4-3200 -> 3200, or a plain number)
     if 'speed' in features.columns:
-        features['speed_num'] = features['speed'].apply(
-            lambda x: int(str(x).split('-')[1]) if isinstance(x, str) and '-' in str(x) 
-            else int(str(x)) if isinstance(x, str) and str(x).isdigit() 
-            else np.nan)
-    
-    # Extract capacity
+        speed = features['speed']
+        text = as_text(speed)
+        is_str = string_mask(speed)
+        has_dash = is_str & text.str.contains('-', regex=False)
+        plain = is_str & ~has_dash & text.str.isdigit()
+        features['speed_num'] = to_int(split_part(text, '-', 1).where(has_dash, text.where(plain)))
+    
+    # Extract capacity (2 x 16GB -> 32)
     if 'modules' in features.columns:
-        features['total_capacity'] = features['modules'].apply(
-            lambda x: int(str(x).split('x')[0]) * int(str(x).split('x')[1].replace('GB', '').strip())
-            if isinstance(x, str) and 'x' in str(x) and 'GB' in str(x)
-            else np.nan)
+        modules = features['modules']
+        text = as_text(modules)
+        has_capacity = (string_mask(modules)
+                        & text.str.contains('x', regex=False)
+                        & text.str.contains('GB', regex=False))
+        parts = text.str.split('x')
+        count = to_int(parts.str[0])
+        size = to_int(parts.str[1].str.replace('GB', '', regex=False))
+        features['total_capacity'] = (count * size).where(has_capacity)
     
     # Heat spreader
     if 'heat_spreader' in features.columns:
-        features['has_heat_spreader'] = features['heat_spreader'].apply(extract_boolean_feature)
+        features['has_heat_spreader'] = extract_boolean_series(features['heat_spreader'])
     
     # Keep only numeric columns and ID
     numeric_features = features.select_dtypes(include=['number']).columns
@@ -204,28 +289,27 @@ def prepare_cooler_data(cooler_data):
     numeric_cols = ['price_num']
     for col in numeric_cols:
         if col in features.columns:
-            features[col] = features[col].apply(clean_numeric_value)
+            features[col] = clean_numeric_series(features[col])
     
     # Fan RPM
     if 'fan_rpm' in features.columns:
-        features['fan_rpm_max'] = features['fan_rpm'].apply(
-            lambda x: float(str(x).split()[0]) if x not in [None, 'NULL', 'NaN'] else np.nan)
+        features['fan_rpm_max'] = first_word_number_series(features['fan_rpm'])
     
-    # Noise level
+    # Noise level (range "17.9 - 30.6 dB" -> lower bound, else first word)
     if 'noise_level' in features.columns:
-        features['noise_db'] = features['noise_level'].apply(
-            lambda x: float(str(x).split('-')[0].strip()) if isinstance(x, str) and '-' in str(x)
-            else float(str(x).split()[0]) if isinstance(x, str) 
-            else np.nan)
+        noise = features['noise_level']
+        text = as_text(noise)
+        is_range = text.str.contains('-', regex=False)
+        first = split_part(text, '-', 0).where(is_range, split_part(text, None, 0))
+        features['noise_db'] = to_float(first.where(string_mask(noise)))
     
     # Socket compatibility count
     if 'cpu_socket' in features.columns:
-        features['socket_count'] = features['cpu_socket'].apply(
-            lambda x: len(str(x).split('\n')) if x not in [None, 'NULL', 'NaN'] else 0)
+        features['socket_count'] = count_lines_series(features['cpu_socket'])
     
     # Water cooling
     if 'water_cooled' in features.columns:
-        features['is_water_cooled'] = features['water_cooled'].apply(extract_boolean_feature)
+        features['is_water_cooled'] = extract_boolean_series(features['water_cooled'])
     
     # Keep only numeric columns and ID
     numeric_features = features.select_dtypes(include=['number']).columns
@@ -239,38 +323,35 @@ def prepare_case_data(case_data):
     numeric_cols = ['price_num']
     for col in numeric_cols:
         if col in features.columns:
-            features[col] = features[col].apply(clean_numeric_value)
+            features[col] = clean_numeric_series(features[col])
     
     # Form factor support count
     if 'motherboard_form_factor' in features.columns:
-        features['form_factor_count'] = features['motherboard_form_factor'].apply(
-            lambda x: len(str(x).split('\n')) if x not in [None, 'NULL', 'NaN'] else 0)
+        features['form_factor_count'] = count_lines_series(features['motherboard_form_factor'])
     
     # Glass panel
     if 'side_panel' in features.columns:
-        features['has_glass'] = features['side_panel'].apply(
-            lambda x: 1.0 if x not in [None, 'NULL', 'NaN'] and 'Glass' in str(x) else 0.0)
+        features['has_glass'] = contains_flag_series(features['side_panel'], 'Glass')
     
     # PSU shroud
     if 'power_supply_shroud' in features.columns:
-        features['has_psu_shroud'] = features['power_supply_shroud'].apply(extract_boolean_feature)
+        features['has_psu_shroud'] = extract_boolean_series(features['power_supply_shroud'])
     
     # USB Type-C
     if 'front_panel_usb' in features.columns:
-        features['has_usb_c'] = features['front_panel_usb'].apply(
-            lambda x: 1.0 if x not in [None, 'NULL', 'NaN'] and 'Type-C' in str(x) else 0.0)
+        features['has_usb_c'] = contains_flag_series(features['front_panel_usb'], 'Type-C')
     
     # GPU clearance
     if 'maximum_video_card_length' in features.columns:
-        features['gpu_clearance'] = features['maximum_video_card_length'].apply(
-            lambda x: float(str(x).split()[0]) if x not in [None, 'NULL', 'NaN'] else np.nan)
+        features['gpu_clearance'] = first_word_number_series(features['maximum_video_card_length'])
     
-    # Drive bays
+    # Drive bays (one "2 x Internal 3.5\"" entry per line)
     if 'drive_bays' in features.columns:
-        features['drive_bay_count'] = features['drive_bays'].apply(
-            lambda x: sum(int(bay.split('x')[0].strip()) for bay in str(x).split('\n') if 'x' in bay)
-            if x not in [None, 'NULL', 'NaN']
-            else 0)
+        bays = features['drive_bays']
+        lines = as_text(bays[~missing_mask(bays)]).str.split('\n').explode()
+        lines = lines[lines.str.contains('x', regex=False).eq(True)]
+        bay_counts = to_int(split_part(lines, 'x', 0))
+        features['drive_bay_count'] = bay_counts.groupby(level=0).sum().reindex(features.index, fill_value=0)
     
     # Keep only numeric columns and ID
     numeric_features = features.select_dtypes(include=['number']).columns
@@ -284,25 +365,26 @@ def prepare_psu_data(psu_data):
     numeric_cols = ['price_num']
     for col in numeric_cols:
         if col in features.columns:
-            features[col] = features[col].apply(clean_numeric_value)
+            features[col] = clean_numeric_series(features[col])
     
     # Wattage
     if 'wattage' in features.columns:
-        features['wattage_num'] = features['wattage'].apply(clean_numeric_value)
+        features['wattage_num'] = clean_numeric_series(features['wattage'])
     
-    # Efficiency rating
+    # Efficiency rating (first listed rating contained in the text wins)
     efficiency_map = {'80+ Titanium': 5, '80+ Platinum': 4, '80+ Gold': 3, '80+ Silver': 2, '80+ Bronze': 1, '80+': 0}
     if 'efficiency_rating' in features.columns:
-        features['efficiency_score'] = features['efficiency_rating'].apply(
-            lambda x: next((score for rating, score in efficiency_map.items() if rating in str(x)), 0)
-            if x not in [None, 'NULL', 'NaN']
-            else np.nan)
+        rating = features['efficiency_rating']
+        text = as_text(rating)
+        efficiency_score = pd.Series(0.0, index=features.index)
+        for name, score in reversed(list(efficiency_map.items())):
+            efficiency_score[text.str.contains(name, regex=False)] = score
+        features['efficiency_score'] = efficiency_score.mask(missing_mask(rating))
     
     # Modularity
     modularity_map = {'Full': 2, 'Semi': 1, 'No': 0}
     if 'modular' in features.columns:
-        features['modularity_score'] = features['modular'].apply(
-            lambda x: extract_categorical_value(x, modularity_map))
+        features['modularity_score'] = map_categorical_series(features['modular'], modularity_map)
     
     # Keep only numeric columns and ID
     numeric_features = features.select_dtypes(include=['number']).columns
@@ -310,9 +392,28 @@ def prepare_psu_data(psu_data):
 
 # ========== ML MODEL TRAINING AND RANKING ==========
 
-def train_model(features, target_name, component_type):
-    """Train a machine learning model on the given features"""
-    # Split features and target
+# Ranking model backends selectable with --backend
+MODEL_BACKENDS = ['gbr', 'hist', 'linear']
+
+def build_pipeline(backend='gbr'):
+    """Untrained pipeline for one of MODEL_BACKENDS"""
+    if backend == 'hist':
+        # Handles NaN natively and trains multi-threaded, no imputer or scaler needed
+        return Pipeline([('model', HistGradientBoostingRegressor(random_state=42))])
+    if backend == 'gbr':
+        model = GradientBoostingRegressor(n_estimators=100, random_state=42)
+    elif backend == 'linear':
+        model = Ridge()  # Linear baseline
+    else:
+        raise ValueError(f"Unknown model backend: {backend}")
+    return Pipeline([
+        ('imputer', SimpleImputer(strategy='median')),
+        ('scaler', StandardScaler()),
+        ('model', model)
+    ])
+
+def training_data(features, target_name):
+    """Split features into X and the target y"""
     X = features.drop(['id', target_name], axis=1, errors='ignore')
     y = features[target_name] if target_name in features.columns else None
     
@@ -332,32 +433,47 @@ def train_model(features, target_name, component_type):
         synthetic_score = np.sum(X_scaled * weights, axis=1)
         y = synthetic_score
     
-    # Train/test split
+    return X, y
+
+def fit_and_evaluate(X, y, backend='gbr'):
+    """Fit a pipeline on a train split; returns it with fit/predict time and test MAE"""
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    pipeline = build_pipeline(backend)
     
-    # Create a pipeline with imputation and model
-    pipeline = Pipeline([
-        ('imputer', SimpleImputer(strategy='median')),
-        ('scaler', StandardScaler()),
-        ('model', GradientBoostingRegressor(n_estimators=100, random_state=42))
-    ])
-    
-    # Train the model
+    start = time.perf_counter()
     pipeline.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
     
-    # Evaluate
+    start = time.perf_counter()
     y_pred = pipeline.predict(X_test)
-    mae = mean_absolute_error(y_test, y_pred)
-    print(f"Mean Absolute Error for {component_type}: {mae:.4f}")
-    
-    # Save the model
+    predict_s = time.perf_counter() - start
+    
+    return pipeline, {
+        'backend': backend,
+        'train_rows': len(X_train),
+        'test_rows': len(X_test),
+        'fit_s': fit_s,
+        'predict_s': predict_s,
+        'mae': mean_absolute_error(y_test, y_pred)
+    }
+
+def train_model(features, target_name, component_type, backend='gbr'):
+    """Train a machine learning model on the given features (save it with save_model)"""
+    X, y = training_data(features, target_name)
+    pipeline, metrics = fit_and_evaluate(X, y, backend)
+    print(f"Mean Absolute Error for {component_type}: {metrics['mae']:.4f} "
+          f"(fit {metrics['fit_s']:.3f}s, predict {metrics['predict_s']:.3f}s "
+          f"for {metrics['test_rows']} rows, {backend})")
+    return pipeline, X.columns.tolist()
+
+def save_model(component_type, pipeline, feature_names):
+    """Persist a trained pipeline and its feature names for incremental runs and model_registry"""
     model_path = os.path.join(MODEL_DIR, f"{component_type}_model.joblib")
     joblib.dump(pipeline, model_path)
     
-    # Store the column names used for training
-    feature_names = X.columns.tolist()
-    
-    return pipeline, feature_names
+    # Store the column names used for training, model_registry needs them to score new rows
+    with open(os.path.join(MODEL_DIR, f"{component_type}_features.json"), 'w') as f:
+        json.dump(feature_names, f)
 
 def predict_and_rank(model, features, component_type, feature_names=None, target_name='price_num'):
     """Use the trained model to predict scores and calculate rankings"""
@@ -422,114 +538,263 @@ def ensure_rank_columns_exist(conn):
         print(f"Error ensuring columns exist: {e}")
         conn.rollback()
 
-def update_component_ranks(conn):
-    """Train ML models and update ranks for all components in the database"""
+def write_component_ranks(cursor, table, ranks, use_copy=False):
+    """Write ml_score and rank for one table with a single UPDATE ... FROM a temp table"""
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS new_ranks (
+            id INTEGER PRIMARY KEY, ml_score FLOAT, rank INTEGER
+        ) ON COMMIT DROP
+    """)
+    cursor.execute("TRUNCATE new_ranks")
+    
+    if use_copy:
+        buffer = io.StringIO()
+        ranks[['id', 'ml_score', 'rank']].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert("COPY new_ranks (id, ml_score, rank) FROM STDIN WITH (FORMAT csv)", buffer)
+    else:
+        # Plain Python values, psycopg2 cannot adapt numpy scalars
+        rows = list(zip(ranks['id'].astype(int).tolist(),
+                        ranks['ml_score'].astype(float).tolist(),
+                        ranks['rank'].astype(int).tolist()))
+        execute_values(cursor, "INSERT INTO new_ranks (id, ml_score, rank) VALUES %s", rows, page_size=1000)
+    
+    # Rows whose score and rank are unchanged are left alone
+    cursor.execute(f"""
+        UPDATE {table} AS t
+        SET ml_score = n.ml_score, rank = n.rank
+        FROM new_ranks n
+        WHERE t.id = n.id
+          AND (t.ml_score IS DISTINCT FROM n.ml_score OR t.rank IS DISTINCT FROM n.rank)
+    """)
+    return cursor.rowcount
+
+# Component type -> (spec table, data preparation function), in training order
+COMPONENTS = {
+    'cpu': ('cpu_specs', prepare_cpu_data),
+    'motherboard': ('motherboard_specs', prepare_motherboard_data),
+    'cooler': ('cooler_specs', prepare_cooler_data),
+    'gpu': ('gpu_specs', prepare_gpu_data),
+    'case': ('case_specs', prepare_case_data),
+    'psu': ('psu_specs', prepare_psu_data),
+    'memory': ('memory_specs', prepare_memory_data)
+}
+
+# Columns each prepare_* function reads; 'score' is a numeric column kept as a feature.
+# Only the ones the table actually has are selected (see feature_columns).
+FEATURE_COLUMNS = {
+    'cpu': ['price_num', 'score', 'name', 'core_count', 'thread_count', 'l3_cache', 'tdp',
+            'performance_core_clock', 'performance_core_boost_clock'],
+    'motherboard': ['price_num', 'score', 'memory_slots', 'memory_max', 'form_factor', 'm2_slots',
+                    'wireless_networking', 'chipset'],
+    'cooler': ['price_num', 'score', 'fan_rpm', 'noise_level', 'cpu_socket', 'water_cooled'],
+    'gpu': ['price_num', 'score', 'memory', 'length', 'core_clock', 'boost_clock', 'memory_interface', 'chipset'],
+    'case': ['price_num', 'score', 'motherboard_form_factor', 'side_panel', 'power_supply_shroud',
+             'front_panel_usb', 'maximum_video_card_length', 'drive_bays'],
+    'psu': ['price_num', 'score', 'wattage', 'efficiency_rating', 'modular'],
+    'memory': ['price_num', 'score', 'first_word_latency', 'speed', 'modules', 'heat_spreader']
+}
+
+# Rows per round trip when streaming a spec table
+FETCH_ITERSIZE = 2000
+
+def feature_columns(conn, component_type):
+    """'id' plus the FEATURE_COLUMNS of a component type that exist in its table
+    
+    prepare_* skips a column it does not get, so a table without one of them
+    trains on the rest instead of failing the SELECT.
+    """
+    table, _ = COMPONENTS[component_type]
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = %s
+        """, (table,))
+        existing = {row[0] for row in cursor.fetchall()}
+    missing = [col for col in FEATURE_COLUMNS[component_type] if col not in existing]
+    if missing:
+        print(f"{table} has no {', '.join(missing)} column(s), training without them")
+    return ['id'] + [col for col in FEATURE_COLUMNS[component_type] if col in existing]
+
+def fetch_component_frame(conn, component_type, where=None, params=None, itersize=FETCH_ITERSIZE, columns=None):
+    """Stream the columns prepare_* needs into a DataFrame
+    
+    A named (server-side) cursor hands over `itersize` rows at a time, so only
+    one chunk of tuples is alive next to the growing DataFrame instead of a
+    dict per row of the whole table.
+    columns defaults to feature_columns(conn, component_type).
+    """
+    table, _ = COMPONENTS[component_type]
+    columns = columns or feature_columns(conn, component_type)
+    query = f"SELECT {', '.join(columns)} FROM {table}"
+    if where:
+        query += f" WHERE {where}"
+    
+    chunks = []
+    with conn.cursor(name=f"fetch_{component_type}") as cursor:
+        cursor.itersize = itersize
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(itersize)
+            if not rows:
+                break
+            chunks.append(pd.DataFrame(rows, columns=columns, dtype=object))
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    # Infer dtypes once over all rows, as building the frame from every row at once would
+    return pd.concat(chunks, ignore_index=True).infer_objects()
+
+# Content hash of a spec row, ignoring the columns this job writes
+ROW_HASH_SQL = "md5((to_jsonb(t) - 'ml_score' - 'rank')::text)"
+
+# Share of changed rows above which an incremental run retrains anyway
+RETRAIN_FRACTION = 0.2
+
+def fetch_row_hashes(cursor, table):
+    """Map each row id of `table` to its content hash"""
+    cursor.execute(f"SELECT id, {ROW_HASH_SQL} AS content_hash FROM {table} t")
+    return {row['id']: row['content_hash'] for row in cursor.fetchall()}
+
+def rank_state_path(component_type):
+    return os.path.join(MODEL_DIR, f"{component_type}_state.joblib")
+
+def load_rank_state(component_type):
+    """Row hashes, source columns and feature names saved by the last successful run, or None"""
+    model_path = os.path.join(MODEL_DIR, f"{component_type}_model.joblib")
+    if not os.path.exists(rank_state_path(component_type)) or not os.path.exists(model_path):
+        return None
+    return joblib.load(rank_state_path(component_type))
+
+def save_rank_state(component_type, state):
+    """Persist a run's state once its ranks are committed, with the model it retrained (if any)"""
+    if state.get('model') is not None:
+        save_model(component_type, state['model'], state['feature_names'])
+    joblib.dump({key: value for key, value in state.items() if key != 'model'}, rank_state_path(component_type))
+
+def rank_component(cursor, component_type, incremental=False, backend='gbr'):
+    """Fetch, train and rank one component type
+    
+    Returns (ranks, state); a retrained model travels in state['model'] until
+    save_rank_state writes it. With incremental=True the saved model re-predicts
+    only new or modified rows and all rows are re-ranked from their stored
+    scores; ranks is None when nothing changed since the last run.
+    """
+    table, prepare = COMPONENTS[component_type]
+    print(f"Processing {component_type} data...")
+    # Hash before fetching, so a row changed in between is picked up next run
+    hashes = fetch_row_hashes(cursor, table)
+    columns = feature_columns(cursor.connection, component_type)
+    
+    if incremental:
+        state = load_rank_state(component_type)
+        if state is None:
+            print(f"No saved {component_type} model, retraining")
+        elif state.get('columns') != columns:
+            # The saved model was trained on other inputs; its feature_names no longer line up
+            print(f"{component_type} feature columns changed since the saved model, retraining")
+        else:
+            changed = [row_id for row_id, content_hash in hashes.items()
+                       if state['hashes'].get(row_id) != content_hash]
+            removed = set(state['hashes']) - set(hashes)
+            if not changed and not removed:
+                print(f"No {component_type} changes, skipping")
+                return None, state
+            if len(changed) <= RETRAIN_FRACTION * len(hashes):
+                print(f"Re-ranking {len(changed)} changed and {len(removed)} removed {component_type} rows")
+                ranks = rerank_changed_rows(cursor, component_type, changed, state['feature_names'], columns)
+                return ranks, {'hashes': hashes, 'columns': columns, 'feature_names': state['feature_names']}
+            print(f"{len(changed)} of {len(hashes)} {component_type} rows changed, retraining")
+    
+    features = prepare(fetch_component_frame(cursor.connection, component_type, columns=columns))
+    model, features_list = train_model(features, 'price_num', component_type, backend)
+    ranks = predict_and_rank(model, features, component_type, features_list)
+    # The model is only written by save_rank_state, after the ranks it produced are committed
+    return ranks, {'hashes': hashes, 'columns': columns, 'feature_names': features_list, 'model': model}
+
+def rerank_changed_rows(cursor, component_type, changed_ids, feature_names, columns=None):
+    """Score `changed_ids` with the saved model and dense-rank them with the stored scores"""
+    table, prepare = COMPONENTS[component_type]
+    model = joblib.load(os.path.join(MODEL_DIR, f"{component_type}_model.joblib"))
+    
+    cursor.execute(f"SELECT id, ml_score FROM {table} WHERE ml_score IS NOT NULL")
+    scores = pd.DataFrame(cursor.fetchall(), columns=['id', 'ml_score'])
+    scores = scores[~scores['id'].isin(changed_ids)]
+    
+    if changed_ids:
+        features = prepare(fetch_component_frame(cursor.connection, component_type, "id = ANY(%s)", (changed_ids,),
+                                                 columns=columns))
+        # A small batch can lack columns that were all NULL; the imputer fills them
+        features = features.reindex(columns=['id'] + feature_names)
+        new_scores = predict_and_rank(model, features, component_type, feature_names)
+        scores = pd.concat([scores, new_scores[['id', 'ml_score']]], ignore_index=True)
+    
+    scores['rank'] = scores['ml_score'].rank(ascending=False, method='dense').astype(int)
+    return scores
+
+def rank_component_worker(component_type, incremental=False, backend='gbr'):
+    """Process pool entry point: rank one component type on its own connection"""
+    conn = psycopg2.connect(**DB_CONFIG)
     try:
-        # Create a cursor
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            print("Processing CPU data...")
-            cursor.execute("SELECT * FROM cpu_specs")
-            cpus = cursor.fetchall()
-            cpu_features = prepare_cpu_data(cpus)
-            cpu_model, cpu_features_list = train_model(cpu_features, 'price_num', 'cpu')
-            cpu_ranks = predict_and_rank(cpu_model, cpu_features, 'cpu', cpu_features_list)
-            
-            print("Processing motherboard data...")
-            cursor.execute("SELECT * FROM motherboard_specs")
-            mobos = cursor.fetchall()
-            mobo_features = prepare_motherboard_data(mobos)
-            mobo_model, mobo_features_list = train_model(mobo_features, 'price_num', 'motherboard')
-            mobo_ranks = predict_and_rank(mobo_model, mobo_features, 'motherboard', mobo_features_list)
-            
-            print("Processing cooler data...")
-            cursor.execute("SELECT * FROM cooler_specs")
-            coolers = cursor.fetchall()
-            cooler_features = prepare_cooler_data(coolers)
-            cooler_model, cooler_features_list = train_model(cooler_features, 'price_num', 'cooler')
-            cooler_ranks = predict_and_rank(cooler_model, cooler_features, 'cooler', cooler_features_list)
-            
-            print("Processing GPU data...")
-            cursor.execute("SELECT * FROM gpu_specs")
-            gpus = cursor.fetchall()
-            gpu_features = prepare_gpu_data(gpus)
-            gpu_model, gpu_features_list = train_model(gpu_features, 'price_num', 'gpu')
-            gpu_ranks = predict_and_rank(gpu_model, gpu_features, 'gpu', gpu_features_list)
-            
-            print("Processing case data...")
-            cursor.execute("SELECT * FROM case_specs")
-            cases = cursor.fetchall()
-            case_features = prepare_case_data(cases)
-            case_model, case_features_list = train_model(case_features, 'price_num', 'case')
-            case_ranks = predict_and_rank(case_model, case_features, 'case', case_features_list)
-            
-            print("Processing PSU data...")
-            cursor.execute("SELECT * FROM psu_specs")
-            psus = cursor.fetchall()
-            psu_features = prepare_psu_data(psus)
-            psu_model, psu_features_list = train_model(psu_features, 'price_num', 'psu')
-            psu_ranks = predict_and_rank(psu_model, psu_features, 'psu', psu_features_list)
-            
-            print("Processing memory data...")
-            cursor.execute("SELECT * FROM memory_specs")
-            memories = cursor.fetchall()
-            memory_features = prepare_memory_data(memories)
-            memory_model, memory_features_list = train_model(memory_features, 'price_num', 'memory')
-            memory_ranks = predict_and_rank(memory_model, memory_features, 'memory', memory_features_list)
-            
-            # Update database with ML scores and ranks
-            print("Updating database with ML scores and ranks...")
-            
-            # Update CPUs
-            for _, row in cpu_ranks.iterrows():
-                cursor.execute(
-                    "UPDATE cpu_specs SET ml_score = %s, rank = %s WHERE id = %s", 
-                    (row['ml_score'], row['rank'], row['id'])
-                )
-            
-            # Update motherboards
-            for _, row in mobo_ranks.iterrows():
-                cursor.execute(
-                    "UPDATE motherboard_specs SET ml_score = %s, rank = %s WHERE id = %s", 
-                    (row['ml_score'], row['rank'], row['id'])
-                )
-            
-            # Update coolers
-            for _, row in cooler_ranks.iterrows():
-                cursor.execute(
-                    "UPDATE cooler_specs SET ml_score = %s, rank = %s WHERE id = %s", 
-                    (row['ml_score'], row['rank'], row['id'])
-                )
-            
-            # Update GPUs
-            for _, row in gpu_ranks.iterrows():
-                cursor.execute(
-                    "UPDATE gpu_specs SET ml_score = %s, rank = %s WHERE id = %s", 
-                    (row['ml_score'], row['rank'], row['id'])
-                )
-            
-            # Update cases
-            for _, row in case_ranks.iterrows():
-                cursor.execute(
-                    "UPDATE case_specs SET ml_score = %s, rank = %s WHERE id = %s", 
-                    (row['ml_score'], row['rank'], row['id'])
-                )
-            
-            # Update PSUs
-            for _, row in psu_ranks.iterrows():
-                cursor.execute(
-                    "UPDATE psu_specs SET ml_score = %s, rank = %s WHERE id = %s", 
-                    (row['ml_score'], row['rank'], row['id'])
-                )
-            
-            # Update memory
-            for _, row in memory_ranks.iterrows():
-                cursor.execute(
-                    "UPDATE memory_specs SET ml_score = %s, rank = %s WHERE id = %s", 
-                    (row['ml_score'], row['rank'], row['id'])
-                )
+            return rank_component(cursor, component_type, incremental, backend)
+    finally:
+        conn.close()
+
+def update_component_ranks(conn, use_copy=False, atomic=False, workers=1, incremental=False, backend='gbr'):
+    """Train ML models and update ranks for all components in the database
+    
+    With workers > 1 the component types are fetched and trained in a process
+    pool, each worker on its own connection, and written back together.
+    Scores are bulk-written per table (execute_values, or COPY with use_copy).
+    Each table is switched in one statement; with atomic=True all seven tables
+    are switched in a single transaction so readers see either the old or the
+    new ranks everywhere.
+    With incremental=True only component types whose rows changed since the
+    last run are touched, re-predicting just the changed rows (see rank_component).
+    backend picks the model trained for each component type (see build_pipeline).
+    """
+    try:
+        all_ranks, states = {}, {}
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(COMPONENTS))) as executor:
+                futures = {executor.submit(rank_component_worker, component_type, incremental, backend): component_type
+                           for component_type in COMPONENTS}
+                for future in as_completed(futures):
+                    all_ranks[futures[future]], states[futures[future]] = future.result()
+                    print(f"Finished {futures[future]} model")
+        else:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                for component_type in COMPONENTS:
+                    all_ranks[component_type], states[component_type] = rank_component(
+                        cursor, component_type, incremental, backend)
+        
+        # End the read transaction before writing so the write-back starts fresh
+        conn.commit()
+        
+        # Update database with ML scores and ranks
+        print("Updating database with ML scores and ranks...")
+        with conn.cursor() as cursor:
+            for component_type, (table, _) in COMPONENTS.items():
+                ranks = all_ranks[component_type]
+                if ranks is None:
+                    continue
+                changed = write_component_ranks(cursor, table, ranks, use_copy)
+                print(f"Updated {changed} of {len(ranks)} rows in {table}")
+                if changed:
+                    # Commits with the ranks, so the recommender's caches see both at once
+                    bump_catalog_version(cursor)
+                
+                # Without atomic, every table switches to its new ranks on its own
+                if not atomic:
+                    conn.commit()
+                    save_rank_state(component_type, states[component_type])
         
         # Commit the changes
         conn.commit()
+        if atomic:
+            for component_type, ranks in all_ranks.items():
+                if ranks is not None:
+                    save_rank_state(component_type, states[component_type])
         print("All component ML scores and ranks updated successfully!")
     
     except Exception as e:
@@ -538,6 +803,19 @@ def update_component_ranks(conn):
 
 def main():
     """Main function to connect to database and update ranks using ML"""
+    parser = argparse.ArgumentParser(description='Train ML ranking models and update component ranks')
+    parser.add_argument('--copy', action='store_true', help='Load new scores with COPY instead of execute_values')
+    parser.add_argument('--atomic', action='store_true',
+                        help='Switch all tables to their new ranks in one transaction')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Train the component types in a pool of this many processes')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only re-rank component types and rows that changed since the last run')
+    parser.add_argument('--backend', choices=MODEL_BACKENDS, default='gbr',
+                        help='Ranking model: gradient boosting, histogram gradient boosting or linear baseline')
+    args = parser.parse_args()
+    
+    conn = None
     try:
         # Connect to database using config settings
         print("Connecting to database...")
@@ -547,7 +825,8 @@ def main():
         ensure_rank_columns_exist(conn)
         
         # Update all component ranks
-        update_component_ranks(conn)
+        update_component_ranks(conn, use_copy=args.copy, atomic=args.atomic, workers=args.workers,
+                               incremental=args.incremental, backend=args.backend)
         
         print("Database update complete!")
         
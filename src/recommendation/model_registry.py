@@ -0,0 +1,157 @@
+# filename: model_registry.py
+"""
+Registry of the persisted component ranking models.
+
+ml_component_ranking.save_model saves one pipeline per component type as
+models/<type>_model.joblib, next to the list of features it was trained on.
+The registry loads each pipeline once on first use and reloads it when a newer
+training run replaces the file. score() turns raw spec rows into ml_score
+values with one batched predict, so newly imported parts can be scored right
+away instead of waiting for the next full retrain.
+
+Usage (score every row of a table that has no ml_score yet):
+  python model_registry.py cpu memory
+"""
+import os
+import json
+import logging
+import argparse
+import threading
+import joblib
+import pandas as pd
+import psycopg2
+from psycopg2.extras import execute_values
+from ml_component_ranking import MODEL_DIR, COMPONENTS, DB_CONFIG, fetch_component_frame
+
+
+class ModelNotFoundError(Exception):
+    """Raised when no trained model exists for a component type"""
+
+
+class ModelRegistry:
+    def __init__(self, model_dir=MODEL_DIR):
+        self.model_dir = model_dir
+        self._lock = threading.Lock()
+        self._models = {}  # component_type -> (file mtime, pipeline, feature_names)
+
+    def get(self, component_type):
+        """(pipeline, feature_names) for `component_type`, loaded on first use"""
+        if component_type not in COMPONENTS:
+            raise ValueError(f"Unknown component type: {component_type}")
+        model_path = os.path.join(self.model_dir, f"{component_type}_model.joblib")
+        try:
+            mtime = os.path.getmtime(model_path)
+        except OSError:
+            raise ModelNotFoundError(f"No trained model for {component_type} at {model_path}")
+
+        with self._lock:
+            cached = self._models.get(component_type)
+            if cached is not None and cached[0] == mtime:
+                return cached[1], cached[2]
+            pipeline = joblib.load(model_path)
+            feature_names = self._load_feature_names(component_type, pipeline)
+            self._models[component_type] = (mtime, pipeline, feature_names)
+        logging.info(f"Registry - Loaded {component_type} model ({len(feature_names)} features)")
+        return pipeline, feature_names
+
+    def _load_feature_names(self, component_type, pipeline):
+        features_path = os.path.join(self.model_dir, f"{component_type}_features.json")
+        if os.path.exists(features_path):
+            with open(features_path) as f:
+                return json.load(f)
+        # Models saved before the feature list was persisted
+        feature_names = getattr(pipeline, 'feature_names_in_', None)
+        if feature_names is None:
+            raise ModelNotFoundError(f"No feature list for the {component_type} model")
+        return list(feature_names)
+
+    def score(self, component_type, rows):
+        """Predict ml_score for spec rows (dicts or a DataFrame shaped like the spec table) in one batch
+
+        Returns a DataFrame with id and ml_score, in input order.
+        """
+        pipeline, feature_names = self.get(component_type)
+        if len(rows) == 0:
+            return pd.DataFrame(columns=['id', 'ml_score'])
+        _, prepare = COMPONENTS[component_type]
+        # Columns that are all NULL in a small batch are missing; the imputer fills them
+        features = prepare(rows).reindex(columns=['id'] + feature_names)
+        return pd.DataFrame({
+            'id': features['id'].to_numpy(),
+            'ml_score': pipeline.predict(features[feature_names])
+        })
+
+    def loaded(self):
+        """Component types currently held in memory"""
+        with self._lock:
+            return sorted(self._models)
+
+
+_shared_registry = None
+_shared_registry_lock = threading.Lock()
+
+
+def get_shared_registry(**kwargs):
+    """Return the process-wide registry, creating it with `kwargs` on first use"""
+    global _shared_registry
+    with _shared_registry_lock:
+        if _shared_registry is None:
+            _shared_registry = ModelRegistry(**kwargs)
+        return _shared_registry
+
+
+def store_scores(conn, component_type, ids=None, registry=None):
+    """Score rows of one spec table with the persisted model and write ml_score and rank
+
+    ids: rows to score; by default every row without an ml_score (e.g. just imported).
+    Dense ranks of the whole table are refreshed afterwards, touching only rows whose
+    rank moved. Returns the number of rows scored.
+    """
+    registry = registry or get_shared_registry()
+    table, _ = COMPONENTS[component_type]
+    if ids is None:
+        rows = fetch_component_frame(conn, component_type, "ml_score IS NULL")
+    else:
+        rows = fetch_component_frame(conn, component_type, "id = ANY(%s)", (list(ids),))
+    if rows.empty:
+        return 0
+
+    scores = registry.score(component_type, rows)
+    with conn.cursor() as cursor:
+        execute_values(cursor, f"""
+            UPDATE {table} AS t SET ml_score = v.ml_score
+            FROM (VALUES %s) AS v(id, ml_score)
+            WHERE t.id = v.id
+        """, list(zip(scores['id'].astype(int).tolist(), scores['ml_score'].astype(float).tolist())))
+
+        cursor.execute(f"""
+            UPDATE {table} AS t SET rank = r.new_rank
+            FROM (
+                SELECT id, DENSE_RANK() OVER (ORDER BY ml_score DESC) AS new_rank
+                FROM {table}
+                WHERE ml_score IS NOT NULL
+            ) r
+            WHERE t.id = r.id AND t.rank IS DISTINCT FROM r.new_rank
+        """)
+    conn.commit()
+    return len(rows)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Score unscored spec rows with the persisted ranking models')
+    parser.add_argument('component_types', nargs='*', default=list(COMPONENTS),
+                        help=f"Component types to score (default: all of {', '.join(COMPONENTS)})")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        for component_type in args.component_types:
+            scored = store_scores(conn, component_type)
+            logging.info(f"Scored {scored} new {component_type} rows")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
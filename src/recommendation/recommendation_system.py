@@ -1,12 +1,23 @@
 # filename: recommendation_system.py
 import json
 import os
+import sys
 import pandas as pd
 import numpy as np
 from data_connection import get_sqlalchemy_engine, connect_to_db
+from catalog_snapshot import CatalogSnapshot, SnapshotSelector
+from connection_pool import get_shared_pool, close_shared_pool
+from beam_search import BeamSearchBuilder
+from result_cache import cache_key, get_shared_cache
+from selection_memo import get_shared_memo, compile_filter, compile_order, text_columns
 import traceback # Added for detailed error logging
 import logging # Use logging
 import argparse # For command-line arguments
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from decimal import Decimal
+
+# Default preferences file, next to this module
+DEFAULT_INPUT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "input.json")
 
 # Assuming logging is configured elsewhere (like in run_evaluation.py)
 # If running this file directly, uncomment the next few lines:
@@ -14,26 +25,55 @@ import argparse # For command-line arguments
 
 class PCRecommendationSystem:
     # Add flags for evaluation modes
-    def __init__(self, input_file=r"C:\Users\voltX\OneDrive\Desktop\pc-builder\src\recommendation\input.json",
-                 use_ml_ranking=True, use_dynamic_budget=True):
-        """Initialize the recommendation system with user preferences and evaluation flags"""
+    def __init__(self, input_file=DEFAULT_INPUT_FILE,
+                 use_ml_ranking=True, use_dynamic_budget=True, catalog=None, pool=None, preferences=None,
+                 tiered_fallbacks=False, use_compat_edges=False, beam_width=1, normalized_columns=False,
+                 result_cache=None, selection_memo=None):
+        """
+        Initialize the recommendation system with user preferences and evaluation flags.
+        `preferences` takes an already-parsed preferences dict, or a text stream holding
+        one JSON document, instead of reading `input_file`.
+        If `catalog` (a CatalogSnapshot) is given, every selection step is answered from
+        memory and no database connection is opened. If `pool` (a ConnectionPool) is given,
+        the connection is borrowed from it and handed back on close().
+        With `tiered_fallbacks`, the budget/segment fallback ladder runs as one ranked
+        query per component instead of one query per attempt.
+        With `use_compat_edges`, get_compatible_* resolve to the edge-table versions
+        from db/compatibility_edges.sql (compat_edges schema) for this connection.
+        With `normalized_columns`, storage is ordered on ssd_specs.capacity_gb and PSU
+        sizing reads tdp_w, the typed columns from db/normalized_columns.sql.
+        With `result_cache` (a ResultCache), build_recommendation returns a stored copy
+        for a profile that selects on the same budgets, segment, platforms and flags.
+        With `selection_memo` (a SelectionMemo), compatibility candidate lists are fetched
+        once per key across builds and filtered/ranked in memory.
+        `beam_width` > 1 replaces the greedy pick order with a top-K beam search
+        over whole builds (see beam_search.py).
+        """
         self.use_ml_ranking = use_ml_ranking
         self.use_dynamic_budget = use_dynamic_budget
-        logging.info(f"Initializing RecommendationSystem with ml_ranking={self.use_ml_ranking}, dynamic_budget={self.use_dynamic_budget}")
+        self.tiered_fallbacks = tiered_fallbacks
+        self.use_compat_edges = use_compat_edges
+        self.normalized_columns = normalized_columns
+        self.beam_width = beam_width
+        self.result_cache = result_cache
+        self.selection_memo = selection_memo
+        self.catalog = catalog
+        logging.info(f"Initializing RecommendationSystem with ml_ranking={self.use_ml_ranking}, dynamic_budget={self.use_dynamic_budget}, in_memory={self.catalog is not None}")
 
         # Load user preferences
-        self.user_prefs = self._load_preferences(input_file)
-
-        # Connect to database
-        self.engine = get_sqlalchemy_engine()
-        self.conn = connect_to_db()
-        # Ensure autocommit is OFF for potentially rolling back during build process if needed
-        self.conn.autocommit = False
-        self.cursor = self.conn.cursor()
+        self.user_prefs = self._load_preferences(preferences if preferences is not None else input_file)
 
+        self.pool = pool
+        self._engine = None
+        self.conn = None
+        self.cursor = None
+        self.snapshot_selector = SnapshotSelector(self, self.catalog) if self.catalog is not None else None
 
         # Store selected components
         self.selected_components = {}
+        # Alternatives fetched alongside each pick, filled only when record_candidates is set (beam search)
+        self.record_candidates = False
+        self.candidates = {}
 
         # Define component tables
         self.component_tables = {
@@ -70,8 +110,38 @@ class PCRecommendationSystem:
         else:
             logging.info("Dynamic budget allocation is OFF. Using static defaults.")
 
+        if self.catalog is None:
+            # Connect last, so a bad profile above cannot strand a pooled connection
+            self.conn = self.pool.acquire() if self.pool is not None else connect_to_db()
+            try:
+                # Ensure autocommit is OFF for potentially rolling back during build process if needed
+                self.conn.autocommit = False
+                self.cursor = self.conn.cursor()
+                if self.use_compat_edges:
+                    # Session-level so it survives the build's commit/rollback; reset in close()
+                    self.cursor.execute("SELECT set_config('search_path', 'compat_edges, ' || current_setting('search_path'), false)")
+                    self.conn.commit()
+            except Exception:
+                self.close()
+                raise
+
+    @property
+    def engine(self):
+        """SQLAlchemy engine, created on first use (no selection step needs it)"""
+        if self._engine is None:
+            self._engine = get_sqlalchemy_engine()
+        return self._engine
+
     def _load_preferences(self, input_file):
-        """Load user preferences from JSON file"""
+        """Load user preferences from a parsed dict, a JSON text stream or a JSON file path"""
+        if isinstance(input_file, dict):
+            return input_file
+        if hasattr(input_file, "read"):
+            try:
+                return json.load(input_file)
+            except json.JSONDecodeError:
+                logging.error("Could not decode JSON from preferences stream")
+                raise
         try:
             with open(input_file, 'r') as f:
                 return json.load(f)
@@ -165,13 +235,13 @@ class PCRecommendationSystem:
         return self.user_prefs["technicalPreferences"].get("marketSegment", "Consumer")
 
     # MODIFIED: Quote "rank" column
-    def _get_order_by_clause(self, table_alias):
+    def _get_order_by_clause(self, table_alias, rank_column='"rank"'):
         """Generate the ORDER BY clause based on the evaluation mode, quoting 'rank'"""
         if self.use_ml_ranking:
             # Use double quotes for the "rank" column name
             return f"""
             ORDER BY
-                CASE WHEN {table_alias}."rank" IS NULL THEN 9999 ELSE {table_alias}."rank" END ASC,
+                CASE WHEN {table_alias}.{rank_column} IS NULL THEN 9999 ELSE {table_alias}.{rank_column} END ASC,
                 {table_alias}.price_num ASC
             """
         else:
@@ -194,42 +264,261 @@ class PCRecommendationSystem:
                 new_params.append(p)
         return tuple(new_params)
 
+    def _candidate_limit(self, limit):
+        """Rows a selection fetches: `limit`, or the beam width if beam search needs more alternatives"""
+        return max(limit, self.beam_width)
+
+    def _segment_param(self, segment_val):
+        """The value a sequential query binds for its segment filter (see _get_params)"""
+        return self._get_params(('SEGMENT_PLACEHOLDER',), None, segment_val)[0]
+
+    def _fallback_attempts(self, original_budget, market_segment=None):
+        """
+        The budget/segment fallback ladder shared by the SQL and in-memory paths.
+        Returns a list of (attempt_name, kind, budget, segment) where kind is
+        "base", "cheapest" or "last_resort".
+        """
+        attempts = [
+            ("Initial Budget", "base", original_budget, market_segment),
+            ("1.5x Budget", "base", original_budget * 1.5, market_segment),
+            ("2.0x Budget", "base", original_budget * 2.0, market_segment),
+            ("2.5x Budget", "base", original_budget * 2.5, market_segment),
+        ]
+
+        # Add Consumer segment fallback if applicable
+        if market_segment == "Workstation":
+            attempts.append(("Consumer Segment Fallback", "base", original_budget * 2.5, "Consumer"))
+
+        # Add cheapest query (still respecting segment if possible)
+        attempts.append(("Cheapest in Segment", "cheapest", None, market_segment if market_segment else "Consumer")) # Default to Consumer if no segment initially
+
+        # Add absolute last resort
+        attempts.append(("Absolute Last Resort", "last_resort", None, None))
+        return attempts
+
+    def _probe_compatible(self, compat_query, compat_params, in_budget, budget_params, order_by, limit):
+        """
+        Runs the compatibility check and the initial-budget query as one statement.
+        compat_query selects every compatible part (no budget filter); in_budget and
+        order_by are written against the alias `p`. A window count tags each row with
+        the number of compatible parts, and one out-of-budget row is kept when nothing
+        fits so an empty budget can be told apart from an empty compatibility set.
+        Returns (compat_count, results, description) where results only holds rows
+        within the initial budget.
+        """
+        if self.selection_memo is not None:
+            probed = self._probe_from_memo(compat_query, compat_params, in_budget, budget_params, order_by, limit)
+            if probed is not None:
+                return probed
+        # Rows within budget sort first, then the usual ranking
+        order_by = order_by.replace("ORDER BY", "ORDER BY p.in_budget DESC,", 1)
+        query = f"""
+            SELECT * FROM (
+                SELECT p.*,
+                       COUNT(*) OVER () AS compat_count,
+                       COALESCE({in_budget}, FALSE) AS in_budget,
+                       ROW_NUMBER() OVER () AS probe_rn
+                FROM ({compat_query}) p
+            ) p
+            WHERE p.in_budget OR p.probe_rn = 1
+            {order_by}
+            LIMIT %s
+        """
+        self.cursor.execute(query, tuple(compat_params) + tuple(budget_params) + (limit,))
+        rows = self.cursor.fetchall()
+        if not rows:
+            return 0, [], None
+        # Drop the three probe columns again
+        compat_count = rows[0][-3]
+        results = [row[:-3] for row in rows if row[-2]]
+        description = self.cursor.description[:-3]
+        return compat_count, results, description
+
+    def _probe_from_memo(self, compat_query, compat_params, in_budget, budget_params, order_by, limit):
+        """_probe_compatible answered from the memoized candidate list; None if the SQL can't be mirrored"""
+        rows, description = self.selection_memo.candidates(self.cursor, compat_query, compat_params)
+        if not rows:
+            return 0, [], description
+        column_names = [desc[0] for desc in description]
+        text = text_columns(description)
+        predicate = compile_filter(in_budget, budget_params, column_names, text)
+        order = compile_order(order_by, column_names, text)
+        if predicate is None or order is None:
+            return None
+        return len(rows), order([row for row in rows if predicate(row)])[:limit], description
+
+    def _tiered_from_memo(self, candidate_query, candidate_params, attempts, rank_column, segment_column, limit):
+        """
+        _execute_tiered_query answered from the memoized candidate list: the ranked rows of the
+        first attempt with any match, up to `limit` for budget tiers and 1 for cheapest tiers
+        like their sequential queries. Returns None if the candidates lack a needed column
+        or the ranking would compare text.
+        """
+        rows, description = self.selection_memo.candidates(self.cursor, candidate_query, candidate_params)
+        if not rows:
+            return None, None, None
+        column_names = [desc[0] for desc in description]
+        price = column_names.index("price_num") if "price_num" in column_names else None
+        rank = column_names.index(rank_column.strip('"')) if rank_column.strip('"') in column_names else None
+        segment = column_names.index(segment_column) if segment_column in column_names else None
+        if price is None or (self.use_ml_ranking and rank is None) or (segment_column and segment is None):
+            return None
+        if text_columns(description) & {"price_num", rank_column.strip('"')}:
+            return None
+
+        for attempt_name, kind, budget_val, segment_val in attempts:
+            if kind == "last_resort":
+                continue
+            tier = [row for row in rows if row[price] is not None and row[price] > 0
+                    and (kind != "base" or row[price] <= budget_val)
+                    and (segment is None or row[segment] == self._segment_param(segment_val))]
+            if not tier:
+                continue
+            if kind != "base": # Cheapest tiers order by price only and keep one row
+                return [min(tier, key=lambda row: row[price])], description, attempt_name
+            if self.use_ml_ranking:
+                tier.sort(key=lambda row: (9999 if row[rank] is None else row[rank], row[price]))
+            else:
+                tier.sort(key=lambda row: row[price])
+            return tier[:limit], description, attempt_name
+        return None, None, None
+
+    @staticmethod
+    def _probe_skips(compat_count):
+        """Fallback attempts already answered by _probe_compatible"""
+        if compat_count == 0:
+            return ("base", "cheapest") # Every function-backed attempt would come back empty
+        return ("Initial Budget",)
+
+    def _execute_tiered_query(self, candidate_query, candidate_params, attempts, component_type,
+                              rank_column='"rank"', segment_column=None, limit=1):
+        """
+        Single-query form of the base/cheapest part of the fallback ladder.
+        candidate_query selects every eligible part with no budget or segment filter.
+        Each attempt becomes one tier of a CASE over price_num (and segment_column),
+        rows are ranked within their tier and the lowest non-empty tier wins, so the
+        answer matches running the attempts one by one: up to `limit` ranked rows
+        for a budget tier, the single cheapest row for a cheapest tier.
+        Returns (results, description, attempt_name), or (None, None, None) if no tier matched.
+        """
+        tier_cases, tier_params, tier_names = [], [], []
+        cheapest_tier = None
+        for attempt_name, kind, budget_val, segment_val in attempts:
+            if kind == "last_resort":
+                continue
+            conditions = []
+            if segment_column:
+                conditions.append(f"p.{segment_column} = %s")
+                tier_params.append(self._segment_param(segment_val))
+            if kind == "base":
+                conditions.append("p.price_num <= %s")
+                tier_params.append(budget_val)
+            elif cheapest_tier is None:
+                cheapest_tier = len(tier_names)
+            tier_cases.append(f"WHEN {' AND '.join(conditions) or 'TRUE'} THEN {len(tier_names)}")
+            tier_names.append(attempt_name)
+        if not tier_names:
+            return None, None, None
+
+        if self.use_ml_ranking:
+            rank_key = f"CASE WHEN p.{rank_column} IS NULL THEN 9999 ELSE p.{rank_column} END"
+            if cheapest_tier is not None:
+                # Cheapest tiers order by price only, like their sequential queries
+                rank_key = f"CASE WHEN p.budget_tier >= {cheapest_tier} THEN 0 ELSE {rank_key} END"
+            tier_order = f"ORDER BY {rank_key} ASC, p.price_num ASC"
+        else:
+            tier_order = "ORDER BY p.price_num ASC"
+        tier_limit = "%s" if cheapest_tier is None else f"CASE WHEN p.budget_tier >= {cheapest_tier} THEN 1 ELSE %s END"
+
+        query = f"""
+            SELECT * FROM (
+                SELECT p.*,
+                       ROW_NUMBER() OVER (PARTITION BY p.budget_tier {tier_order}) AS tier_rn,
+                       MIN(p.budget_tier) OVER () AS first_tier
+                FROM (
+                    SELECT p.*, CASE {' '.join(tier_cases)} END AS budget_tier
+                    FROM ({candidate_query}) p
+                    WHERE p.price_num > 0
+                ) p
+                WHERE p.budget_tier IS NOT NULL
+            ) p
+            WHERE p.budget_tier = p.first_tier AND p.tier_rn <= {tier_limit}
+            ORDER BY p.tier_rn
+        """
+        # Tier params come first: the CASE precedes the candidate subquery in the SQL text
+        self.cursor.execute(query, tuple(tier_params) + tuple(candidate_params) + (limit,))
+        rows = self.cursor.fetchall()
+        if not rows:
+            return None, None, None
+        # Drop budget_tier, tier_rn and first_tier again
+        attempt_name = tier_names[rows[0][-3]]
+        logging.debug(f"{component_type} - First non-empty tier: {attempt_name} ({len(rows)} rows)")
+        return [row[:-3] for row in rows], self.cursor.description[:-3], attempt_name
+
     def _execute_query_with_fallbacks(self, base_query, cheapest_query, last_resort_query,
                                       base_params_template, cheapest_params_template, last_resort_params,
-                                      original_budget, component_type, market_segment=None, brand_filter=""):
+                                      original_budget, component_type, market_segment=None, brand_filter="",
+                                      skip_attempts=(), candidate_query=None, candidate_params=(),
+                                      rank_column='"rank"', segment_column=None, candidate_limit=1):
         """
         Helper to execute queries with budget and market segment fallbacks.
+        skip_attempts holds attempt names or kinds ("base", "cheapest") already known
+        to return nothing, e.g. "Initial Budget" after _probe_compatible.
+        With tiered_fallbacks on and a candidate_query given (the base query without
+        budget, segment, ordering or limit), every base/cheapest attempt is answered by
+        one _execute_tiered_query call and only the last resort runs separately.
+        candidate_limit is the LIMIT of base_query, so the memoized and tiered paths
+        return as many ranked rows as the sequential one.
         Returns (results, description) on success, or (None, None) on failure.
         """
-        budget = original_budget
-        current_market_segment = market_segment
         results = None
         description = None
         query_description = f"{component_type} ({'Market: '+str(market_segment) if market_segment else ''}{', Brand: '+brand_filter if brand_filter else ''})"
 
+        queries = {
+            "base": (base_query, base_params_template),
+            "cheapest": (cheapest_query, cheapest_params_template),
+            "last_resort": (last_resort_query, last_resort_params),
+        }
         query_attempts = [
-            ("Initial Budget", base_query, base_params_template, budget, current_market_segment),
-            ("1.5x Budget", base_query, base_params_template, original_budget * 1.5, current_market_segment),
-            ("2.0x Budget", base_query, base_params_template, original_budget * 2.0, current_market_segment),
-            ("2.5x Budget", base_query, base_params_template, original_budget * 2.5, current_market_segment),
+            (attempt_name, queries[kind][0], queries[kind][1], budget_val, segment_val)
+            for attempt_name, kind, budget_val, segment_val in self._fallback_attempts(original_budget, market_segment)
+            if attempt_name not in skip_attempts and kind not in skip_attempts
         ]
 
-        # Add Consumer segment fallback if applicable
-        if market_segment == "Workstation":
-            query_attempts.append(
-                ("Consumer Segment Fallback", base_query, base_params_template, original_budget * 2.5, "Consumer")
-            )
-
-        # Add cheapest query (still respecting segment if possible)
-        query_attempts.append(
-             ("Cheapest in Segment", cheapest_query, cheapest_params_template, None, current_market_segment if market_segment else "Consumer") # Default to Consumer if no segment initially
-        )
-
-        # Add absolute last resort
-        query_attempts.append(
-             ("Absolute Last Resort", last_resort_query, last_resort_params, None, None)
-        )
+        use_tiered_query = self.tiered_fallbacks and candidate_query
+        if self.selection_memo is not None and candidate_query:
+            try:
+                memo_attempts = [attempt for attempt in self._fallback_attempts(original_budget, market_segment)
+                                 if attempt[0] not in skip_attempts and attempt[1] not in skip_attempts]
+                memo_result = self._tiered_from_memo(candidate_query, candidate_params, memo_attempts,
+                                                     rank_column, segment_column, candidate_limit)
+                if memo_result is not None:
+                    results, description, attempt_name = memo_result
+                    if results:
+                        logging.debug(f"Success on attempt: {attempt_name} (selection memo)")
+                        return results, description
+                    logging.debug(f"No results in any budget tier for {query_description}")
+                    query_attempts = [attempt for attempt in query_attempts if attempt[0] == "Absolute Last Resort"]
+                    use_tiered_query = False
+            except Exception as e:
+                logging.error(f"ERROR during memoized selection for {component_type}: {e}. Falling back to SQL.")
 
+        if use_tiered_query:
+            try:
+                tiered_attempts = [attempt for attempt in self._fallback_attempts(original_budget, market_segment)
+                                   if attempt[0] not in skip_attempts and attempt[1] not in skip_attempts]
+                results, description, attempt_name = self._execute_tiered_query(
+                    candidate_query, candidate_params, tiered_attempts, component_type,
+                    rank_column=rank_column, segment_column=segment_column, limit=candidate_limit)
+                if results:
+                    logging.debug(f"Success on attempt: {attempt_name} (tiered query)")
+                    return results, description
+                logging.debug(f"No results in any budget tier for {query_description}")
+                # Only the last resort is left to try
+                query_attempts = [attempt for attempt in query_attempts if attempt[0] == "Absolute Last Resort"]
+            except Exception as e:
+                logging.error(f"ERROR during tiered query for {component_type}: {e}. Falling back to sequential attempts.")
 
         for attempt_name, query, params_template, budget_val, segment_val in query_attempts:
             try:
@@ -274,14 +563,35 @@ class PCRecommendationSystem:
         try:
             column_names = [desc[0] for desc in description]
             logging.debug(f"{component_type} - Result Columns: {column_names}")
-            component_data = dict(zip(column_names, results[0]))
+            component_data = self._component_from_row(results[0], column_names, component_type)
         except IndexError:
              logging.error(f"IndexError processing {component_type}. Results: {results}, Columns: {column_names}")
              raise Exception(f"Error processing results for {component_type} - likely mismatch between columns and data.")
 
+        if self.record_candidates:
+            # Keep the other fetched rows (LIMIT 5/10) as alternatives for the beam-search builder
+            self.candidates[component_type] = [component_data] + [
+                self._component_from_row(row, column_names, component_type) for row in results[1:]
+            ]
+
+        # --- Over Budget Warning ---
+        current_price = component_data.get('price_num', 0)
+        if current_price > original_budget:
+            logging.warning(f"Selected {component_type} price ${current_price:.2f} exceeds original budget ${original_budget:.2f}")
+
+        # --- Store Component ---
+        self.selected_components[component_type] = component_data
+        logging.info(f"Selected {component_type.upper()}: {component_data.get('name', 'N/A')} (${component_data.get('price_num', 0):.2f})")
+        return component_data
+
+    def _component_from_row(self, row, column_names, component_type):
+        """Turn one result row into a component dict with price_num, rank and ml_score filled in"""
+        component_data = dict(zip(column_names, row))
 
         # --- Price Handling ---
         price_num = component_data.get("price_num")
+        if isinstance(price_num, Decimal):
+            price_num = component_data["price_num"] = float(price_num)  # numeric columns arrive as Decimal
         if not isinstance(price_num, (int, float)) or price_num <= 0:
             price_str = str(component_data.get("price", "$0.00")).replace("$", "").replace(",", "")
             try:
@@ -304,19 +614,67 @@ class PCRecommendationSystem:
         else: # Add defaults for storage
             component_data["rank"] = 9999
             component_data["ml_score"] = 0
+        return component_data
 
-        # --- Over Budget Warning ---
-        current_price = component_data.get('price_num', 0)
-        if current_price > original_budget:
-            logging.warning(f"Selected {component_type} price ${current_price:.2f} exceeds original budget ${original_budget:.2f}")
 
-        # --- Store Component ---
-        self.selected_components[component_type] = component_data
-        logging.info(f"Selected {component_type.upper()}: {component_data.get('name', 'N/A')} (${component_data.get('price_num', 0):.2f})")
-        return component_data
+    def _cpu_has_igpu(self):
+        """Heuristic check for integrated graphics on the selected CPU"""
+        cpu_name = self.selected_components["cpu"].get("name", "").lower()
+        cpu_manu = self.selected_components["cpu"].get("manufacturer", "").lower()
+        return ("g" in cpu_name.split('-')[-1] or "apu" in cpu_name or
+                (cpu_manu == "intel" and not any(flag in cpu_name.split('-')[-1] for flag in ["f", "kf", "ks"])) or
+                 self.selected_components["cpu"].get("integrated_graphics") not in [None, 'NaN', 'No', False])
+
+    def _stock_cooler_possible(self):
+        """Heuristic check for CPUs that usually ship with a usable stock cooler"""
+        cpu_name = self.selected_components["cpu"].get("name", "").lower()
+        return ("ryzen 5" in cpu_name or "ryzen 3" in cpu_name or
+                ("core i5" in cpu_name and "k" not in cpu_name) or "core i3" in cpu_name or
+                "pentium" in cpu_name or "athlon" in cpu_name)
+
+    @staticmethod
+    def _parsed_watts(component):
+        """tdp_w from db/normalized_columns.sql when the row carries it, else None"""
+        tdp_w = component.get("tdp_w") if component else None
+        if tdp_w is None or (isinstance(tdp_w, float) and np.isnan(tdp_w)):
+            return None
+        return int(tdp_w)
+
+    def _psu_power_levels(self):
+        """Estimate PSU wattage requirements. Returns [high, medium, low] in watts."""
+        cpu_tdp, gpu_tdp = 100, 0 # Defaults
+        try: # CPU TDP
+            cpu_tdp_w = self._parsed_watts(self.selected_components["cpu"])
+            cpu_tdp_str = str(self.selected_components["cpu"].get("tdp", "100W"))
+            if cpu_tdp_w is not None:
+                 cpu_tdp = cpu_tdp_w
+            elif cpu_tdp_str and cpu_tdp_str not in ['N/A', 'NaN', '']:
+                 cpu_tdp = int(''.join(filter(str.isdigit, cpu_tdp_str))) if any(char.isdigit() for char in cpu_tdp_str) else 100
+        except Exception as cpu_tdp_err: logging.warning(f"PSU - Could not parse CPU TDP: {cpu_tdp_err}")
+
+        try: # GPU TDP
+            if "gpu" in self.selected_components and self.selected_components["gpu"].get("id") is not None:
+                gpu_tdp_w = self._parsed_watts(self.selected_components["gpu"])
+                gpu_tdp_str = str(self.selected_components["gpu"].get("tdp", "0W"))
+                if gpu_tdp_w is not None:
+                     gpu_tdp = gpu_tdp_w
+                elif gpu_tdp_str and gpu_tdp_str not in ['N/A', 'NaN', '']:
+                     gpu_tdp = int(''.join(filter(str.isdigit, gpu_tdp_str))) if any(char.isdigit() for char in gpu_tdp_str) else 200 # Assume 200W if dedicated GPU TDP missing
+                else: gpu_tdp = 200
+            elif "gpu" not in self.selected_components: gpu_tdp = 250 # Estimate higher if GPU selection failed
+        except Exception as gpu_tdp_err:
+                 logging.warning(f"PSU - Could not parse GPU TDP: {gpu_tdp_err}, using default {gpu_tdp}W.")
+
+        required_power_high = int((cpu_tdp + gpu_tdp + 150) * 1.3)
+        required_power_med = int((cpu_tdp + gpu_tdp + 150) * 1.1)
+        required_power_low = int(cpu_tdp + gpu_tdp + 100)
+        return [required_power_high, required_power_med, required_power_low]
 
 
     def select_cpu(self):
+        if self.snapshot_selector is not None:
+            return self.snapshot_selector.select_cpu()
+
         budget = self._get_component_budget("cpu")
         market_segment = self._get_market_segment()
         platform_pref = self.user_prefs["technicalPreferences"].get("cpuPlatform")
@@ -332,7 +690,7 @@ class PCRecommendationSystem:
             SELECT *, "rank", ml_score FROM cpu_specs
             WHERE price_num <= %s AND price_num > 0 AND market_segment = %s {platform_filter}
             {self._get_order_by_clause('cpu_specs')}
-            LIMIT 5
+            LIMIT {self._candidate_limit(5)}
         """
         cheapest_query = f"""
             SELECT *, "rank", ml_score FROM cpu_specs
@@ -346,6 +704,7 @@ class PCRecommendationSystem:
         absolute_last_resort_query = """
              SELECT *, "rank", ml_score FROM cpu_specs WHERE price_num > 0 ORDER BY price_num ASC LIMIT 1
         """
+        candidate_query = f"SELECT * FROM cpu_specs WHERE price_num > 0 {platform_filter}"
 
         try:
             results, description = self._execute_query_with_fallbacks(
@@ -358,7 +717,10 @@ class PCRecommendationSystem:
                 original_budget=budget,
                 component_type="CPU",
                 market_segment=market_segment,
-                brand_filter=platform_filter
+                brand_filter=platform_filter,
+                candidate_query=candidate_query,
+                segment_column="market_segment",
+                candidate_limit=self._candidate_limit(5)
             )
 
             if not results:
@@ -377,16 +739,28 @@ class PCRecommendationSystem:
     def select_motherboard(self):
         if "cpu" not in self.selected_components:
             raise Exception("CPU must be selected before choosing a motherboard")
+        if self.snapshot_selector is not None:
+            return self.snapshot_selector.select_motherboard()
 
         budget = self._get_component_budget("motherboard")
         cpu_id = self.selected_components["cpu"]["id"]
         logging.info(f"Starting Motherboard Selection - Budget: ${budget:.2f}, CPU ID: {cpu_id}")
 
-        # Compatibility check added
+        compat_query = """
+            SELECT c.*, m."rank", m.ml_score, m.price_num
+            FROM get_compatible_motherboards(%s) c
+            LEFT JOIN motherboard_specs m ON c.id = m.id
+        """
+        # Compatibility check and initial-budget query in one round trip
         try:
-             check_query = "SELECT COUNT(*) FROM get_compatible_motherboards(%s)"
-             self.cursor.execute(check_query, (cpu_id,))
-             count = self.cursor.fetchone()[0]
+             count, results, description = self._probe_compatible(
+                 compat_query=compat_query,
+                 compat_params=(cpu_id,),
+                 in_budget="p.price_num <= %s AND p.price_num > 0",
+                 budget_params=(budget,),
+                 order_by=self._get_order_by_clause('p'),
+                 limit=self._candidate_limit(5)
+             )
              logging.info(f"Motherboard - Found {count} compatible parts via function.")
              if count == 0:
                  raise Exception(f"No compatible motherboards found via function for CPU ID {cpu_id}")
@@ -414,7 +788,7 @@ class PCRecommendationSystem:
             LEFT JOIN motherboard_specs m ON c.id = m.id
             WHERE m.price_num <= %s AND m.price_num > 0
             {self._get_order_by_clause('m')}
-            LIMIT 5
+            LIMIT {self._candidate_limit(5)}
         """
         cheapest_query = """
              SELECT c.*, m."rank", m.ml_score, m.price_num
@@ -429,16 +803,23 @@ class PCRecommendationSystem:
         """
 
         try:
-            results, description = self._execute_query_with_fallbacks(
-                base_query=base_query,
-                cheapest_query=cheapest_query,
-                last_resort_query=last_resort_query,
-                base_params_template=(cpu_id, -1),
-                cheapest_params_template=(cpu_id,),
-                last_resort_params=(),
-                original_budget=budget,
-                component_type="Motherboard"
-            )
+            if results:
+                logging.debug("Success on attempt: Initial Budget")
+            else:
+                results, description = self._execute_query_with_fallbacks(
+                    base_query=base_query,
+                    cheapest_query=cheapest_query,
+                    last_resort_query=last_resort_query,
+                    base_params_template=(cpu_id, -1),
+                    cheapest_params_template=(cpu_id,),
+                    last_resort_params=(),
+                    original_budget=budget,
+                    component_type="Motherboard",
+                    skip_attempts=self._probe_skips(count),
+                    candidate_query=compat_query,
+                    candidate_params=(cpu_id,),
+                    candidate_limit=self._candidate_limit(5)
+                )
             return self._process_and_store_component(results, description, "motherboard", budget)
 
         except Exception as e:
@@ -449,15 +830,29 @@ class PCRecommendationSystem:
     def select_cooler(self):
         if "cpu" not in self.selected_components:
             raise Exception("CPU must be selected before choosing a CPU cooler")
+        if self.snapshot_selector is not None:
+            return self.snapshot_selector.select_cooler()
 
         budget = self._get_component_budget("cooler")
         cpu_id = self.selected_components["cpu"]["id"]
         logging.info(f"Starting Cooler Selection - Budget: ${budget:.2f}, CPU ID: {cpu_id}")
 
+        compat_query = """
+            SELECT c.*, cs."rank", cs.ml_score, cs.price_num
+            FROM get_compatible_cpu_coolers(%s) c
+            LEFT JOIN cooler_specs cs ON c.id = cs.id
+        """
+        results, description, skip_attempts = None, None, ()
         try:
-             check_query = "SELECT COUNT(*) FROM get_compatible_cpu_coolers(%s)"
-             self.cursor.execute(check_query, (cpu_id,))
-             count = self.cursor.fetchone()[0]
+             count, results, description = self._probe_compatible(
+                 compat_query=compat_query,
+                 compat_params=(cpu_id,),
+                 in_budget="p.price_num <= %s AND p.price_num > 0",
+                 budget_params=(budget,),
+                 order_by=self._get_order_by_clause('p'),
+                 limit=self._candidate_limit(5)
+             )
+             skip_attempts = self._probe_skips(count)
              logging.info(f"Cooler - Found {count} compatible parts via function.")
              # Don't raise error if count is 0, handle with stock cooler logic later
         except Exception as check_err:
@@ -470,7 +865,7 @@ class PCRecommendationSystem:
             LEFT JOIN cooler_specs cs ON c.id = cs.id
             WHERE cs.price_num <= %s AND cs.price_num > 0
             {self._get_order_by_clause('cs')}
-            LIMIT 5
+            LIMIT {self._candidate_limit(5)}
         """
         cheapest_query = """
             SELECT c.*, cs."rank", cs.ml_score, cs.price_num
@@ -485,24 +880,26 @@ class PCRecommendationSystem:
         """
 
         try:
-            results, description = self._execute_query_with_fallbacks(
-                base_query=base_query,
-                cheapest_query=cheapest_query,
-                last_resort_query=last_resort_query,
-                base_params_template=(cpu_id, -1),
-                cheapest_params_template=(cpu_id,),
-                last_resort_params=(),
-                original_budget=budget,
-                component_type="Cooler"
-            )
+            if results:
+                logging.debug("Success on attempt: Initial Budget")
+            else:
+                results, description = self._execute_query_with_fallbacks(
+                    base_query=base_query,
+                    cheapest_query=cheapest_query,
+                    last_resort_query=last_resort_query,
+                    base_params_template=(cpu_id, -1),
+                    cheapest_params_template=(cpu_id,),
+                    last_resort_params=(),
+                    original_budget=budget,
+                    component_type="Cooler",
+                    skip_attempts=skip_attempts,
+                    candidate_query=compat_query,
+                    candidate_params=(cpu_id,),
+                    candidate_limit=self._candidate_limit(5)
+                )
 
             if not results:
-                 cpu_name = self.selected_components["cpu"].get("name", "").lower()
-                 is_stock_possible = ("ryzen 5" in cpu_name or "ryzen 3" in cpu_name or
-                                     ("core i5" in cpu_name and "k" not in cpu_name) or "core i3" in cpu_name or
-                                     "pentium" in cpu_name or "athlon" in cpu_name)
-
-                 if is_stock_possible:
+                 if self._stock_cooler_possible():
                      logging.warning("No specific compatible cooler found, assuming stock cooler is sufficient/used.")
                      cooler = {"id": None, "name": "Stock Cooler (Assumed)", "price": "$0.00", "price_num": 0.0, "rank": 9999, "ml_score": 0}
                      self.selected_components["cooler"] = cooler
@@ -527,16 +924,30 @@ class PCRecommendationSystem:
     def select_memory(self):
         if "motherboard" not in self.selected_components or "cpu" not in self.selected_components:
             raise Exception("Motherboard and CPU must be selected before choosing memory")
+        if self.snapshot_selector is not None:
+            return self.snapshot_selector.select_memory()
 
         budget = self._get_component_budget("memory")
         motherboard_id = self.selected_components["motherboard"]["id"]
         cpu_id = self.selected_components["cpu"]["id"]
         logging.info(f"Starting Memory Selection - Budget: ${budget:.2f}, Mobo ID: {motherboard_id}, CPU ID: {cpu_id}")
 
+        compat_query = """
+            SELECT r.*, m."rank", m.ml_score, m.price_num
+            FROM get_compatible_ram(%s, %s) r
+            LEFT JOIN memory_specs m ON r.id = m.id
+        """
+        results, description, skip_attempts = None, None, ()
         try:
-             check_query = "SELECT COUNT(*) FROM get_compatible_ram(%s, %s)"
-             self.cursor.execute(check_query, (motherboard_id, cpu_id))
-             count = self.cursor.fetchone()[0]
+             count, results, description = self._probe_compatible(
+                 compat_query=compat_query,
+                 compat_params=(motherboard_id, cpu_id),
+                 in_budget="p.price_num <= %s AND p.price_num > 0",
+                 budget_params=(budget,),
+                 order_by=self._get_order_by_clause('p'),
+                 limit=self._candidate_limit(5)
+             )
+             skip_attempts = self._probe_skips(count)
              logging.info(f"Memory - Found {count} compatible parts via function.")
              if count == 0:
                   logging.warning("Memory - Compatibility function returned 0 results. Will try last resort.")
@@ -550,7 +961,7 @@ class PCRecommendationSystem:
             LEFT JOIN memory_specs m ON r.id = m.id
             WHERE m.price_num <= %s AND m.price_num > 0
             {self._get_order_by_clause('m')}
-            LIMIT 5
+            LIMIT {self._candidate_limit(5)}
         """
         cheapest_query = """
             SELECT r.*, m."rank", m.ml_score, m.price_num
@@ -569,16 +980,23 @@ class PCRecommendationSystem:
         """
 
         try:
-            results, description = self._execute_query_with_fallbacks(
-                base_query=base_query,
-                cheapest_query=cheapest_query,
-                last_resort_query=last_resort_query,
-                base_params_template=(motherboard_id, cpu_id, -1),
-                cheapest_params_template=(motherboard_id, cpu_id),
-                last_resort_params=(),
-                original_budget=budget,
-                component_type="Memory"
-            )
+            if results:
+                logging.debug("Success on attempt: Initial Budget")
+            else:
+                results, description = self._execute_query_with_fallbacks(
+                    base_query=base_query,
+                    cheapest_query=cheapest_query,
+                    last_resort_query=last_resort_query,
+                    base_params_template=(motherboard_id, cpu_id, -1),
+                    cheapest_params_template=(motherboard_id, cpu_id),
+                    last_resort_params=(),
+                    original_budget=budget,
+                    component_type="Memory",
+                    skip_attempts=skip_attempts,
+                    candidate_query=compat_query,
+                    candidate_params=(motherboard_id, cpu_id),
+                    candidate_limit=self._candidate_limit(5)
+                )
             return self._process_and_store_component(results, description, "memory", budget)
 
         except Exception as e:
@@ -588,6 +1006,8 @@ class PCRecommendationSystem:
     def select_gpu(self):
         if "motherboard" not in self.selected_components:
             raise Exception("Motherboard must be selected before choosing a GPU")
+        if self.snapshot_selector is not None:
+            return self.snapshot_selector.select_gpu()
 
         budget = self._get_component_budget("gpu")
         motherboard_id = self.selected_components["motherboard"]["id"]
@@ -603,18 +1023,30 @@ class PCRecommendationSystem:
             logging.debug(f"GPU Brand filter: {brand_filter}")
 
         # --- Integrated Graphics Check ---
-        cpu_name = self.selected_components["cpu"].get("name", "").lower()
-        cpu_manu = self.selected_components["cpu"].get("manufacturer", "").lower()
-        has_igpu = ("g" in cpu_name.split('-')[-1] or "apu" in cpu_name or
-                   (cpu_manu == "intel" and not any(flag in cpu_name.split('-')[-1] for flag in ["f", "kf", "ks"])) or
-                    self.selected_components["cpu"].get("integrated_graphics") not in [None, 'NaN', 'No', False])
+        has_igpu = self._cpu_has_igpu()
+
+        # get_compatible_video_cards returns tdp as text; take the parsed twin from gpu_specs when available
+        gpu_columns = "g.rank as gpu_rank, g.ml_score, g.price_num, g.market_segment, g.brand"
+        if self.normalized_columns:
+            gpu_columns += ", g.tdp_w"
 
         # --- Compatibility Check ---
         compat_count = 0
+        results, description = None, None
         try:
-            compat_check_query = "SELECT COUNT(*) FROM get_compatible_video_cards(%s)"
-            self.cursor.execute(compat_check_query, (motherboard_id,))
-            compat_count = self.cursor.fetchone()[0]
+            # Compatibility check and initial-budget query (brand filter included) in one round trip
+            compat_count, results, description = self._probe_compatible(
+                compat_query=f"""
+                    SELECT v.*, {gpu_columns}
+                    FROM get_compatible_video_cards(%s) v
+                    LEFT JOIN gpu_specs g ON v.id = g.id
+                """,
+                compat_params=(motherboard_id,),
+                in_budget=f"p.price_num <= %s AND p.price_num > 0 AND p.market_segment = %s {brand_filter.replace('g.brand', 'p.brand')}",
+                budget_params=(budget, market_segment),
+                order_by=self._get_order_by_clause('p', rank_column='gpu_rank'),
+                limit=self._candidate_limit(10)
+            )
             logging.info(f"GPU - Found {compat_count} compatible parts via function.")
             if compat_count == 0 and not has_igpu:
                  # Don't raise yet, let fallbacks try direct query
@@ -632,23 +1064,30 @@ class PCRecommendationSystem:
         # Base/Cheapest use function if it worked (compat_count >= 0)
         if compat_count >= 0:
             base_query_template = f"""
-                SELECT v.*, g.rank as gpu_rank, g.ml_score, g.price_num, g.market_segment, g.brand
+                SELECT v.*, {gpu_columns}
                 FROM get_compatible_video_cards(%s) v
                 LEFT JOIN gpu_specs g ON v.id = g.id
                 WHERE g.price_num <= %s AND g.price_num > 0 AND g.market_segment = %s {{brand_filter_placeholder}}
                 {self._get_order_by_clause('g')}
-                LIMIT 10
+                LIMIT {self._candidate_limit(10)}
             """
             cheapest_query_template = f"""
-                 SELECT v.*, g.rank as gpu_rank, g.ml_score, g.price_num, g.market_segment, g.brand
+                 SELECT v.*, {gpu_columns}
                  FROM get_compatible_video_cards(%s) v
                  LEFT JOIN gpu_specs g ON v.id = g.id
                  WHERE g.price_num > 0 AND g.market_segment = %s {{brand_filter_placeholder}}
                  ORDER BY g.price_num ASC
                  LIMIT 1
             """
+            candidate_query_template = f"""
+                 SELECT v.*, {gpu_columns}
+                 FROM get_compatible_video_cards(%s) v
+                 LEFT JOIN gpu_specs g ON v.id = g.id
+                 WHERE TRUE {{brand_filter_placeholder}}
+            """
             base_params_template = (motherboard_id, -1, 'SEGMENT_PLACEHOLDER')
             cheapest_params_template = (motherboard_id, 'SEGMENT_PLACEHOLDER')
+            candidate_params = (motherboard_id,)
         else: # Function failed or returned 0 - use direct query on gpu_specs
              logging.warning("GPU - Using direct queries on gpu_specs table.")
              base_query_template = f"""
@@ -656,7 +1095,7 @@ class PCRecommendationSystem:
                  FROM gpu_specs g
                  WHERE g.price_num <= %s AND g.price_num > 0 AND g.market_segment = %s {{brand_filter_placeholder}}
                  {self._get_order_by_clause('g')}
-                 LIMIT 10
+                 LIMIT {self._candidate_limit(10)}
              """
              cheapest_query_template = f"""
                   SELECT *, "rank" as gpu_rank
@@ -665,8 +1104,14 @@ class PCRecommendationSystem:
                   ORDER BY g.price_num ASC
                   LIMIT 1
              """
+             candidate_query_template = """
+                  SELECT *, "rank" as gpu_rank
+                  FROM gpu_specs g
+                  WHERE TRUE {brand_filter_placeholder}
+             """
              base_params_template = (-1, 'SEGMENT_PLACEHOLDER')
              cheapest_params_template = ('SEGMENT_PLACEHOLDER',)
+             candidate_params = ()
 
 
         # Last resort query is always direct
@@ -677,27 +1122,33 @@ class PCRecommendationSystem:
         last_resort_params = ()
 
         try:
-            results = None
-            description = None
             current_brand_filter_sql = brand_filter # SQL part like " AND g.brand = 'NVIDIA'"
-
-            # --- Try initial budget with brand filter ---
-            if current_brand_filter_sql:
-                 logging.debug(f"GPU - Trying query with brand filter: {current_brand_filter_sql}")
-                 query = base_query_template.format(brand_filter_placeholder=current_brand_filter_sql)
-                 current_params = self._get_params(base_params_template, budget, market_segment)
-                 self.cursor.execute(query, current_params)
-                 results = self.cursor.fetchall()
-                 if results: description = self.cursor.description
+            skip_attempts = ()
+
+            if compat_count < 0:
+                results = None
+                description = None
+                # --- Try initial budget with brand filter ---
+                if current_brand_filter_sql:
+                     logging.debug(f"GPU - Trying query with brand filter: {current_brand_filter_sql}")
+                     query = base_query_template.format(brand_filter_placeholder=current_brand_filter_sql)
+                     current_params = self._get_params(base_params_template, budget, market_segment)
+                     self.cursor.execute(query, current_params)
+                     results = self.cursor.fetchall()
+                     if results: description = self.cursor.description
+            else:
+                # The probe already answered the initial budget (with the brand filter, if any)
+                skip_attempts = self._probe_skips(compat_count)
 
             # --- Try initial budget without brand filter (if needed) ---
             if not results:
                  if current_brand_filter_sql: logging.debug("GPU - No results with brand filter, trying without.")
-                 query = base_query_template.format(brand_filter_placeholder="")
-                 current_params = self._get_params(base_params_template, budget, market_segment)
-                 self.cursor.execute(query, current_params)
-                 results = self.cursor.fetchall()
-                 if results: description = self.cursor.description
+                 if compat_count < 0 or (compat_count > 0 and current_brand_filter_sql):
+                     query = base_query_template.format(brand_filter_placeholder="")
+                     current_params = self._get_params(base_params_template, budget, market_segment)
+                     self.cursor.execute(query, current_params)
+                     results = self.cursor.fetchall()
+                     if results: description = self.cursor.description
                  current_brand_filter_sql = "" # Clear for subsequent fallbacks
 
             # --- Use helper for budget/segment fallbacks ---
@@ -712,7 +1163,13 @@ class PCRecommendationSystem:
                     original_budget=budget, # Pass original budget for fallbacks
                     component_type="GPU",
                     market_segment=market_segment,
-                    brand_filter=brand_filter # Original preference for logging
+                    brand_filter=brand_filter, # Original preference for logging
+                    skip_attempts=skip_attempts,
+                    candidate_query=candidate_query_template.format(brand_filter_placeholder=current_brand_filter_sql),
+                    candidate_params=candidate_params,
+                    rank_column="gpu_rank",
+                    segment_column="market_segment",
+                    candidate_limit=self._candidate_limit(10)
                 )
 
             # --- Final iGPU Check ---
@@ -735,6 +1192,8 @@ class PCRecommendationSystem:
     def select_case(self):
         if "motherboard" not in self.selected_components:
              raise Exception("Motherboard must be selected before choosing a case")
+        if self.snapshot_selector is not None:
+            return self.snapshot_selector.select_case()
 
         gpu_id = self.selected_components.get("gpu", {}).get("id")
         motherboard_id = self.selected_components["motherboard"]["id"]
@@ -744,14 +1203,25 @@ class PCRecommendationSystem:
         compat_count = -1
         compat_params = None
         use_direct_query_logic = False
+        results, description = None, None
 
         # --- Define Queries based on GPU presence ---
         if gpu_id is not None:
+            case_compat_query = """
+                SELECT c.id, c.name, c.price, c.type, c.color, cs."rank" as case_rank, cs.ml_score, cs.price_num
+                FROM get_compatible_case(%s, %s) c
+                LEFT JOIN case_specs cs ON c.id = cs.id
+            """
             try:
-                compat_check_query = "SELECT COUNT(*) FROM get_compatible_case(%s, %s)"
                 compat_params = (gpu_id, motherboard_id)
-                self.cursor.execute(compat_check_query, compat_params)
-                compat_count = self.cursor.fetchone()[0]
+                compat_count, results, description = self._probe_compatible(
+                    compat_query=case_compat_query,
+                    compat_params=compat_params,
+                    in_budget="p.price_num <= %s AND p.price_num > 0",
+                    budget_params=(budget,),
+                    order_by=self._get_order_by_clause('p', rank_column='case_rank'),
+                    limit=self._candidate_limit(1)
+                )
                 logging.info(f"Case - Found {compat_count} compatible parts via function (GPU specific).")
                 if compat_count == 0:
                      logging.warning("Case - Compatibility function returned 0 with GPU ID. Will try direct queries.")
@@ -767,7 +1237,7 @@ class PCRecommendationSystem:
                     LEFT JOIN case_specs cs ON c.id = cs.id
                     WHERE cs.price_num <= %s AND cs.price_num > 0
                     {self._get_order_by_clause('cs')}
-                    LIMIT 1
+                    LIMIT {self._candidate_limit(1)}
                 """
                 cheapest_query = """
                     SELECT c.id, c.name, c.price, c.type, c.color, cs."rank" as case_rank, cs.ml_score, cs.price_num
@@ -779,6 +1249,8 @@ class PCRecommendationSystem:
                 """
                 base_params_template = (gpu_id, motherboard_id, -1)
                 cheapest_params_template = (gpu_id, motherboard_id)
+                candidate_query = case_compat_query
+                candidate_params = (gpu_id, motherboard_id)
 
         # If no GPU or GPU compat check failed/returned 0
         if gpu_id is None or use_direct_query_logic:
@@ -786,11 +1258,21 @@ class PCRecommendationSystem:
                 logging.info("Case - No dedicated GPU or initial compat check failed. Using motherboard form factor.")
             mobo_form_factor = self.selected_components["motherboard"].get("form_factor", "ATX")
             form_factor_like = f"%{mobo_form_factor}%"
+            form_factor_query = """
+                SELECT cs.id, cs.name, cs.price, cs.type, cs.color, cs."rank" as case_rank, cs.ml_score, cs.price_num
+                FROM case_specs cs
+                WHERE cs.motherboard_form_factor LIKE %s AND cs.price_num > 0
+            """
             try:
-                 compat_check_query = "SELECT COUNT(*) FROM case_specs WHERE motherboard_form_factor LIKE %s AND price_num > 0"
                  compat_params = (form_factor_like,)
-                 self.cursor.execute(compat_check_query, compat_params)
-                 compat_count = self.cursor.fetchone()[0]
+                 compat_count, results, description = self._probe_compatible(
+                     compat_query=form_factor_query,
+                     compat_params=compat_params,
+                     in_budget="p.price_num <= %s",
+                     budget_params=(budget,),
+                     order_by=self._get_order_by_clause('p', rank_column='case_rank'),
+                     limit=self._candidate_limit(1)
+                 )
                  logging.info(f"Case - Found {compat_count} compatible parts via form factor '{mobo_form_factor}'.")
             except Exception as ff_check_err:
                  logging.warning(f"Case - Error checking compatibility by form factor: {ff_check_err}. Will proceed to last resort if needed.")
@@ -802,7 +1284,7 @@ class PCRecommendationSystem:
                 WHERE cs.motherboard_form_factor LIKE %s
                   AND cs.price_num <= %s AND cs.price_num > 0
                 {self._get_order_by_clause('cs')}
-                LIMIT 1
+                LIMIT {self._candidate_limit(1)}
             """
             cheapest_query = """
                  SELECT cs.id, cs.name, cs.price, cs.type, cs.color, cs."rank" as case_rank, cs.ml_score, cs.price_num
@@ -814,6 +1296,8 @@ class PCRecommendationSystem:
             """
             base_params_template = (form_factor_like, -1)
             cheapest_params_template = (form_factor_like,)
+            candidate_query = form_factor_query
+            candidate_params = (form_factor_like,)
 
         # Last resort query is always direct, ignoring compatibility checks
         last_resort_query = """
@@ -828,6 +1312,8 @@ class PCRecommendationSystem:
                  self.cursor.execute(last_resort_query, last_resort_params)
                  results = self.cursor.fetchall()
                  description = self.cursor.description
+             elif results: # The probe found a case within the initial budget
+                 logging.debug("Success on attempt: Initial Budget")
              else: # compat_count > 0 or check failed (compat_count == -1)
                  results, description = self._execute_query_with_fallbacks(
                      base_query=base_query,
@@ -837,7 +1323,12 @@ class PCRecommendationSystem:
                      cheapest_params_template=cheapest_params_template,
                      last_resort_params=last_resort_params,
                      original_budget=budget,
-                     component_type="Case"
+                     component_type="Case",
+                     skip_attempts=self._probe_skips(compat_count) if compat_count > 0 else (),
+                     candidate_query=candidate_query,
+                     candidate_params=candidate_params,
+                     rank_column="case_rank",
+                     candidate_limit=self._candidate_limit(1)
                  )
 
              return self._process_and_store_component(results, description, "case", budget)
@@ -849,6 +1340,8 @@ class PCRecommendationSystem:
     def select_psu(self):
         if "cpu" not in self.selected_components or "case" not in self.selected_components:
             raise Exception("CPU and Case must be selected before choosing a PSU")
+        if self.snapshot_selector is not None:
+            return self.snapshot_selector.select_psu()
         # Handle case where case selection failed/placeholder
         case_id = self.selected_components["case"].get("id")
         if not case_id:
@@ -860,38 +1353,31 @@ class PCRecommendationSystem:
         original_budget = budget
 
         # --- Calculate Power Requirement ---
-        cpu_tdp, gpu_tdp = 100, 0 # Defaults
-        try: # CPU TDP
-            cpu_tdp_str = str(self.selected_components["cpu"].get("tdp", "100W"))
-            if cpu_tdp_str and cpu_tdp_str not in ['N/A', 'NaN', '']:
-                 cpu_tdp = int(''.join(filter(str.isdigit, cpu_tdp_str))) if any(char.isdigit() for char in cpu_tdp_str) else 100
-        except Exception as cpu_tdp_err: logging.warning(f"PSU - Could not parse CPU TDP: {cpu_tdp_err}")
-
-        try: # GPU TDP
-            if "gpu" in self.selected_components and self.selected_components["gpu"].get("id") is not None:
-                gpu_tdp_str = str(self.selected_components["gpu"].get("tdp", "0W"))
-                if gpu_tdp_str and gpu_tdp_str not in ['N/A', 'NaN', '']:
-                     gpu_tdp = int(''.join(filter(str.isdigit, gpu_tdp_str))) if any(char.isdigit() for char in gpu_tdp_str) else 200 # Assume 200W if dedicated GPU TDP missing
-                else: gpu_tdp = 200
-            elif "gpu" not in self.selected_components: gpu_tdp = 250 # Estimate higher if GPU selection failed
-        except Exception as gpu_tdp_err:
-                 logging.warning(f"PSU - Could not parse GPU TDP: {gpu_tdp_err}, using default {gpu_tdp}W.")
-
-        required_power_high = int((cpu_tdp + gpu_tdp + 150) * 1.3)
-        required_power_med = int((cpu_tdp + gpu_tdp + 150) * 1.1)
-        required_power_low = int(cpu_tdp + gpu_tdp + 100)
-        power_levels_to_try = [required_power_high, required_power_med, required_power_low]
+        power_levels_to_try = self._psu_power_levels()
+        required_power_high, required_power_med, required_power_low = power_levels_to_try
         current_power_req = required_power_high # Start high
         logging.info(f"Starting PSU Selection - Budget: ${budget:.2f}, Case ID: {case_id}, Req Power Est: ~{current_power_req}W")
 
         # --- Check Compatibility & Adjust Power Req ---
         compat_count = 0
+        results, description = None, None
+        psu_compat_query = """
+            SELECT p.id, p.name, p.price, p.type, p.efficiency_rating, p.wattage, ps."rank" as psu_rank, ps.ml_score, ps.price_num
+            FROM get_compatible_psu(%s, %s) p
+            LEFT JOIN psu_specs ps ON p.id = ps.id
+        """
         if case_id: # Only check if we have a case ID
              try:
-                 check_query = "SELECT COUNT(*) FROM get_compatible_psu(%s, %s)"
                  for power_level in power_levels_to_try:
-                     self.cursor.execute(check_query, (power_level, case_id))
-                     count = self.cursor.fetchone()[0]
+                     # Compatibility check and initial-budget query for this power level in one round trip
+                     count, results, description = self._probe_compatible(
+                         compat_query=psu_compat_query,
+                         compat_params=(power_level, case_id),
+                         in_budget="p.price_num <= %s AND p.price_num > 0",
+                         budget_params=(budget,),
+                         order_by=self._get_order_by_clause('p', rank_column='psu_rank'),
+                         limit=self._candidate_limit(1)
+                     )
                      if count > 0:
                          current_power_req = power_level
                          compat_count = count
@@ -917,7 +1403,7 @@ class PCRecommendationSystem:
                 LEFT JOIN psu_specs ps ON p.id = ps.id
                 WHERE ps.price_num <= %s AND ps.price_num > 0
                 {self._get_order_by_clause('ps')}
-                LIMIT 1
+                LIMIT {self._candidate_limit(1)}
             """
             cheapest_query = """
                 SELECT p.id, p.name, p.price, p.type, p.efficiency_rating, p.wattage, ps."rank" as psu_rank, ps.ml_score, ps.price_num
@@ -929,6 +1415,8 @@ class PCRecommendationSystem:
             """
             base_params_template = (current_power_req, case_id, -1)
             cheapest_params_template = (current_power_req, case_id)
+            candidate_query = psu_compat_query
+            candidate_params = (current_power_req, case_id)
         else: # Direct query on psu_specs (no reliable compatibility)
              logging.warning("PSU - Using direct queries on psu_specs (no/failed compatibility check).")
              base_query = f"""
@@ -937,7 +1425,7 @@ class PCRecommendationSystem:
                  WHERE ps.wattage >= %s /* Filter by minimum power */
                    AND ps.price_num <= %s AND ps.price_num > 0
                  {self._get_order_by_clause('ps')}
-                 LIMIT 1
+                 LIMIT {self._candidate_limit(1)}
              """
              cheapest_query = """
                  SELECT *, "rank" as psu_rank
@@ -948,6 +1436,12 @@ class PCRecommendationSystem:
              """
              base_params_template = (current_power_req, -1) # Use lowest power req for direct query minimum
              cheapest_params_template = (current_power_req,)
+             candidate_query = """
+                 SELECT *, "rank" as psu_rank
+                 FROM psu_specs ps
+                 WHERE ps.wattage >= %s
+             """
+             candidate_params = (current_power_req,)
 
 
         # Last resort: Cheapest PSU above minimum power (ignore case compat)
@@ -959,16 +1453,24 @@ class PCRecommendationSystem:
         last_resort_params = (required_power_low,) # Use lowest calculated power
 
         try:
-            results, description = self._execute_query_with_fallbacks(
-                base_query=base_query,
-                cheapest_query=cheapest_query,
-                last_resort_query=last_resort_query,
-                base_params_template=base_params_template,
-                cheapest_params_template=cheapest_params_template,
-                last_resort_params=last_resort_params,
-                original_budget=budget,
-                component_type="PSU"
-            )
+            if use_compat_function and results:
+                logging.debug("Success on attempt: Initial Budget")
+            else:
+                results, description = self._execute_query_with_fallbacks(
+                    base_query=base_query,
+                    cheapest_query=cheapest_query,
+                    last_resort_query=last_resort_query,
+                    base_params_template=base_params_template,
+                    cheapest_params_template=cheapest_params_template,
+                    last_resort_params=last_resort_params,
+                    original_budget=budget,
+                    component_type="PSU",
+                    skip_attempts=self._probe_skips(compat_count) if use_compat_function else (),
+                    candidate_query=candidate_query,
+                    candidate_params=candidate_params,
+                    rank_column="psu_rank",
+                    candidate_limit=self._candidate_limit(1)
+                )
             return self._process_and_store_component(results, description, "psu", budget)
 
         except Exception as e:
@@ -979,6 +1481,8 @@ class PCRecommendationSystem:
         """Select the best storage device compatible with the motherboard, prioritizing capacity then price."""
         if "motherboard" not in self.selected_components:
             raise Exception("Motherboard must be selected before choosing storage")
+        if self.snapshot_selector is not None:
+            return self.snapshot_selector.select_storage()
 
         budget = self._get_component_budget("storage")
         original_budget = budget
@@ -986,20 +1490,31 @@ class PCRecommendationSystem:
         logging.info(f"Starting Storage Selection - Budget: ${budget:.2f}, Mobo ID: {motherboard_id}")
 
         use_direct_query = False
+        probe_results, probe_description = None, None
         
-        # --- Check Compatibility Function ---
+        # --- Check Compatibility Function (and try the initial budget in the same query) ---
         try:
-            check_query = "SELECT COUNT(*) FROM get_compatible_ssd(%s)"
-            self.cursor.execute(check_query, (motherboard_id,))
-            count = self.cursor.fetchone()[0]
+            count, probe_results, probe_description = self._probe_compatible(
+                compat_query="""
+                    SELECT 
+                        s.id, s.name, s.price, s.capacity, s.price_per_gb, 
+                        s.type, s.cache, s.form_factor, s.interface
+                    FROM get_compatible_ssd(%s) s
+                """,
+                compat_params=(motherboard_id,),
+                in_budget="p.price <= %s AND p.price > 0",
+                budget_params=(budget,),
+                order_by="ORDER BY p.capacity DESC, p.price ASC",
+                limit=self._candidate_limit(1)
+            )
             logging.info(f"Storage - Found {count} compatible parts via function.")
             if count == 0:
                  logging.warning("get_compatible_ssd returned 0 results. Trying direct query on ssd_specs.")
                  use_direct_query = True
                  # Verify ssd_specs table isn't empty
-                 check_query_direct = "SELECT COUNT(*) FROM ssd_specs WHERE price_num > 0"
+                 check_query_direct = "SELECT EXISTS (SELECT 1 FROM ssd_specs WHERE price_num > 0)"
                  self.cursor.execute(check_query_direct)
-                 if self.cursor.fetchone()[0] == 0:
+                 if not self.cursor.fetchone()[0]:
                      raise Exception("No SSDs found in ssd_specs table.")
         except Exception as check_err:
              logging.warning(f"Storage - Error checking compatibility function ({check_err}). Will use direct query.")
@@ -1013,6 +1528,16 @@ class PCRecommendationSystem:
                 price ASC
         """
 
+        # Parsed capacity of the direct ssd_specs queries; a stored column with --normalized-columns
+        if self.normalized_columns:
+            capacity_gb = "ss.capacity_gb"
+        else:
+            capacity_gb = """CASE
+                    WHEN ss.capacity LIKE '%TB' THEN CAST(REPLACE(REPLACE(ss.capacity, 'TB', ''), ' ', '') AS FLOAT) * 1000
+                    WHEN ss.capacity LIKE '%GB' THEN CAST(REPLACE(REPLACE(ss.capacity, 'GB', ''), ' ', '') AS FLOAT)
+                    ELSE 0
+                END"""
+
         # --- Define Queries ---
         # FIXED: Matching the exact columns returned by get_compatible_ssd function
         if not use_direct_query:
@@ -1023,7 +1548,7 @@ class PCRecommendationSystem:
                 FROM get_compatible_ssd(%s) s
                 WHERE s.price <= %s AND s.price > 0
                 {capacity_order_by}
-                LIMIT 1
+                LIMIT {self._candidate_limit(1)}
             """
             cheapest_query = """
                 SELECT 
@@ -1042,44 +1567,29 @@ class PCRecommendationSystem:
                     ss.type, ss.cache, ss.form_factor, ss.interface
                  FROM ssd_specs ss
                  WHERE ss.price_num <= %s AND ss.price_num > 0
-                 ORDER BY 
-                    CASE
-                        WHEN ss.capacity LIKE '%TB' THEN CAST(REPLACE(REPLACE(ss.capacity, 'TB', ''), ' ', '') AS FLOAT) * 1000
-                        WHEN ss.capacity LIKE '%GB' THEN CAST(REPLACE(REPLACE(ss.capacity, 'GB', ''), ' ', '') AS FLOAT)
-                        ELSE 0
-                    END DESC,
+                 ORDER BY {capacity_gb} DESC,
                     ss.price_num ASC
-                 LIMIT 1
+                 LIMIT {self._candidate_limit(1)}
              """
-             cheapest_query = """
+             cheapest_query = f"""
                  SELECT 
                     ss.id, ss.name, ss.price, ss.capacity, ss.price_per_gb, 
                     ss.type, ss.cache, ss.form_factor, ss.interface
                  FROM ssd_specs ss
                  WHERE ss.price_num > 0
-                 ORDER BY 
-                    CASE
-                        WHEN ss.capacity LIKE '%TB' THEN CAST(REPLACE(REPLACE(ss.capacity, 'TB', ''), ' ', '') AS FLOAT) * 1000
-                        WHEN ss.capacity LIKE '%GB' THEN CAST(REPLACE(REPLACE(ss.capacity, 'GB', ''), ' ', '') AS FLOAT)
-                        ELSE 0
-                    END DESC,
+                 ORDER BY {capacity_gb} DESC,
                     ss.price_num ASC
                  LIMIT 1
              """
 
         # Last resort is always the same: best capacity-to-price ratio overall SSD
-        last_resort_query = """
+        last_resort_query = f"""
              SELECT 
                 ss.id, ss.name, ss.price, ss.capacity, ss.price_per_gb, 
                 ss.type, ss.cache, ss.form_factor, ss.interface
              FROM ssd_specs ss 
              WHERE ss.price_num > 0 
-             ORDER BY 
-                CASE
-                    WHEN ss.capacity LIKE '%TB' THEN CAST(REPLACE(REPLACE(ss.capacity, 'TB', ''), ' ', '') AS FLOAT) * 1000
-                    WHEN ss.capacity LIKE '%GB' THEN CAST(REPLACE(REPLACE(ss.capacity, 'GB', ''), ' ', '') AS FLOAT)
-                    ELSE 0
-                END DESC,
+             ORDER BY {capacity_gb} DESC,
                 ss.price_num ASC
              LIMIT 1
         """
@@ -1097,16 +1607,20 @@ class PCRecommendationSystem:
                 
                 # Try to find compatible SSD within current budget
                 try:
-                    if not use_direct_query:
-                        # Using compatibility function
-                        self.cursor.execute(base_query, (motherboard_id, current_budget))
+                    if attempt == 0 and not use_direct_query and probe_description is not None:
+                        # The compatibility probe already ran the original budget
+                        results, description = probe_results, probe_description
                     else:
-                        # Using direct query
-                        self.cursor.execute(base_query, (current_budget,))
-                    
-                    results = self.cursor.fetchall()
-                    if results:
+                        if not use_direct_query:
+                            # Using compatibility function
+                            self.cursor.execute(base_query, (motherboard_id, current_budget))
+                        else:
+                            # Using direct query
+                            self.cursor.execute(base_query, (current_budget,))
+                        
+                        results = self.cursor.fetchall()
                         description = self.cursor.description
+                    if results:
                         logging.info(f"Storage - Found suitable drive within budget on attempt {attempt}")
                         break
                 except Exception as query_err:
@@ -1156,14 +1670,19 @@ class PCRecommendationSystem:
                 
             # Process the selected component
             # Convert the results to the format expected by _process_and_store_component
-            component_data = dict(zip([d[0] for d in description], results[0]))
-            
-            # Add price_num field if using compatibility function (which returns price as numeric)
-            if not use_direct_query:
-                component_data['price_num'] = float(component_data.get('price', 0))
-                # Ensure price is formatted as string with $ for consistency
-                if isinstance(component_data['price'], (int, float)):
-                    component_data['price'] = f"${component_data['price']:.2f}"
+            def storage_component(row):
+                component = dict(zip([d[0] for d in description], row))
+                # Add price_num field if using compatibility function (which returns price as numeric)
+                if not use_direct_query:
+                    component['price_num'] = float(component.get('price', 0))
+                    # Ensure price is formatted as string with $ for consistency
+                    if isinstance(component['price'], (int, float)):
+                        component['price'] = f"${component['price']:.2f}"
+                return component
+
+            component_data = storage_component(results[0])
+            if self.record_candidates:
+                self.candidates['storage'] = [component_data] + [storage_component(row) for row in results[1:]]
             
             logging.info(f"Selected storage: {component_data.get('name')} - {component_data.get('capacity')} - ${component_data.get('price_num', 0):.2f}")
             
@@ -1194,7 +1713,21 @@ class PCRecommendationSystem:
         """
         Build a complete PC recommendation based on the budget.
         Returns a dictionary containing the build or error information.
+        A result cache hit returns early and leaves selected_components empty.
         """
+        if self.selection_memo is not None and self.conn is not None:
+            self.selection_memo.ensure_current(self.conn)
+        cache_key_value = None
+        if self.result_cache is not None:
+            if self.conn is not None:
+                self.result_cache.ensure_current(self.conn)
+            cache_key_value = cache_key(self)
+            cache_generation = self.result_cache.generation
+            cached = self.result_cache.get(cache_key_value)
+            if cached is not None:
+                logging.info("Recommendation served from the result cache.")
+                return cached
+
         budget = self.user_prefs['budget']
         conversion_rate = self.inr_to_usd
         logging.info("-" * 20)
@@ -1210,20 +1743,25 @@ class PCRecommendationSystem:
 
         # --- Component Selection Phase ---
         try:
-            # Use explicit calls and store results directly
-            cpu = self.select_cpu()
-            motherboard = self.select_motherboard()
-            cooler = self.select_cooler() # Might return placeholder
-            memory = self.select_memory()
-            gpu = self.select_gpu()    # Might return placeholder
-            case = self.select_case()
-            psu = self.select_psu()
-            storage = self.select_storage()
+            if self.beam_width > 1:
+                # Keeps the top-K partial builds per stage; leaves the best in selected_components
+                BeamSearchBuilder(self, self.beam_width).run()
+            else:
+                # Use explicit calls and store results directly
+                cpu = self.select_cpu()
+                motherboard = self.select_motherboard()
+                cooler = self.select_cooler() # Might return placeholder
+                memory = self.select_memory()
+                gpu = self.select_gpu()    # Might return placeholder
+                case = self.select_case()
+                psu = self.select_psu()
+                storage = self.select_storage()
 
         except Exception as build_exc:
              logging.error(f"CRITICAL ERROR during build process: {build_exc}", exc_info=True)
-             try: self.conn.rollback()
-             except Exception as rb_err: logging.error(f"Rollback failed after critical error: {rb_err}")
+             if self.conn:
+                 try: self.conn.rollback()
+                 except Exception as rb_err: logging.error(f"Rollback failed after critical error: {rb_err}")
              return {
                  "error": f"Critical failure during build: {str(build_exc)}",
                  "components_selected_so_far": self.selected_components
@@ -1298,23 +1836,38 @@ class PCRecommendationSystem:
         else:
             recommendation["status"] = f"Over budget by ₹{total_cost_inr - budget:.2f}"
 
-        try:
-            self.conn.commit()
-            logging.debug("Recommendation built successfully. Committed transaction.")
-        except Exception as commit_err:
-            logging.error(f"Failed to commit transaction: {commit_err}")
-            recommendation["commit_error"] = str(commit_err)
+        if self.conn:
+            try:
+                self.conn.commit()
+                logging.debug("Recommendation built successfully. Committed transaction.")
+            except Exception as commit_err:
+                logging.error(f"Failed to commit transaction: {commit_err}")
+                recommendation["commit_error"] = str(commit_err)
+
+        # Only clean builds are reused; errors may be transient
+        if cache_key_value is not None and not any(key in recommendation for key in ("selection_errors", "commit_error")):
+            self.result_cache.put(cache_key_value, recommendation, cache_generation)
 
         return recommendation
 
 
     def close(self):
-        """Close database connections"""
+        """Close database connections (or hand a pooled connection back)"""
         logging.debug("Closing database connection.")
+        if self.cursor and self.use_compat_edges and not self.conn.closed:
+            try:
+                self.conn.rollback()
+                self.cursor.execute("RESET search_path")
+                self.conn.commit()
+            except Exception as reset_err:
+                logging.warning(f"Error resetting search_path on close: {reset_err}")
         if self.cursor:
             try: self.cursor.close()
             except: pass
-        if self.conn:
+        if self.conn and self.pool is not None:
+            # The pool rolls back any open transaction on release
+            self.pool.release(self.conn)
+        elif self.conn:
             try:
                 if not self.conn.closed and not self.conn.autocommit:
                     self.conn.rollback()
@@ -1323,10 +1876,119 @@ class PCRecommendationSystem:
                  logging.warning(f"Error during rollback on close: {rb_err}")
             try: self.conn.close()
             except: pass
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
         self.cursor = None
         self.conn = None
 
 
+def build_recommendations(profiles, use_ml_ranking=True, use_dynamic_budget=True,
+                          catalog=None, pool=None, max_workers=1, result_cache=None, selection_memo=None,
+                          in_memory=None):
+    """
+    Build recommendations for many preference dicts (e.g. the array in
+    evaluation/input_data.json) against one shared catalog snapshot.
+
+    The catalog is loaded once (from `pool`, or the shared pool, unless one is
+    passed in, in which case no pool is opened) and its memoized compatibility
+    lookups are shared by every profile. Yields (index, recommendation) tuples as builds finish, so with
+    max_workers > 1 the order follows completion, not input order. Repeated
+    profiles are built once when a `result_cache` is given.
+    With in_memory=False no snapshot is loaded and every build borrows a
+    connection from the pool instead. That is the default when a `selection_memo`
+    is given, since the memo only applies to SQL builds (a snapshot memoizes its
+    own lookups).
+    """
+    profiles = list(profiles)
+    if in_memory is None:
+        in_memory = selection_memo is None
+    if catalog is None:
+        pool = pool if pool is not None else get_shared_pool()
+        if in_memory:
+            with pool.connection() as conn:
+                catalog = CatalogSnapshot.load(conn)
+
+    def build_one(prefs):
+        rec_system = None
+        try:
+            # A malformed profile fails here; it gets an error entry like a failed build
+            rec_system = PCRecommendationSystem(preferences=prefs, use_ml_ranking=use_ml_ranking,
+                                                use_dynamic_budget=use_dynamic_budget, catalog=catalog,
+                                                pool=None if catalog is not None else pool,
+                                                result_cache=result_cache, selection_memo=selection_memo)
+            return rec_system.build_recommendation()
+        except Exception as e:
+            logging.error(f"Batch build failed: {e}", exc_info=True)
+            return {"error": f"Error in recommendation system: {str(e)}"}
+        finally:
+            if rec_system:
+                rec_system.close()
+
+    logging.info(f"Building {len(profiles)} recommendations with {max_workers} worker(s)")
+    if max_workers <= 1:
+        for index, prefs in enumerate(profiles):
+            yield index, build_one(prefs)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(build_one, prefs): index for index, prefs in enumerate(profiles)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def run_ndjson(input_file=None, output_file=None, in_memory=False, tiered_fallbacks=False, use_compat_edges=False,
+               normalized_columns=False, result_cache=False, selection_memo=False, beam_width=1):
+    """
+    Streaming mode: read newline-delimited preference objects and write one JSON
+    result line per profile as soon as it is built. Reads stdin / writes stdout
+    unless paths are given. Blank lines are skipped; a line that fails to parse
+    or build produces an {"error": ...} line so output lines stay aligned with input.
+    With `result_cache`, profiles that select the same way are built once; with
+    `selection_memo`, compatibility candidate lists are fetched once per key.
+    `beam_width` > 1 builds every profile with beam search.
+    """
+    pool = get_shared_pool()
+    cache = get_shared_cache() if result_cache else None
+    memo = get_shared_memo() if selection_memo and not in_memory else None
+    catalog = None
+    if in_memory:
+        with pool.connection() as snapshot_conn:
+            catalog = CatalogSnapshot.load(snapshot_conn)
+
+    source = open(input_file, 'r') if input_file else sys.stdin
+    sink = open(output_file, 'w') if output_file else sys.stdout
+    try:
+        for line_no, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            rec_system = None
+            try:
+                prefs = json.loads(line)
+                rec_system = PCRecommendationSystem(preferences=prefs, catalog=catalog, pool=pool,
+                                                    tiered_fallbacks=tiered_fallbacks,
+                                                    use_compat_edges=use_compat_edges,
+                                                    normalized_columns=normalized_columns, beam_width=beam_width,
+                                                    result_cache=cache, selection_memo=memo)
+                recommendation = rec_system.build_recommendation()
+            except Exception as e:
+                logging.error(f"NDJSON line {line_no} failed: {e}")
+                recommendation = {"error": f"Error in recommendation system: {str(e)}"}
+            finally:
+                if rec_system:
+                    rec_system.close()
+            sink.write(json.dumps(recommendation) + "\n")
+            sink.flush()
+    finally:
+        if input_file: source.close()
+        if output_file: sink.close()
+        if cache is not None:
+            logging.info(f"Result cache: {cache.stats()}")
+        if memo is not None:
+            logging.info(f"Selection memo: {memo.stats()}")
+        close_shared_pool()
+
+
 # Keep main for direct testing if needed
 def main():
     logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -1335,16 +1997,49 @@ def main():
     parser = argparse.ArgumentParser(description='PC Parts Recommendation System')
     parser.add_argument('--input', type=str, help='Path to input JSON file with user preferences')
     parser.add_argument('--output', type=str, help='Path to output JSON file for recommendations')
+    parser.add_argument('--in-memory', action='store_true',
+                        help='Load the catalog into memory once and answer every selection step from it')
+    parser.add_argument('--ndjson', action='store_true',
+                        help='Read one preferences JSON object per line (stdin, or --input) and write one result line per profile')
+    parser.add_argument('--tiered-fallbacks', action='store_true',
+                        help='Run the budget/segment fallback ladder as one ranked query per component')
+    parser.add_argument('--compat-edges', action='store_true',
+                        help='Use the precomputed compatibility edge tables (db/compatibility_edges.sql)')
+    parser.add_argument('--normalized-columns', action='store_true',
+                        help='Use the typed columns from db/normalized_columns.sql instead of parsing text per query')
+    parser.add_argument('--result-cache', action='store_true',
+                        help='With --ndjson, reuse the result of an earlier profile that selects the same way')
+    parser.add_argument('--selection-memo', action='store_true',
+                        help='With --ndjson, fetch each compatibility candidate list once and filter it in memory')
+    parser.add_argument('--beam-width', type=int, default=1,
+                        help='Keep the top-K partial builds per selection step (1 = greedy)')
     args = parser.parse_args()
     
     input_file = args.input
     output_file = args.output
+
+    if args.ndjson:
+        run_ndjson(input_file, output_file, in_memory=args.in_memory, tiered_fallbacks=args.tiered_fallbacks,
+                   use_compat_edges=args.compat_edges, normalized_columns=args.normalized_columns,
+                   result_cache=args.result_cache, selection_memo=args.selection_memo,
+                   beam_width=args.beam_width)
+        return
     
     try:
         print(f"Using input file: {input_file}")
+
+        pool = get_shared_pool()
+        catalog = None
+        if args.in_memory:
+            with pool.connection() as snapshot_conn:
+                catalog = CatalogSnapshot.load(snapshot_conn)
         
         # Create recommendation system with specified input file
-        rec_system = PCRecommendationSystem(input_file=input_file) if input_file else PCRecommendationSystem()
+        rec_system = PCRecommendationSystem(input_file=input_file or DEFAULT_INPUT_FILE, catalog=catalog, pool=pool,
+                                            tiered_fallbacks=args.tiered_fallbacks,
+                                            use_compat_edges=args.compat_edges,
+                                            normalized_columns=args.normalized_columns,
+                                            beam_width=args.beam_width)
         
         # Generate recommendation
         recommendation = rec_system.build_recommendation()
@@ -1359,6 +2054,7 @@ def main():
             print(json.dumps(recommendation, indent=2))
             
         rec_system.close()
+        close_shared_pool()
         
     except Exception as e:
         error_message = f"Error in recommendation system: {str(e)}"
@@ -0,0 +1,292 @@
+# filename: recommendation_worker.py
+"""
+Long-running recommendation worker.
+
+Keeps the interpreter, imports, pooled database connections and (optionally)
+an in-memory catalog snapshot warm across requests. Speaks line-delimited
+JSON-RPC 2.0 on stdin/stdout, or on a local TCP socket with --port.
+
+Methods:
+  recommend        {"preferences": {...}, "use_ml_ranking": true, "use_dynamic_budget": true}
+  recommend_batch  {"profiles": [{...}, ...], ...} -> list of recommendations in input order
+  reload           {} -> reload the catalog snapshot now
+  score            {"component_type": "cpu", "rows": [{...}, ...]} -> [{"id", "ml_score"}, ...]
+  stats            {} -> request counters, pool metrics and snapshot info
+  ping             {} -> "pong"
+
+With --result-cache-size, finished recommendations are reused for profiles that
+select the same way (see result_cache.py) until the catalog changes. Without
+--in-memory, --selection-memo-rows keeps compatibility candidate lists across
+requests (see selection_memo.py).
+
+With --in-memory the snapshot is swapped without interrupting requests: a new
+snapshot is loaded next to the old one and replaces it once complete. Reloads
+happen on the `reload` method, on SIGHUP, and (with --reload-interval) when the
+catalog tables change.
+"""
+import sys
+import json
+import time
+import signal
+import inspect
+import logging
+import argparse
+import threading
+import socketserver
+from recommendation_system import PCRecommendationSystem, build_recommendations
+from catalog_snapshot import CatalogSnapshot, catalog_fingerprint
+from connection_pool import get_shared_pool, close_shared_pool
+from result_cache import ResultCache
+from selection_memo import SelectionMemo
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+class RecommendationWorker:
+    def __init__(self, in_memory=False, pool=None, batch_workers=1, result_cache=None, selection_memo=None):
+        self.in_memory = in_memory
+        self.pool = pool if pool is not None else get_shared_pool()
+        self.batch_workers = batch_workers
+        self.result_cache = result_cache
+        self.selection_memo = selection_memo
+        self.catalog = None
+        self._fingerprint = None
+        self._reload_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.registry = None
+        self.stats = {"requests": 0, "errors": 0, "reloads": 0, "total_latency_s": 0.0, "started_at": time.time()}
+        if self.in_memory:
+            self.reload()
+
+    # ---------- Catalog reload ----------
+
+    def reload(self):
+        """Load a fresh snapshot and swap it in; in-flight builds keep the old one"""
+        if not self.in_memory:
+            return {"in_memory": False}
+        with self._reload_lock:
+            with self.pool.connection() as conn:
+                fingerprint = catalog_fingerprint(conn)
+                catalog = CatalogSnapshot.load(conn)
+            self.catalog = catalog  # Single reference swap
+            self._fingerprint = fingerprint
+            with self._stats_lock:
+                self.stats["reloads"] += 1
+        logging.info(f"Worker - Catalog snapshot reloaded ({catalog.part_count()} parts)")
+        return {"in_memory": True, "parts": catalog.part_count(), "loaded_at": catalog.loaded_at}
+
+    def reload_if_changed(self):
+        """Reload when the catalog tables changed since the current snapshot was taken"""
+        if not self.in_memory:
+            return False
+        with self.pool.connection() as conn:
+            fingerprint = catalog_fingerprint(conn)
+        if fingerprint != self._fingerprint:
+            logging.info("Worker - Catalog change detected, reloading snapshot.")
+            self.reload()
+            return True
+        return False
+
+    def watch_catalog(self, interval):
+        """Poll for catalog changes every `interval` seconds on a daemon thread"""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    logging.error(f"Worker - Catalog change check failed: {e}")
+        threading.Thread(target=loop, name="catalog-watch", daemon=True).start()
+
+    # ---------- RPC methods ----------
+
+    def recommend(self, preferences, use_ml_ranking=True, use_dynamic_budget=True):
+        catalog = self.catalog  # Pin the snapshot for the whole build
+        rec_system = None
+        try:
+            rec_system = PCRecommendationSystem(preferences=preferences, use_ml_ranking=use_ml_ranking,
+                                                use_dynamic_budget=use_dynamic_budget, catalog=catalog,
+                                                pool=None if catalog is not None else self.pool,
+                                                result_cache=self.result_cache,
+                                                selection_memo=self.selection_memo)
+            return rec_system.build_recommendation()
+        finally:
+            if rec_system:
+                rec_system.close()
+
+    def recommend_batch(self, profiles, use_ml_ranking=True, use_dynamic_budget=True):
+        results = [None] * len(profiles)
+        for index, recommendation in build_recommendations(profiles, use_ml_ranking=use_ml_ranking,
+                                                           use_dynamic_budget=use_dynamic_budget,
+                                                           catalog=self.catalog, pool=self.pool,
+                                                           max_workers=self.batch_workers,
+                                                           result_cache=self.result_cache,
+                                                           selection_memo=self.selection_memo,
+                                                           # Pooled SQL builds unless a snapshot is warm
+                                                           in_memory=self.catalog is not None):
+            results[index] = recommendation
+        return results
+
+    def score(self, component_type, rows):
+        """Score spec rows with the persisted ranking model (loaded once per worker)"""
+        if self.registry is None:
+            # Imported on first use so the worker does not need scikit-learn otherwise
+            from model_registry import get_shared_registry
+            self.registry = get_shared_registry()
+        return self.registry.score(component_type, rows).to_dict(orient="records")
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["avg_latency_s"] = stats["total_latency_s"] / stats["requests"] if stats["requests"] else 0.0
+        stats["pool"] = self.pool.stats()
+        catalog = self.catalog
+        stats["catalog"] = {"parts": catalog.part_count(), "loaded_at": catalog.loaded_at} if catalog else None
+        stats["models"] = self.registry.loaded() if self.registry else []
+        stats["result_cache"] = self.result_cache.stats() if self.result_cache else None
+        stats["selection_memo"] = self.selection_memo.stats() if self.selection_memo else None
+        return stats
+
+    # ---------- JSON-RPC dispatch ----------
+
+    def handle_line(self, line):
+        """Handle one JSON-RPC request line; returns the response line, or None for notifications"""
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            return self._error(None, PARSE_ERROR, f"Parse error: {e}")
+        if not isinstance(request, dict) or "method" not in request:
+            return self._error(request.get("id") if isinstance(request, dict) else None, INVALID_REQUEST, "Invalid request")
+
+        request_id = request.get("id")
+        notification = "id" not in request
+        method = request["method"]
+        params = request.get("params") or {}
+        handlers = {
+            "recommend": self.recommend,
+            "recommend_batch": self.recommend_batch,
+            "reload": self.reload,
+            "score": self.score,
+            "stats": self.get_stats,
+            "ping": lambda: "pong",
+        }
+        # Notifications never get a response, not even an error
+        if method not in handlers:
+            return None if notification else self._error(request_id, METHOD_NOT_FOUND, f"Method not found: {method}")
+        if not isinstance(params, dict):
+            return None if notification else self._error(request_id, INVALID_PARAMS, "params must be an object")
+
+        try:
+            inspect.signature(handlers[method]).bind(**params)
+        except TypeError as e:
+            return None if notification else self._error(request_id, INVALID_PARAMS, str(e))
+
+        start = time.perf_counter()
+        try:
+            result = handlers[method](**params)
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+        except Exception as e:
+            logging.error(f"Worker - {method} failed: {e}", exc_info=True)
+            with self._stats_lock:
+                self.stats["errors"] += 1
+            return None if notification else self._error(request_id, INTERNAL_ERROR, str(e))
+        finally:
+            with self._stats_lock:
+                self.stats["requests"] += 1
+                self.stats["total_latency_s"] += time.perf_counter() - start
+
+        if notification:
+            return None
+        return json.dumps(response, default=str)
+
+    @staticmethod
+    def _error(request_id, code, message):
+        return json.dumps({"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}})
+
+
+def serve_stdio(worker):
+    """One request per stdin line, one response per stdout line"""
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        response = worker.handle_line(line)
+        if response is not None:
+            sys.stdout.write(response + "\n")
+            sys.stdout.flush()
+
+
+def serve_tcp(worker, host, port):
+    """Line-delimited JSON-RPC on a local TCP socket, one thread per client"""
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                line = raw.decode("utf-8").strip()
+                if not line:
+                    continue
+                response = worker.handle_line(line)
+                if response is not None:
+                    self.wfile.write((response + "\n").encode("utf-8"))
+                    self.wfile.flush()
+
+    class Server(socketserver.ThreadingTCPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+    with Server((host, port), Handler) as server:
+        logging.info(f"Worker listening on {host}:{port}")
+        server.serve_forever()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stderr)
+
+    parser = argparse.ArgumentParser(description='PC Parts Recommendation worker (JSON-RPC)')
+    parser.add_argument('--in-memory', action='store_true', help='Serve from an in-memory catalog snapshot')
+    parser.add_argument('--port', type=int, help='Listen on 127.0.0.1:PORT instead of stdin/stdout')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Bind address for --port')
+    parser.add_argument('--pool-size', type=int, default=10, help='Maximum pooled database connections')
+    parser.add_argument('--batch-workers', type=int, default=1, help='Threads used by recommend_batch')
+    parser.add_argument('--result-cache-size', type=int, default=0,
+                        help='Recommendations kept in the result cache (0 disables it)')
+    parser.add_argument('--result-cache-ttl', type=float, default=300.0,
+                        help='Seconds a cached recommendation stays valid')
+    parser.add_argument('--selection-memo-rows', type=int, default=0,
+                        help='Compatibility candidate rows kept across requests (0 disables; ignored with --in-memory)')
+    parser.add_argument('--reload-interval', type=float, default=0,
+                        help='Seconds between catalog change checks (0 disables; SIGHUP always reloads)')
+    args = parser.parse_args()
+
+    pool = get_shared_pool(max_size=args.pool_size)
+    result_cache = None
+    if args.result_cache_size > 0:
+        result_cache = ResultCache(max_entries=args.result_cache_size, ttl=args.result_cache_ttl)
+    selection_memo = None
+    if args.selection_memo_rows > 0 and not args.in_memory:
+        selection_memo = SelectionMemo(max_rows=args.selection_memo_rows)
+    worker = RecommendationWorker(in_memory=args.in_memory, pool=pool, batch_workers=args.batch_workers,
+                                  result_cache=result_cache, selection_memo=selection_memo)
+
+    if hasattr(signal, "SIGHUP"):
+        # Reload off the signal handler so the current request is not interrupted
+        signal.signal(signal.SIGHUP, lambda signum, frame: threading.Thread(target=worker.reload, daemon=True).start())
+    if args.reload_interval > 0:
+        worker.watch_catalog(args.reload_interval)
+
+    try:
+        if args.port:
+            serve_tcp(worker, args.host, args.port)
+        else:
+            serve_stdio(worker)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_shared_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# filename: result_cache.py
+"""
+Process-wide cache of finished recommendations.
+
+Many profiles differ only in fields the selection never reads (use-case
+intensities below the allocation thresholds, cosmetic fields, ...). The cache
+key is built from what PCRecommendationSystem actually selects on: the
+per-component budgets after _adjust_budget_allocation, market segment, CPU/GPU
+platform and the mode flags. Entries are evicted least-recently-used beyond
+`max_entries` and expire after `ttl` seconds.
+
+Invalidation follows the catalog: the catalog_version counter, which
+db_setup/import_data.py and the rank write-back in ml_component_ranking.py bump
+in the transaction of their write, and the per-table ids and write counters of
+the spec tables and imported tables are compared at most every `check_interval`
+seconds, and any change empties the cache. Builds served from an in-memory
+snapshot are keyed on that snapshot, so a reloaded snapshot never hits old entries.
+"""
+import copy
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from catalog_snapshot import SNAPSHOT_TABLES, catalog_fingerprint
+
+# Raw tables loaded by db_setup/import_data.py
+IMPORT_TABLES = ["cpu", "motherboard", "memory", "storage", "video_card",
+                 "case_enclosure", "power_supply", "cpu_cooler"]
+CACHE_TABLES = list(SNAPSHOT_TABLES.values()) + IMPORT_TABLES
+
+
+def cache_key(system):
+    """Canonical hash of the inputs that decide what `system` builds"""
+    prefs = system.user_prefs
+    technical = prefs.get("technicalPreferences") or {}
+    budget = prefs["budget"]
+    profile = {
+        "budget": budget,
+        "component_budgets_usd": {
+            component: budget * share * system.inr_to_usd
+            for component, share in sorted(system.budget_allocation.items())
+        },
+        "market_segment": technical.get("marketSegment", "Consumer"),
+        "cpu_platform": technical.get("cpuPlatform"),
+        "gpu_platform": technical.get("gpuPlatform"),
+        "use_ml_ranking": system.use_ml_ranking,
+        "use_dynamic_budget": system.use_dynamic_budget,
+        "tiered_fallbacks": system.tiered_fallbacks,
+        "use_compat_edges": system.use_compat_edges,
+        "normalized_columns": system.normalized_columns,
+        "beam_width": system.beam_width,
+        "catalog": system.catalog.loaded_at if system.catalog is not None else None,
+    }
+    encoded = json.dumps(profile, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries=1024, ttl=300.0, check_interval=5.0):
+        """
+        max_entries: recommendations kept before the least recently used is dropped
+        ttl: seconds an entry stays valid (0 disables expiry)
+        check_interval: minimum seconds between catalog change checks
+        """
+        if max_entries < 1:
+            raise ValueError(f"Invalid cache size: max_entries={max_entries}")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (stored_at, recommendation)
+        self._fingerprint = None
+        self._checked_at = None
+        self.generation = 0  # Bumped on every invalidation
+        self._metrics = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def ensure_current(self, conn):
+        """Empty the cache if the catalog changed since the last check (rate limited)"""
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = now
+        fingerprint = catalog_fingerprint(conn, CACHE_TABLES)
+        with self._lock:
+            changed = self._fingerprint is not None and fingerprint != self._fingerprint
+            self._fingerprint = fingerprint
+            if changed:
+                self._metrics["invalidations"] += 1
+                self._entries.clear()
+                self.generation += 1
+        if changed:
+            logging.info("Result cache - Catalog change detected, cache cleared.")
+        return changed
+
+    def get(self, key):
+        """Copy of the cached recommendation for `key`, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                self._metrics["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._metrics["hits"] += 1
+            recommendation = entry[1]
+        return copy.deepcopy(recommendation)
+
+    def put(self, key, recommendation, generation=None):
+        """Store a recommendation; dropped if the cache was invalidated since `generation`"""
+        stored = copy.deepcopy(recommendation)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic(), stored)
+            self._entries.move_to_end(key)
+            self._metrics["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["size"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache(**kwargs):
+    """Return the process-wide cache, creating it with `kwargs` on first use"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ResultCache(**kwargs)
+        return _shared_cache
@@ -0,0 +1,216 @@
+# filename: selection_memo.py
+"""
+Memo of compatibility candidate lists shared across builds.
+
+Within a batch the same compatibility lookups recur: get_compatible_motherboards
+for one CPU id, get_compatible_memory for one (motherboard, CPU) pair, and so on.
+SelectionMemo keeps the full candidate list of each compatibility query (the
+query text plus its parameters is the key) and the select_* steps apply their
+budget, segment and ranking in memory, so a repeated key costs no round trip.
+
+The in-memory filters mirror the SQL the selection steps write: a conjunction of
+`p.<column> <op> <value>` conditions, and an ORDER BY over columns or the
+"rank IS NULL -> 9999" expression of _get_order_by_clause. compile_filter and
+compile_order return None for anything else so the caller can fall back to SQL.
+That includes ordering text columns: PostgreSQL sorts them by collation and
+Python by code point, so only equality is mirrored for text.
+
+Candidate lists differ in size by orders of magnitude (one CPU's coolers against
+every PSU above a wattage), so the memo is bounded by the rows it holds: entries
+are evicted least-recently-used beyond `max_rows`, and a list larger than that
+is returned without being kept. The memo empties itself when the spec tables
+change (see catalog_snapshot.catalog_fingerprint).
+"""
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from catalog_snapshot import catalog_fingerprint
+
+_CONDITION_RE = re.compile(r"""^p\.("?\w+"?)\s*(<=|>=|<>|=|<|>)\s*(%s|'[^']*'|-?[0-9]+(?:\.[0-9]+)?)$""")
+_RANK_TERM_RE = re.compile(r'^CASE WHEN p\.("?\w+"?) IS NULL THEN 9999 ELSE p\.\1 END(?: (ASC|DESC))?$')
+_COLUMN_TERM_RE = re.compile(r'^p\.("?\w+"?)(?: (ASC|DESC))?$')
+
+# pg_type OIDs of name, text, bpchar and varchar (cursor.description type codes)
+_TEXT_TYPE_CODES = {19, 25, 1042, 1043}
+
+_OPERATORS = {
+    "<=": lambda a, b: a <= b,
+    ">=": lambda a, b: a >= b,
+    "<>": lambda a, b: a != b,
+    "=": lambda a, b: a == b,
+    "<": lambda a, b: a < b,
+    ">": lambda a, b: a > b,
+}
+
+
+def _column_position(column, column_names):
+    name = column.strip('"')
+    return column_names.index(name) if name in column_names else None
+
+
+def text_columns(description):
+    """Names of the text-typed columns of a cursor description"""
+    return {desc[0] for desc in description if desc[1] in _TEXT_TYPE_CODES}
+
+
+def compile_filter(condition_sql, params, column_names, text_columns=()):
+    """
+    Predicate over result rows for a WHERE fragment like "p.price_num <= %s AND p.price_num > 0",
+    with %s taken from `params` in order. A NULL operand fails the condition, as in SQL.
+    Returns None if the fragment uses anything else, or compares a column in
+    `text_columns` with anything but = or <>.
+    """
+    params = list(params)
+    checks = []
+    for clause in re.split(r'\s+AND\s+', condition_sql.strip(), flags=re.IGNORECASE):
+        if not clause:
+            continue
+        match = _CONDITION_RE.match(clause.strip())
+        if not match:
+            return None
+        position = _column_position(match.group(1), column_names)
+        if position is None:
+            return None
+        if column_names[position] in text_columns and match.group(2) not in ("=", "<>"):
+            return None
+        literal = match.group(3)
+        if literal == "%s":
+            if not params:
+                return None
+            value = params.pop(0)
+        elif literal.startswith("'"):
+            value = literal[1:-1]
+        else:
+            value = float(literal)
+        checks.append((position, _OPERATORS[match.group(2)], value))
+    if params:
+        return None
+
+    def predicate(row):
+        for position, compare, value in checks:
+            if row[position] is None or value is None or not compare(row[position], value):
+                return False
+        return True
+    return predicate
+
+
+def compile_order(order_by_sql, column_names, text_columns=()):
+    """
+    Function sorting rows like an ORDER BY over p.<column> terms and the rank CASE of
+    _get_order_by_clause (PostgreSQL puts NULLs last ascending, first descending).
+    Ties keep the input order. Returns None for any other term, or one ordering
+    by a column in `text_columns`.
+    """
+    body = re.sub(r'^\s*ORDER BY\s+', '', order_by_sql.strip(), flags=re.IGNORECASE)
+    terms = []
+    for term in (t.strip() for t in body.split(',')):
+        term = re.sub(r'\s+', ' ', term)
+        rank_match = _RANK_TERM_RE.match(term)
+        column_match = rank_match or _COLUMN_TERM_RE.match(term)
+        if not column_match:
+            return None
+        position = _column_position(column_match.group(1), column_names)
+        if position is None or column_names[position] in text_columns:
+            return None
+        terms.append((position, rank_match is not None, column_match.group(2) == "DESC"))
+
+    def order(rows):
+        rows = list(rows)
+        # Stable sorts from the last term to the first give the combined ordering
+        for position, is_rank, descending in reversed(terms):
+            if is_rank:
+                key = lambda row: 9999 if row[position] is None else row[position]
+            else:
+                key = lambda row: (row[position] is None, row[position])
+            rows.sort(key=key, reverse=descending)
+        return rows
+    return order
+
+
+class SelectionMemo:
+    def __init__(self, max_rows=100000, check_interval=5.0):
+        """
+        max_rows: candidate rows kept, over all lists, before the least recently used list is dropped
+        check_interval: minimum seconds between catalog change checks
+        """
+        if max_rows < 1:
+            raise ValueError(f"Invalid memo size: max_rows={max_rows}")
+        self.max_rows = max_rows
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (query, params) -> (rows, description)
+        self._rows = 0
+        self._fingerprint = None
+        self._checked_at = None
+        self._metrics = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def ensure_current(self, conn):
+        """Empty the memo if the spec tables changed since the last check (rate limited)"""
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = now
+        fingerprint = catalog_fingerprint(conn)
+        with self._lock:
+            changed = self._fingerprint is not None and fingerprint != self._fingerprint
+            self._fingerprint = fingerprint
+            if changed:
+                self._metrics["invalidations"] += 1
+                self._entries.clear()
+                self._rows = 0
+        if changed:
+            logging.info("Selection memo - Catalog change detected, memo cleared.")
+        return changed
+
+    def candidates(self, cursor, query, params):
+        """(rows, description) of `query`, run on `cursor` only the first time a key is seen"""
+        key = (" ".join(query.split()), tuple(params))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._metrics["hits"] += 1
+                return entry
+            self._metrics["misses"] += 1
+
+        cursor.execute(query, tuple(params))
+        entry = (tuple(cursor.fetchall()), cursor.description)
+        if len(entry[0]) > self.max_rows:
+            return entry
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._rows -= len(previous[0])
+            self._entries[key] = entry
+            self._rows += len(entry[0])
+            while self._rows > self.max_rows:
+                _, (rows, _) = self._entries.popitem(last=False)
+                self._rows -= len(rows)
+                self._metrics["evictions"] += 1
+        return entry
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["size"] = len(self._entries)
+            stats["rows"] = self._rows
+            stats["max_rows"] = self.max_rows
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_shared_memo = None
+_shared_memo_lock = threading.Lock()
+
+
+def get_shared_memo(**kwargs):
+    """Return the process-wide memo, creating it with `kwargs` on first use"""
+    global _shared_memo
+    with _shared_memo_lock:
+        if _shared_memo is None:
+            _shared_memo = SelectionMemo(**kwargs)
+        return _shared_memo
@@ -0,0 +1,34 @@
+"""
+Shared setup for the database-free unit tests of src/recommendation.
+
+The modules are flat files run from src/recommendation, so that directory is put
+on sys.path. data_connection.py is supplied per deployment (see README); when it
+is missing a placeholder whose connect functions raise is registered instead, so
+nothing here can reach a database by accident.
+"""
+import os
+import sys
+import json
+import types
+import pytest
+
+RECOMMENDATION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RECOMMENDATION_DIR)
+
+try:
+    import data_connection  # noqa: F401
+except ImportError:
+    def _no_database(*args, **kwargs):
+        raise RuntimeError("Unit tests must not open a database connection")
+
+    placeholder = types.ModuleType("data_connection")
+    placeholder.connect_to_db = _no_database
+    placeholder.get_sqlalchemy_engine = _no_database
+    sys.modules["data_connection"] = placeholder
+
+
+@pytest.fixture
+def profile():
+    """The sample preferences of input.json"""
+    with open(os.path.join(RECOMMENDATION_DIR, "input.json")) as f:
+        return json.load(f)
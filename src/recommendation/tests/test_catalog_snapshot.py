@@ -0,0 +1,210 @@
+"""
+SnapshotSelector against small in-memory catalogs.
+
+Each case encodes what the SQL path returns for the same rows: the rules of the
+get_compatible_* functions in db/new_compatibility.sql, the ladder of
+_fallback_attempts and the ORDER BY of _get_order_by_clause (ties by id).
+"""
+import pytest
+from recommendation_system import PCRecommendationSystem
+from catalog_snapshot import (CatalogSnapshot, SnapshotTable, SNAPSHOT_TABLES, COMPAT_FUNCTION_COLUMNS,
+                              CompatibilityError)
+
+# Static allocation of 100000 INR: cpu $240, motherboard $192, cooler $60, memory $144,
+# gpu $336, case $84, psu $72, storage $72
+BUDGET_INR = 100000
+BASE_COLUMNS = ["id", "name", "price", "price_num", "rank", "ml_score"]
+
+
+def snapshot(**tables):
+    """CatalogSnapshot from lists of row dicts; columns a row leaves out are NULL"""
+    built = {}
+    for component_type, table_name in SNAPSHOT_TABLES.items():
+        rows = tables.get(component_type, [])
+        columns = list(dict.fromkeys(BASE_COLUMNS + COMPAT_FUNCTION_COLUMNS.get(component_type, [])
+                                     + [column for row in rows for column in row]))
+        built[component_type] = SnapshotTable(table_name, columns, [tuple(row.get(c) for c in columns) for row in rows])
+    return CatalogSnapshot(built)
+
+
+@pytest.fixture
+def preferences(profile):
+    profile["budget"] = BUDGET_INR
+    profile["technicalPreferences"].update(cpuPlatform=None, gpuPlatform=None, marketSegment="Consumer")
+    return profile
+
+
+def system_for(catalog, preferences, selected=None, **flags):
+    system = PCRecommendationSystem(preferences=preferences, catalog=catalog, use_dynamic_budget=False, **flags)
+    system.selected_components.update(selected or {})
+    return system
+
+
+def cpu(row_id, price_num, rank=None, segment="Consumer", **extra):
+    return {"id": row_id, "name": f"CPU {row_id}", "price_num": price_num, "rank": rank,
+            "market_segment": segment, "manufacturer": "AMD", "socket": "AM5", **extra}
+
+
+# ---------- Ordering and ties ----------
+
+def test_rank_then_price_then_id(preferences):
+    catalog = snapshot(cpu=[cpu(7, 200.0, rank=2), cpu(3, 200.0, rank=2), cpu(1, 150.0, rank=2), cpu(4, 90.0)])
+    # NULL rank sorts as 9999; among equal rank and price the lowest id wins
+    assert system_for(catalog, preferences).select_cpu()["id"] == 1
+    catalog = snapshot(cpu=[cpu(7, 200.0, rank=2), cpu(3, 200.0, rank=2), cpu(4, 90.0)])
+    assert system_for(catalog, preferences).select_cpu()["id"] == 3
+
+
+def test_price_only_ordering(preferences):
+    catalog = snapshot(cpu=[cpu(1, 200.0, rank=1), cpu(2, 90.0), cpu(3, 90.0, rank=5)])
+    assert system_for(catalog, preferences, use_ml_ranking=False).select_cpu()["id"] == 2
+
+
+def test_zero_and_null_prices_are_skipped(preferences):
+    catalog = snapshot(cpu=[cpu(1, 0.0, rank=1), cpu(2, None, rank=1), cpu(3, 230.0, rank=9)])
+    assert system_for(catalog, preferences).select_cpu()["id"] == 3
+
+
+# ---------- Fallback ladder ----------
+
+@pytest.mark.parametrize("rows, expected", [
+    # 1.5x budget ($360) reaches the better ranked part before 2.0x
+    ([cpu(1, 700.0, rank=1), cpu(2, 350.0, rank=50), cpu(3, 470.0, rank=10)], 2),
+    # 2.0x ($480) and 2.5x ($600)
+    ([cpu(1, 470.0, rank=10), cpu(2, 590.0, rank=1)], 1),
+    ([cpu(1, 590.0, rank=10), cpu(2, 900.0, rank=1)], 1),
+    # Nothing within 2.5x: cheapest in the segment, whatever its rank
+    ([cpu(1, 900.0, rank=1), cpu(2, 800.0, rank=50)], 2),
+    # Nothing in the segment: cheapest of the platform candidates
+    ([cpu(1, 900.0, segment="Server"), cpu(2, 950.0, segment="Server")], 1),
+])
+def test_budget_ladder(preferences, rows, expected):
+    assert system_for(snapshot(cpu=rows), preferences).select_cpu()["id"] == expected
+
+
+def test_workstation_falls_back_to_consumer_before_cheapest(preferences):
+    preferences["technicalPreferences"]["marketSegment"] = "Workstation"
+    catalog = snapshot(cpu=[cpu(1, 2000.0, segment="Workstation"), cpu(2, 550.0)])
+    assert system_for(catalog, preferences).select_cpu()["id"] == 2
+    catalog = snapshot(cpu=[cpu(1, 2000.0, segment="Workstation"), cpu(2, 650.0)])
+    assert system_for(catalog, preferences).select_cpu()["id"] == 1
+
+
+def test_platform_filter_falls_back_to_any_platform(preferences):
+    preferences["technicalPreferences"]["cpuPlatform"] = "Intel"
+    catalog = snapshot(cpu=[cpu(1, 200.0, rank=1), cpu(2, 100.0, manufacturer="Intel", segment="Server")])
+    assert system_for(catalog, preferences).select_cpu()["id"] == 2
+    catalog = snapshot(cpu=[cpu(1, 100.0)])
+    assert system_for(catalog, preferences).select_cpu()["id"] == 1
+
+
+# ---------- Compatibility mirrors ----------
+
+SELECTED_CPU = {"cpu": {"id": 1, "name": "Ryzen 7 7700X", "manufacturer": "AMD", "tdp": "65 W"}}
+
+
+def test_motherboards_match_the_cpu_socket(preferences):
+    catalog = snapshot(cpu=[cpu(1, 200.0)],
+                       motherboard=[{"id": 10, "price_num": 150.0, "socket_cpu": "AM5"},
+                                    {"id": 11, "price_num": 100.0, "socket_cpu": "AM4"}])
+    assert system_for(catalog, preferences, SELECTED_CPU).select_motherboard()["id"] == 10
+
+
+def test_motherboard_without_cpu_socket_takes_the_last_resort(preferences):
+    catalog = snapshot(cpu=[cpu(1, 200.0, socket=None)],
+                       motherboard=[{"id": 10, "price_num": 150.0, "socket_cpu": "AM5", "rank": 1},
+                                    {"id": 11, "price_num": 100.0, "socket_cpu": "AM4"}])
+    assert system_for(catalog, preferences, SELECTED_CPU).select_motherboard()["id"] == 11
+
+
+def test_coolers_match_one_of_their_sockets(preferences):
+    catalog = snapshot(cpu=[cpu(1, 200.0)],
+                       cooler=[{"id": 20, "price_num": 20.0, "cpu_socket": "LGA1700"},
+                               {"id": 21, "price_num": 40.0, "cpu_socket": "AM4\nAM5"},
+                               {"id": 22, "price_num": 30.0, "cpu_socket": "AM5X"}])
+    assert system_for(catalog, preferences, SELECTED_CPU).select_cooler()["id"] == 21
+
+
+def test_video_cards_need_a_pcie_or_unknown_interface(preferences):
+    gpu = lambda row_id, price_num, interface: {"id": row_id, "price_num": price_num, "interface": interface,
+                                                "market_segment": "Consumer", "brand": "NVIDIA"}
+    selected = {**SELECTED_CPU, "motherboard": {"id": 10}}
+    catalog = snapshot(motherboard=[{"id": 10, "price_num": 150.0}],
+                       gpu=[gpu(30, 100.0, "AGP"), gpu(31, 200.0, "PCIe x16"), gpu(32, 300.0, None)])
+    system = system_for(catalog, preferences, selected, use_ml_ranking=False, beam_width=3)
+    system.record_candidates = True
+    assert system.select_gpu()["id"] == 31
+    assert [c["id"] for c in system.candidates["gpu"]] == [31, 32]
+
+
+def test_cases_fit_the_gpu_length_and_form_factor(preferences):
+    selected = {"motherboard": {"id": 10, "form_factor": "Micro ATX"}, "gpu": {"id": 30}}
+    case = lambda row_id, price_num, length, form_factors: {
+        "id": row_id, "price_num": price_num, "maximum_video_card_length": length,
+        "motherboard_form_factor": form_factors}
+    catalog = snapshot(motherboard=[{"id": 10, "form_factor": "Micro ATX"}],
+                       gpu=[{"id": 30, "length": "300 mm"}],
+                       case=[case(40, 50.0, '11"', "ATX\nMicro ATX"),          # 279.4 mm, too short
+                             case(41, 60.0, '12.5"', "ATX"),                   # no Micro ATX
+                             case(42, 70.0, '12.5"', "ATX\nMicro ATX"),
+                             case(43, 80.0, "320 mm", "Micro ATX")])
+    assert system_for(catalog, preferences, selected).select_case()["id"] == 42
+
+
+def test_case_without_gpu_length_matches_the_form_factor_text(preferences):
+    selected = {"motherboard": {"id": 10, "form_factor": "Micro ATX"}, "gpu": {"id": 30}}
+    catalog = snapshot(motherboard=[{"id": 10, "form_factor": "Micro ATX"}],
+                       gpu=[{"id": 30, "length": None}],
+                       case=[{"id": 40, "price_num": 50.0, "motherboard_form_factor": "ATX"},
+                             {"id": 41, "price_num": 70.0, "motherboard_form_factor": "ATX\nMicro ATX"}])
+    with pytest.raises(CompatibilityError):
+        catalog.compatible_cases(30, 10)
+    assert system_for(catalog, preferences, selected).select_case()["id"] == 41
+
+
+@pytest.mark.parametrize("case_type, expected", [
+    ("Mini ITX Tower", 51),
+    ("HTPC", 52),
+    ("ATX Mid Tower", 53),
+])
+def test_psus_match_the_case_type_and_wattage(preferences, case_type, expected):
+    # 65 W CPU and 200 W GPU: 539 W, then 456 W, then 365 W
+    selected = {"cpu": {"id": 1, "tdp": "65 W"}, "gpu": {"id": 30, "tdp": "200 W"}, "case": {"id": 40}}
+    psu = lambda row_id, price_num, psu_type, wattage: {"id": row_id, "price_num": price_num,
+                                                       "type": psu_type, "wattage": wattage}
+    catalog = snapshot(case=[{"id": 40, "type": case_type}],
+                       psu=[psu(50, 40.0, "SFX", 450), psu(51, 70.0, "SFX", 600), psu(52, 60.0, "Flex ATX", 500),
+                            psu(53, 65.0, "ATX", 550), psu(54, 30.0, "ATX", 400)])
+    assert system_for(catalog, preferences, selected).select_psu()["id"] == expected
+
+
+def test_psu_steps_down_the_power_levels(preferences):
+    selected = {"cpu": {"id": 1, "tdp": "65 W"}, "gpu": {"id": 30, "tdp": "200 W"}, "case": {"id": 40}}
+    catalog = snapshot(case=[{"id": 40, "type": "ATX Mid Tower"}],
+                       psu=[{"id": 50, "price_num": 60.0, "type": "ATX", "wattage": 460},
+                            {"id": 51, "price_num": 50.0, "type": "ATX", "wattage": 370}])
+    # 456 W is the first level any PSU meets, so the 370 W unit is never considered
+    assert system_for(catalog, preferences, selected).select_psu()["id"] == 50
+
+
+def test_memory_matches_ddr_generation_and_speed(preferences):
+    selected = {**SELECTED_CPU, "motherboard": {"id": 10}}
+    catalog = snapshot(cpu=[cpu(1, 200.0)],
+                       motherboard=[{"id": 10, "memory_type": "DDR5", "memory_speed": "DDR5-4800\nDDR5-6000"}],
+                       memory=[{"id": 60, "price_num": 50.0, "speed": "DDR4-3200"},
+                               {"id": 61, "price_num": 60.0, "speed": "DDR5-7200"},
+                               {"id": 62, "price_num": 90.0, "speed": "DDR5-6000"}])
+    assert system_for(catalog, preferences, selected).select_memory()["id"] == 62
+
+
+def test_ssds_follow_the_motherboard_slots(preferences):
+    ssd = lambda row_id, price, capacity, form_factor, interface: {
+        "id": row_id, "price": price, "capacity": capacity, "form_factor": form_factor, "interface": interface}
+    rows = [ssd(70, 60.0, 2000, "M.2-2280", "M.2 PCIe 4.0 X4"), ssd(71, 50.0, 1000, '2.5"', "SATA 6.0 Gb/s"),
+            ssd(72, 30.0, 500, '2.5"', "SATA 6.0 Gb/s"), ssd(73, 40.0, 1000, '2.5"', "SATA 6.0 Gb/s")]
+    selected = {"motherboard": {"id": 10}}
+    # Largest capacity within budget, then the cheaper drive
+    catalog = snapshot(motherboard=[{"id": 10, "m2_slots": None, "sata_ports": 6}], storage=rows)
+    assert system_for(catalog, preferences, selected).select_storage()["id"] == 73
+    catalog = snapshot(motherboard=[{"id": 10, "m2_slots": "1x M.2-2280", "sata_ports": None}], storage=rows)
+    assert system_for(catalog, preferences, selected).select_storage()["id"] == 70
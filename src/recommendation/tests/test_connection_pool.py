@@ -0,0 +1,114 @@
+import pytest
+from connection_pool import ConnectionPool, PoolTimeoutError
+from recommendation_system import PCRecommendationSystem
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        if self.conn.fail_queries:
+            raise RuntimeError("server closed the connection unexpectedly")
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    def __init__(self, fail_queries=False):
+        self.fail_queries = fail_queries
+        self.closed = 0
+        self.autocommit = True
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class Factory:
+    """connect() for the pool that records every connection it opens"""
+
+    def __init__(self, fail_queries=False):
+        self.fail_queries = fail_queries
+        self.opened = []
+
+    def __call__(self):
+        conn = FakeConnection(self.fail_queries)
+        self.opened.append(conn)
+        return conn
+
+
+def test_released_connection_is_reused_and_rolled_back():
+    factory = Factory()
+    pool = ConnectionPool(connect=factory, min_size=1, max_size=2)
+    conn = pool.acquire()
+    assert conn.autocommit is False
+    pool.release(conn)
+    assert conn.rollbacks == 1
+    assert pool.acquire() is conn
+    stats = pool.stats()
+    assert (stats["created"], stats["checkouts"], stats["in_use"], stats["idle"]) == (1, 2, 1, 0)
+
+
+def test_acquire_times_out_when_every_connection_is_in_use():
+    pool = ConnectionPool(connect=Factory(), min_size=0, max_size=1)
+    pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(timeout=0.05)
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_closed_connection_is_discarded_on_release():
+    pool = ConnectionPool(connect=Factory(), min_size=0, max_size=1)
+    conn = pool.acquire()
+    conn.close()
+    pool.release(conn)
+    stats = pool.stats()
+    assert (stats["idle"], stats["in_use"], stats["discarded"]) == (0, 0, 1)
+    assert pool.acquire() is not conn
+
+
+def test_failed_health_check_replaces_the_connection():
+    factory = Factory()
+    pool = ConnectionPool(connect=factory, min_size=1, max_size=1, health_check_after=0)
+    stale = factory.opened[0]
+    stale.fail_queries = True
+    conn = pool.acquire()
+    assert conn is not stale and stale.closed
+    stats = pool.stats()
+    assert (stats["health_check_failures"], stats["created"], stats["in_use"]) == (1, 2, 1)
+
+
+def test_connection_context_releases_on_error():
+    pool = ConnectionPool(connect=Factory(), min_size=0, max_size=1)
+    with pytest.raises(ValueError):
+        with pool.connection():
+            raise ValueError("build failed")
+    assert pool.stats()["in_use"] == 0
+
+
+def test_failed_construction_returns_the_pooled_connection(profile):
+    # set_config for --compat-edges fails after the connection is borrowed
+    pool = ConnectionPool(connect=Factory(fail_queries=True), min_size=0, max_size=2)
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            PCRecommendationSystem(preferences=profile, pool=pool, use_compat_edges=True)
+    stats = pool.stats()
+    assert stats["in_use"] == 0
+    assert stats["timeouts"] == 0
@@ -0,0 +1,46 @@
+import json
+import pytest
+from evaluation_runner import IncrementalJsonWriter, LATENCY_BUCKETS, latency_summary
+
+
+def test_writer_output_matches_json_dump(tmp_path):
+    path = tmp_path / "builds_A.json"
+    entries = {"profile_1": {"components": {"cpu": {"id": 7, "name": "Ryzen"}}}, "profile_2": {"error": "No GPU"}}
+    writer = IncrementalJsonWriter(str(path))
+    for key, value in entries.items():
+        writer.add(key, value)
+    writer.close()
+    assert path.read_text(encoding="utf-8") == json.dumps(entries, indent=2) + "\n"
+    assert writer.count == 2
+
+
+def test_writer_leaves_an_empty_object_without_entries(tmp_path):
+    path = tmp_path / "failed_builds_A.json"
+    IncrementalJsonWriter(str(path)).close()
+    assert json.loads(path.read_text(encoding="utf-8")) == {}
+
+
+def test_writer_close_twice_keeps_the_entries(tmp_path):
+    path = tmp_path / "builds_B.json"
+    writer = IncrementalJsonWriter(str(path))
+    writer.add("profile_1", 1)
+    writer.close()
+    writer.close()
+    assert json.loads(path.read_text(encoding="utf-8")) == {"profile_1": 1}
+
+
+def test_latency_summary_without_builds():
+    assert latency_summary([]) == {"builds": 0}
+
+
+def test_latency_summary_percentiles_and_histogram():
+    latencies = [0.01 * i for i in range(1, 101)] + [60.0]
+    summary = latency_summary(latencies)
+    assert summary["builds"] == 101
+    assert summary["max_s"] == 60.0
+    assert summary["p50_s"] == pytest.approx(0.51)
+    assert summary["p50_s"] <= summary["p95_s"] <= summary["p99_s"] <= summary["max_s"]
+    histogram = summary["histogram"]
+    assert [bucket["le_s"] for bucket in histogram] == LATENCY_BUCKETS + [None]
+    assert sum(bucket["count"] for bucket in histogram) == 101
+    assert histogram[-1]["count"] == 1
@@ -0,0 +1,143 @@
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+import pytest
+from ml_component_ranking import (
+    clean_numeric_value, extract_boolean_feature, extract_categorical_value,
+    clean_numeric_series, extract_boolean_series, map_categorical_series,
+    prepare_cpu_data, prepare_gpu_data, prepare_motherboard_data, prepare_memory_data,
+    prepare_cooler_data, prepare_case_data, prepare_psu_data,
+)
+
+# Cells the scalar helpers handle without raising. The prepare_* rows below spell
+# missing text as 'NULL': how pandas stores a None in a text column (None or NaN)
+# depends on its version, and the scalar helpers only treat None as missing.
+NUMERIC_CELLS = [None, 'NULL', 'NaN', '3.4 GHz', '16GB', '2 TB', '650 W', '267 mm', ' 42 ', '-1.5',
+                 'n/a', '', 12, 4.5, Decimal('199.99'), float('nan')]
+BOOLEAN_CELLS = [None, 'NULL', 'NaN', 'Yes', 'no', 'TRUE', 'y', 'N', True, False, 1, '']
+CATEGORICAL_CELLS = [None, 'NULL', 'NaN', 'ATX', 'Micro ATX', 'Mini ITX', 'E-ATX']
+
+
+def assert_same_values(actual, expected):
+    actual, expected = list(actual), list(expected)
+    assert len(actual) == len(expected)
+    for got, want in zip(actual, expected):
+        if isinstance(want, float) and np.isnan(want):
+            assert isinstance(got, float) and np.isnan(got)
+        else:
+            assert got == pytest.approx(want) if isinstance(want, (int, float, Decimal)) else got == want
+
+
+def test_clean_numeric_series_matches_scalar_helper():
+    series = pd.Series(NUMERIC_CELLS, dtype=object)
+    assert_same_values(clean_numeric_series(series), [float(clean_numeric_value(v)) for v in NUMERIC_CELLS])
+
+
+def test_clean_numeric_series_keeps_numeric_columns():
+    series = pd.Series([1.5, 2.0])
+    assert clean_numeric_series(series) is series
+
+
+def test_extract_boolean_series_matches_scalar_helper():
+    series = pd.Series(BOOLEAN_CELLS, dtype=object)
+    assert_same_values(extract_boolean_series(series), [extract_boolean_feature(v) for v in BOOLEAN_CELLS])
+
+
+def test_map_categorical_series_matches_scalar_helper():
+    mapping = {'ATX': 3, 'Micro ATX': 2, 'Mini ITX': 1}
+    series = pd.Series(CATEGORICAL_CELLS, dtype=object)
+    assert_same_values(map_categorical_series(series, mapping),
+                       [extract_categorical_value(v, mapping) for v in CATEGORICAL_CELLS])
+
+
+def feature_column(frame, column):
+    return frame.set_index('id')[column].to_dict()
+
+
+def test_prepare_cpu_data():
+    frame = prepare_cpu_data([
+        {'id': 1, 'name': 'Intel Core i7-13700K', 'core_count': 16, 'tdp': '125 W',
+         'performance_core_clock': '3.4 GHz', 'price_num': Decimal('389.99')},
+        {'id': 2, 'name': 'AMD Ryzen 7 7700X', 'core_count': 8, 'tdp': '105 W',
+         'performance_core_clock': '4.5 GHz', 'price_num': Decimal('299.00')},
+        {'id': 3, 'name': 'Mystery CPU', 'core_count': None, 'tdp': 'NULL',
+         'performance_core_clock': 'NULL', 'price_num': None},
+    ])
+    assert feature_column(frame, 'generation') == pytest.approx({1: 13, 2: 7, 3: np.nan}, nan_ok=True)
+    assert feature_column(frame, 'tdp') == pytest.approx({1: 125.0, 2: 105.0, 3: np.nan}, nan_ok=True)
+    assert feature_column(frame, 'core_clock') == pytest.approx({1: 3.4, 2: 4.5, 3: np.nan}, nan_ok=True)
+    assert 'name' not in frame.columns
+
+
+def test_prepare_gpu_data():
+    frame = prepare_gpu_data([
+        {'id': 1, 'chipset': 'RX 7900 XT', 'memory': '20GB', 'memory_interface': '320-bit', 'price_num': 899.0},
+        {'id': 2, 'chipset': 'GTX1660', 'memory': '6GB', 'memory_interface': 'NULL', 'price_num': 229.0},
+    ])
+    assert feature_column(frame, 'generation') == pytest.approx({1: 7, 2: 1})
+    assert feature_column(frame, 'memory') == pytest.approx({1: 20.0, 2: 6.0})
+    assert feature_column(frame, 'memory_bus') == pytest.approx({1: 320.0, 2: np.nan}, nan_ok=True)
+
+
+def test_prepare_motherboard_data():
+    frame = prepare_motherboard_data([
+        {'id': 1, 'chipset': 'Intel Z790', 'form_factor': 'ATX', 'm2_slots': 'M.2-2280 M-key\nM.2-2230 E-key',
+         'wireless_networking': 'Wi-Fi 6E', 'price_num': 299.0},
+        {'id': 2, 'chipset': 'NULL', 'form_factor': 'Micro ATX', 'm2_slots': 'NULL',
+         'wireless_networking': 'NULL', 'price_num': 129.0},
+    ])
+    assert feature_column(frame, 'chipset_tier') == pytest.approx({1: 3, 2: np.nan}, nan_ok=True)
+    assert feature_column(frame, 'form_factor_score') == {1: 3, 2: 2}
+    assert feature_column(frame, 'm2_count') == {1: 2, 2: 0}
+    assert feature_column(frame, 'has_wifi') == {1: 1.0, 2: 0.0}
+
+
+def test_prepare_memory_data():
+    frame = prepare_memory_data([
+        {'id': 1, 'speed': 'DDR5-6000', 'modules': '2 x 16GB', 'heat_spreader': 'Yes', 'price_num': 109.0},
+        {'id': 2, 'speed': '3200', 'modules': '1 x 8 GB', 'heat_spreader': 'No', 'price_num': 24.0},
+        {'id': 3, 'speed': 'NULL', 'modules': 'NULL', 'heat_spreader': 'NULL', 'price_num': 50.0},
+    ])
+    assert feature_column(frame, 'speed_num') == pytest.approx({1: 6000, 2: 3200, 3: np.nan}, nan_ok=True)
+    assert feature_column(frame, 'total_capacity') == pytest.approx({1: 32, 2: 8, 3: np.nan}, nan_ok=True)
+    assert feature_column(frame, 'has_heat_spreader') == pytest.approx({1: 1.0, 2: 0.0, 3: np.nan}, nan_ok=True)
+
+
+def test_prepare_cooler_data():
+    frame = prepare_cooler_data([
+        {'id': 1, 'fan_rpm': '500 - 1500 RPM', 'noise_level': '17.9 - 30.6 dB', 'cpu_socket': 'AM5\nLGA1700',
+         'water_cooled': 'No', 'price_num': 35.0},
+        {'id': 2, 'fan_rpm': 'NULL', 'noise_level': '25 dB', 'cpu_socket': 'NULL', 'water_cooled': 'Yes',
+         'price_num': 120.0},
+    ])
+    assert feature_column(frame, 'fan_rpm_max') == pytest.approx({1: 500.0, 2: np.nan}, nan_ok=True)
+    assert feature_column(frame, 'noise_db') == pytest.approx({1: 17.9, 2: 25.0})
+    assert feature_column(frame, 'socket_count') == {1: 2, 2: 0}
+    assert feature_column(frame, 'is_water_cooled') == {1: 0.0, 2: 1.0}
+
+
+def test_prepare_case_data():
+    frame = prepare_case_data([
+        {'id': 1, 'drive_bays': '2 x Internal 3.5"\n3 x Internal 2.5"', 'side_panel': 'Tempered Glass',
+         'front_panel_usb': 'USB 3.2 Gen 2 Type-C', 'maximum_video_card_length': '360 mm / 14.173"',
+         'motherboard_form_factor': 'ATX\nMicro ATX\nMini ITX', 'power_supply_shroud': 'Yes', 'price_num': 99.0},
+        {'id': 2, 'drive_bays': 'NULL', 'side_panel': 'NULL', 'front_panel_usb': 'USB 3.2 Gen 1 Type-A',
+         'maximum_video_card_length': 'NULL', 'motherboard_form_factor': 'Mini ITX',
+         'power_supply_shroud': 'No', 'price_num': 59.0},
+    ])
+    assert feature_column(frame, 'drive_bay_count') == {1: 5, 2: 0}
+    assert feature_column(frame, 'has_glass') == {1: 1.0, 2: 0.0}
+    assert feature_column(frame, 'has_usb_c') == {1: 1.0, 2: 0.0}
+    assert feature_column(frame, 'gpu_clearance') == pytest.approx({1: 360.0, 2: np.nan}, nan_ok=True)
+    assert feature_column(frame, 'form_factor_count') == {1: 3, 2: 1}
+
+
+def test_prepare_psu_data():
+    frame = prepare_psu_data([
+        {'id': 1, 'wattage': '750 W', 'efficiency_rating': '80+ Gold', 'modular': 'Full', 'price_num': 109.0},
+        {'id': 2, 'wattage': 550, 'efficiency_rating': '80+', 'modular': 'No', 'price_num': 49.0},
+        {'id': 3, 'wattage': 'NULL', 'efficiency_rating': 'NULL', 'modular': 'Semi', 'price_num': 79.0},
+    ])
+    assert feature_column(frame, 'wattage_num') == pytest.approx({1: 750.0, 2: 550.0, 3: np.nan}, nan_ok=True)
+    assert feature_column(frame, 'efficiency_score') == pytest.approx({1: 3, 2: 0, 3: np.nan}, nan_ok=True)
+    assert feature_column(frame, 'modularity_score') == {1: 2, 2: 0, 3: 1}
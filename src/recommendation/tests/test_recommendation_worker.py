@@ -0,0 +1,27 @@
+import json
+import pytest
+from recommendation_worker import RecommendationWorker, METHOD_NOT_FOUND, INVALID_PARAMS, INTERNAL_ERROR
+
+
+@pytest.fixture
+def worker():
+    # A pool without stats() makes the "stats" method fail with an internal error
+    return RecommendationWorker(pool=object())
+
+
+@pytest.mark.parametrize("request_body, code", [
+    ({"method": "nope"}, METHOD_NOT_FOUND),
+    ({"method": "ping", "params": [1]}, INVALID_PARAMS),
+    ({"method": "ping", "params": {"extra": 1}}, INVALID_PARAMS),
+    ({"method": "stats"}, INTERNAL_ERROR),
+])
+def test_errors_are_reported_for_requests_only(worker, request_body, code):
+    response = json.loads(worker.handle_line(json.dumps({"jsonrpc": "2.0", "id": 7, **request_body})))
+    assert response["id"] == 7
+    assert response["error"]["code"] == code
+    assert worker.handle_line(json.dumps({"jsonrpc": "2.0", **request_body})) is None
+
+
+def test_successful_notification_gets_no_response(worker):
+    assert worker.handle_line(json.dumps({"jsonrpc": "2.0", "method": "ping"})) is None
+    assert json.loads(worker.handle_line(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "ping"})))["result"] == "pong"
@@ -0,0 +1,117 @@
+import copy
+from types import SimpleNamespace
+import pytest
+from recommendation_system import PCRecommendationSystem
+from result_cache import cache_key, ResultCache
+
+CATALOG = SimpleNamespace(loaded_at=1700000000.0)
+
+
+def key_for(preferences, catalog=CATALOG, **flags):
+    # A catalog keeps the constructor from opening a connection
+    return cache_key(PCRecommendationSystem(preferences=preferences, catalog=catalog, **flags))
+
+
+def test_same_profile_gives_same_key(profile):
+    assert key_for(profile) == key_for(copy.deepcopy(profile))
+
+
+def test_fields_that_do_not_affect_selection_are_ignored(profile):
+    other = copy.deepcopy(profile)
+    other["technicalPreferences"]["connectivity"] = {"wifi": False, "bluetooth": False}
+    assert key_for(other) == key_for(profile)
+
+
+@pytest.mark.parametrize("change", [
+    lambda prefs: prefs.update(budget=prefs["budget"] + 1000),
+    lambda prefs: prefs["technicalPreferences"].update(cpuPlatform="Intel"),
+    lambda prefs: prefs["technicalPreferences"].update(gpuPlatform="AMD"),
+    lambda prefs: prefs["technicalPreferences"].update(marketSegment="Workstation"),
+])
+def test_selection_inputs_change_the_key(profile, change):
+    other = copy.deepcopy(profile)
+    change(other)
+    assert key_for(other) != key_for(profile)
+
+
+@pytest.mark.parametrize("flags", [
+    {"use_ml_ranking": False},
+    {"use_dynamic_budget": False},
+    {"tiered_fallbacks": True},
+    {"beam_width": 4},
+])
+def test_mode_flags_change_the_key(profile, flags):
+    assert key_for(profile, **flags) != key_for(profile)
+
+
+def test_catalog_reload_changes_the_key(profile):
+    assert key_for(profile, catalog=SimpleNamespace(loaded_at=1700000060.0)) != key_for(profile)
+
+
+def test_cache_returns_stored_copies(profile):
+    cache = ResultCache(max_entries=1, ttl=0)
+    key = key_for(profile)
+    cache.put(key, {"components": {"cpu": {"id": 1}}})
+    hit = cache.get(key)
+    hit["components"]["cpu"]["id"] = 2
+    assert cache.get(key) == {"components": {"cpu": {"id": 1}}}
+
+
+def test_store_from_before_a_clear_is_dropped(profile):
+    cache = ResultCache(max_entries=4, ttl=0)
+    key = key_for(profile)
+    generation = cache.generation
+    cache.clear()
+    cache.put(key, {"components": {}}, generation=generation)
+    assert cache.get(key) is None
+
+
+class CatalogConnection:
+    """Answers the catalog_fingerprint queries from a version and pg_stat rows"""
+
+    def __init__(self, version, stats):
+        self.version = version
+        self.stats = stats
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if "to_regclass" in query:
+            self.result = [(self.version is not None,)]
+        elif "catalog_version" in query:
+            self.result = [(self.version,)]
+        else:
+            self.result = list(self.stats)
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+    def rollback(self):
+        pass
+
+
+@pytest.mark.parametrize("before, after", [
+    # Version bumped by a write whose pg_stat counters have not arrived yet
+    (CatalogConnection(1, [("cpu_specs", 100, 5)]), CatalogConnection(2, [("cpu_specs", 100, 5)])),
+    # Swapped-in copy that happens to have the same number of writes
+    (CatalogConnection(None, [("cpu", 100, 5)]), CatalogConnection(None, [("cpu", 200, 5)])),
+])
+def test_catalog_change_clears_the_cache(profile, before, after):
+    cache = ResultCache(max_entries=4, ttl=0, check_interval=0)
+    key = key_for(profile)
+    assert not cache.ensure_current(before)
+    cache.put(key, {"components": {}})
+    assert not cache.ensure_current(before)
+    assert cache.get(key) is not None
+    assert cache.ensure_current(after)
+    assert cache.get(key) is None
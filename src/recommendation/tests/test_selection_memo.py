@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+import pytest
+from recommendation_system import PCRecommendationSystem
+from selection_memo import SelectionMemo, compile_filter, compile_order, text_columns
+
+COLUMNS = ["id", "name", "price_num", "rank"]
+ROWS = [
+    (1, "A", 120.0, 3),
+    (2, "B", 80.0, None),
+    (3, "C", 95.0, 1),
+    (4, "D", None, 2),
+    (5, "E", 80.0, 1),
+]
+# (name, type_code) like cursor.description: int4, text, numeric, int4
+DESCRIPTION = [("id", 23), ("name", 25), ("price_num", 1700), ("rank", 23)]
+
+
+def ids(rows):
+    return [row[0] for row in rows]
+
+
+def test_filter_binds_params_in_order():
+    predicate = compile_filter("p.price_num <= %s AND p.price_num > 0", (100,), COLUMNS)
+    assert ids(filter(predicate, ROWS)) == [2, 3, 5]
+
+
+def test_filter_null_operand_fails_like_sql():
+    predicate = compile_filter("p.rank >= 1", (), COLUMNS)
+    assert ids(filter(predicate, ROWS)) == [1, 3, 4, 5]
+    predicate = compile_filter("p.price_num <= %s", (None,), COLUMNS)
+    assert ids(filter(predicate, ROWS)) == []
+
+
+@pytest.mark.parametrize("condition, params", [
+    ("p.price_num <= %s OR p.price_num > 0", (100,)),   # not a conjunction
+    ("p.missing = 1", ()),                              # unknown column
+    ("p.price_num <= %s", ()),                          # too few params
+    ("p.price_num <= %s", (1, 2)),                      # too many params
+    ("lower(p.name) = 'a'", ()),                        # expression
+])
+def test_filter_refuses_what_it_cannot_mirror(condition, params):
+    assert compile_filter(condition, params, COLUMNS) is None
+
+
+def test_filter_compares_text_only_for_equality():
+    text = text_columns(DESCRIPTION)
+    assert text == {"name"}
+    assert ids(filter(compile_filter("p.name = 'C'", (), COLUMNS, text), ROWS)) == [3]
+    assert compile_filter("p.name >= 'C'", (), COLUMNS, text) is None
+
+
+def test_order_rank_case_then_price():
+    order = compile_order("""
+        ORDER BY
+            CASE WHEN p."rank" IS NULL THEN 9999 ELSE p."rank" END ASC,
+            p.price_num ASC
+    """, COLUMNS)
+    # NULL rank sorts as 9999; a NULL price sorts last ascending
+    assert ids(order(ROWS)) == [5, 3, 4, 1, 2]
+
+
+def test_order_nulls_first_descending_and_stable_ties():
+    order = compile_order("ORDER BY p.price_num DESC", COLUMNS)
+    assert ids(order(ROWS)) == [4, 1, 3, 2, 5]
+
+
+def test_order_refuses_text_columns_and_expressions():
+    text = text_columns(DESCRIPTION)
+    assert compile_order("ORDER BY p.name ASC", COLUMNS, text) is None
+    assert compile_order("ORDER BY p.price_num ASC", COLUMNS, text) is not None
+    assert compile_order("ORDER BY p.price_num * 2", COLUMNS) is None
+
+
+class CountingCursor:
+    def __init__(self, rows_by_params):
+        self.rows_by_params = rows_by_params
+        self.executed = 0
+        self.description = DESCRIPTION
+
+    def execute(self, query, params):
+        self.executed += 1
+        self._rows = self.rows_by_params[params]
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+def test_memo_runs_each_key_once():
+    memo = SelectionMemo(max_rows=100)
+    cursor = CountingCursor({(1,): ROWS})
+    first = memo.candidates(cursor, "SELECT * FROM get_compatible_motherboards(%s)", (1,))
+    again = memo.candidates(cursor, "SELECT *   FROM get_compatible_motherboards(%s)", [1])
+    assert cursor.executed == 1
+    assert first == again
+    stats = memo.stats()
+    assert (stats["hits"], stats["misses"], stats["rows"]) == (1, 1, len(ROWS))
+
+
+def test_memo_is_bounded_by_rows():
+    memo = SelectionMemo(max_rows=7)
+    cursor = CountingCursor({(1,): ROWS, (2,): ROWS[:2], (3,): ROWS[:3], (4,): ROWS * 2})
+    memo.candidates(cursor, "q", (1,))   # 5 rows
+    memo.candidates(cursor, "q", (2,))   # 7 rows held
+    memo.candidates(cursor, "q", (3,))   # evicts (1,): 5 rows held
+    stats = memo.stats()
+    assert (stats["size"], stats["rows"], stats["evictions"]) == (2, 5, 1)
+    # A list larger than the bound is answered but not kept
+    assert len(memo.candidates(cursor, "q", (4,))[0]) == 10
+    assert memo.stats()["rows"] == 5
+    memo.candidates(cursor, "q", (2,))
+    assert cursor.executed == 4
+
+
+def test_memo_rejects_a_zero_bound():
+    with pytest.raises(ValueError):
+        SelectionMemo(max_rows=0)
+
+
+def test_tiered_memo_returns_the_ranked_tier(profile):
+    memo = SelectionMemo(max_rows=100)
+    system = PCRecommendationSystem(preferences=profile, catalog=SimpleNamespace(loaded_at=0), selection_memo=memo)
+    system.cursor = CountingCursor({(): ROWS})
+    attempts = system._fallback_attempts(100.0)
+    results, _, attempt_name = system._tiered_from_memo("q", (), attempts, '"rank"', None, limit=2)
+    assert attempt_name == "Initial Budget"
+    assert ids(results) == [5, 3]
+    # Over budget everywhere: the cheapest tier keeps one row, ordered by price
+    results, _, attempt_name = system._tiered_from_memo("q", (), system._fallback_attempts(10.0), '"rank"', None, limit=2)
+    assert (attempt_name, ids(results)) == ("Cheapest in Segment", [2])
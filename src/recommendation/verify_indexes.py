@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Check that the select_* queries use the indexes from db/recommendation_indexes.sql.
+
+Runs one real build, records every query the selection steps send to the
+database, then EXPLAINs each of them with the same parameters. Any sequential
+scan of a *_specs table, or a query that fails to EXPLAIN, is reported and
+makes the script exit with status 1.
+
+Small catalogs are often cheaper to seq-scan, so --force-index turns off
+enable_seqscan while explaining to check that a matching index is usable at all.
+"""
+import sys
+import json
+import logging
+import argparse
+from recommendation_system import PCRecommendationSystem, DEFAULT_INPUT_FILE
+
+SELECT_STEPS = ["select_cpu", "select_motherboard", "select_cooler", "select_memory",
+                "select_gpu", "select_case", "select_psu", "select_storage"]
+
+
+class RecordingCursor:
+    """Cursor wrapper that remembers (stage, query, params) for every execute"""
+
+    def __init__(self, cursor, log):
+        self._cursor = cursor
+        self._log = log
+        self.stage = None
+
+    def execute(self, query, params=None):
+        self._log.append((self.stage, query, params))
+        return self._cursor.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def record_build(rec_system):
+    """Run build_recommendation and return the queries issued per select step"""
+    log = []
+    recorder = RecordingCursor(rec_system.cursor, log)
+    rec_system.cursor = recorder
+
+    for step in SELECT_STEPS:
+        original = getattr(rec_system, step)
+
+        def staged(original=original, step=step):
+            recorder.stage = step
+            try:
+                return original()
+            finally:
+                recorder.stage = None
+        setattr(rec_system, step, staged)
+
+    rec_system.build_recommendation()
+    rec_system.cursor = recorder._cursor
+    return [(stage, query, params) for stage, query, params in log if stage is not None]
+
+
+def plan_scans(plan, scans=None):
+    """Collect (node type, relation, index) for every scan node in an EXPLAIN JSON plan"""
+    scans = [] if scans is None else scans
+    if "Relation Name" in plan or "Index Name" in plan:
+        scans.append((plan["Node Type"], plan.get("Relation Name"), plan.get("Index Name")))
+    for child in plan.get("Plans", []):
+        plan_scans(child, scans)
+    return scans
+
+
+def explain(cursor, query, params):
+    cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan_scans(plan[0]["Plan"])
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Verify index usage of the recommendation queries')
+    parser.add_argument('--input', type=str, default=DEFAULT_INPUT_FILE, help='Preferences JSON used for the build')
+    parser.add_argument('--no-ml-ranking', action='store_true', help='Check the price-only ordering instead')
+    parser.add_argument('--force-index', action='store_true', help='Explain with enable_seqscan = off')
+    args = parser.parse_args()
+
+    rec_system = PCRecommendationSystem(input_file=args.input, use_ml_ranking=not args.no_ml_ranking)
+    try:
+        queries = record_build(rec_system)
+        cursor = rec_system.cursor
+        if args.force_index:
+            cursor.execute("SET enable_seqscan = off")
+
+        failures = explain_failures = 0
+        for stage, query, params in queries:
+            try:
+                scans = explain(cursor, query, params)
+            except Exception as e:
+                rec_system.conn.rollback()
+                if args.force_index:
+                    cursor.execute("SET enable_seqscan = off")
+                print(f"{stage:<20} EXPLAIN failed: {e}")
+                explain_failures += 1
+                continue
+            for node_type, relation, index in scans:
+                if not relation or not relation.endswith("_specs"):
+                    continue
+                ok = node_type != "Seq Scan"
+                failures += 0 if ok else 1
+                print(f"{stage:<20} {'OK ' if ok else 'SEQ'} {relation:<18} {node_type:<18} {index or ''}")
+
+        print(f"\n{len(queries)} queries checked, {failures} sequential scan(s) on *_specs tables, "
+              f"{explain_failures} EXPLAIN failure(s)")
+        # A query that could not be explained was not verified, so it fails the check too
+        sys.exit(1 if failures or explain_failures else 0)
+    finally:
+        rec_system.close()
+
+
+if __name__ == "__main__":
+    main()